@@ -1,487 +1,129 @@
 import os
-import re
 import datetime
-import pdfplumber
 import streamlit as st
-from docx import Document
-from openpyxl import load_workbook
-from collections import defaultdict
-import tempfile
 import traceback
-import shutil
-from pathlib import Path
-import sqlite3
-import pandas as pd
-import io
+import functools
+from extraction_pool import DEFAULT_WORKERS, extract_files
+from text_backends import BACKENDS, DEFAULT_BACKEND, PdfBytes
+from extraction_cache import ExtractionCache
+from db import (DB_PATH, count_filtered_cases, count_filtered_files, get_cases_page,
+                get_fee_summary, get_filtered_files, init_database, save_metrics)
+from export import EXPORT_FORMATS, export_cases
+from documents import INVOICE_TEMPLATE_PATH, WORD_TEMPLATE_PATH
+from pipeline import (CASE_TYPES, DEFAULT_AGENT_FEE, aggregate_results, build_jobs, find_duplicates,
+                      generate_invoices, generate_word_docs, save_results)
+from metrics import PROFILERS, batch
+from storage import BlobStore
 
 # 设置页面标题和布局
 st.set_page_config(page_title="商标案件请款系统", layout="wide")
 st.title("商标案件请款系统")
 st.caption("案件类目前仅支持驳回复审、异议申请、无效申请和撤三申请")
 
-# 初始化数据库
-def init_database():
-    conn = sqlite3.connect('trademark_data.db')
-    c = conn.cursor()
-    
-    # 创建案件记录表
-    c.execute('''CREATE TABLE IF NOT EXISTS cases (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                applicant TEXT NOT NULL,
-                unified_credit_code TEXT,
-                case_type TEXT NOT NULL,
-                trademark_name TEXT NOT NULL,
-                category TEXT,
-                official_fee REAL,
-                agent_fee REAL,
-                total_fee REAL,
-                processing_date DATE NOT NULL,
-                original_filename TEXT NOT NULL,
-                generated_doc_path TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )''')
-    
-    # 创建文件记录表
-    c.execute('''CREATE TABLE IF NOT EXISTS generated_files (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                case_id INTEGER,
-                file_name TEXT NOT NULL,
-                file_type TEXT NOT NULL,
-                file_path TEXT NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (case_id) REFERENCES cases (id)
-                )''')
-    
-    conn.commit()
-    conn.close()
+# 初始化数据库：每次交互都会重新执行本脚本，建表和迁移只需在进程内执行一次
+@st.cache_resource
+def ensure_database(db_path=DB_PATH):
+    init_database(db_path)
+
+ensure_database()
 
-# 初始化数据库
-init_database()
+# 模板文件状态：缓存检查结果，模板文件变动后最迟一分钟内反映到页面
+@st.cache_data(ttl=60)
+def template_status():
+    return os.path.exists(WORD_TEMPLATE_PATH), os.path.exists(INVOICE_TEMPLATE_PATH)
+
+# 提取结果缓存（进程内共享，命中计数跨会话累计）
+@st.cache_resource
+def get_extraction_cache():
+    return ExtractionCache(DB_PATH)
+
+# 生成文件的内容寻址存储
+@st.cache_resource
+def get_blob_store():
+    return BlobStore()
 
 # 初始化session状态
 if 'processing_stage' not in st.session_state:
     st.session_state.processing_stage = 0  # 0: 未开始, 1: 提取完成, 2: 生成完成
 if 'case_type' not in st.session_state:
     st.session_state.case_type = "新申请商标"  # 默认选择
-if 'extracted_data' not in st.session_state:
-    st.session_state.extracted_data = None
+if 'batch' not in st.session_state:
+    st.session_state.batch = None  # 按申请人聚合的提取结果（records.Batch）
 if 'agent_fees' not in st.session_state:
     st.session_state.agent_fees = {}
 if 'generated_files' not in st.session_state:
     st.session_state.generated_files = []
-if 'temp_dir' not in st.session_state:
-    st.session_state.temp_dir = ""
+if 'word_documents' not in st.session_state:
+    st.session_state.word_documents = {}  # 上次生成的请款单 {申请人: 文件}，输入未变时沿用
 if 'show_history' not in st.session_state:
     st.session_state.show_history = False
-
-# 官费标准
-OFFICIAL_FEES = {
-    "驳回复审": 675,
-    "商标异议": 450,
-    "撤三申请": 450,
-    "无效宣告": 750,
-    "新申请商标": 270,  # 新申请商标的官费
-}
-
-# 金额转大写函数
-CN_NUM = ['零', '壹', '贰', '叁', '肆', '伍', '陆', '柒', '捌', '玖']
-CN_UNIT = ['', '拾', '佰', '仟', '万', '拾', '佰', '仟', '亿']
-
-def number_to_upper(amount):
-    s = str(int(amount))
-    result = []
-    for i, ch in enumerate(s[::-1]):
-        if int(ch) != 0:
-            result.append(f"{CN_NUM[int(ch)]}{CN_UNIT[i]}")
-    return ''.join(reversed(result)) + "元整"
-
-# ============================= 新申请商标处理函数 =============================
-def extract_pdf_data(pdf_path):
-    """从新申请PDF提取数据"""
-    applicant = "N/A"
-    unified_credit_code = "N/A"
-    final_date = "N/A"
-    trademarks_with_categories = []
-    pending_categories = []
-    
-    with pdfplumber.open(pdf_path) as pdf:
-        all_texts = [page.extract_text().replace("　", " ").replace("\xa0", " ").strip() 
-                     if page.extract_text() else "" for page in pdf.pages]
-        all_text_combined = "\n---PAGE_BREAK---\n".join(all_texts)
-        pages = all_text_combined.split("\n---PAGE_BREAK---\n")
-        
-        for page_num, page_text in enumerate(pages):
-            # 第一页：提取申请人和统一社会信用代码
-            if page_num == 0:
-                applicant_match = re.search(r"申请人名称\(中文\)：\s*(.*?)\s*\(\s*英文\)", page_text)
-                applicant = applicant_match.group(1).strip() if applicant_match else "N/A"
-                
-                # 使用统一的信用代码提取正则表达式
-                unified_credit_code_match = re.search(r'(?:统一社会信用代码|信用代码)[：:]\s*([0-9A-Z]{18})', page_text, re.IGNORECASE)
-                unified_credit_code = unified_credit_code_match.group(1).strip() if unified_credit_code_match else "N/A"
-                
-                # 尝试从第一页提取日期
-                if final_date == "N/A":
-                    date_match = re.search(r"(\d{4}年\s*\d{1,2}月\s*\d{1,2}日)", page_text)
-                    final_date = date_match.group(1).replace(" ", "") if date_match else "N/A"
-                continue
-            
-            # 后续页面：提取类别或商标名
-            # 检查是否包含类别信息
-            if re.search(r'类别：\d+', page_text):
-                categories_found = re.findall(r'类别：(\d+)', page_text)
-                pending_categories.extend(categories_found)
-            
-            # 检查是否包含委托书
-            elif '商 标 代 理 委 托 书' in page_text:
-                tm_name_match = re.search(r'商标代理委托书.*?代理\s+(.*?)商标\s*的\s*如下.*?事宜', 
-                                         page_text, re.DOTALL)
-                tm_name = tm_name_match.group(1).strip() if tm_name_match else ""
-                
-                if not tm_name:
-                    fallback_match = re.search(r'代理\s+(.*?)\s*商标', page_text)
-                    tm_name = fallback_match.group(1).strip() if fallback_match else ""
-                
-                if not tm_name:
-                    st.warning(f"警告：在文件 {os.path.basename(pdf_path)} 的第 {page_num + 1} 页委托书中未找到商标名称。")
-                
-                # 提取委托书日期
-                date_match = re.search(r"(\d{4}年\s*\d{1,2}月\s*\d{1,2}日)", page_text)
-                if date_match:
-                    final_date = date_match.group(1).replace(" ", "")
-                
-                # 关联类别与商标名
-                if pending_categories:
-                    for category in pending_categories:
-                        trademarks_with_categories.append({
-                            "商标名称": tm_name,
-                            "类别": category
-                        })
-                    pending_categories.clear()
-                else:
-                    trademarks_with_categories.append({
-                        "商标名称": tm_name,
-                        "类别": "MANUAL_INPUT_REQUIRED"
-                    })
-                    st.warning(f"提示：文件 {os.path.basename(pdf_path)} 中的商标 '{tm_name}' 未找到自动关联的类别，需要手动输入。")
-        
-        # 检查是否还有未关联的类别
-        if pending_categories:
-            st.warning(f"警告：文件 {os.path.basename(pdf_path)} 处理完毕，但仍有未关联的类别 {pending_categories}。这些类别将被忽略。")
-    
-    return {
-        "申请人": applicant,
-        "统一社会信用代码": unified_credit_code,
-        "日期": final_date,
-        "商标列表": trademarks_with_categories,
-        "事宜类型": "商标注册申请"
-    }
-
-# ============================= 案件类商标处理函数 =============================
-def extract_case_info(text, filename):
-    if any(kw in filename for kw in ['驳回', '复审']):
-        return extract_review_case(text, filename)
-    elif any(kw in filename for kw in ['撤三', '撤销连续']):
-        return extract_non_use_case(text, filename)
-    elif '异议' in filename:
-        return extract_opposition_case(text, filename)
-    elif any(kw in filename for kw in ['无效', '宣告']):
-        return extract_invalid_case(text, filename)
-    else:
-        raise ValueError(f"无法识别案件类型: {filename}")
-
-def extract_review_case(text, filename):
-    case_type = "驳回复审"
-    applicant = re.search(r'(?:申请人名称\$\$中文\$\$|申请人名称)：\s*([^\n]*?)(?=\s+(?:统一社会信用代码|地址))', 
-                          text, re.DOTALL)
-    applicant = applicant.group(1).strip() if applicant else "N/A"
-    
-    # 提取统一社会信用代码
-    unified_credit_code_match = re.search(r'(?:统一社会信用代码|信用代码)[：:]\s*([0-9A-Z]{18})', text, re.IGNORECASE)
-    unified_credit_code = unified_credit_code_match.group(1).strip() if unified_credit_code_match else "N/A"
-    
-    trademarks = []
-    for m in re.finditer(r'申请商标：\s*(.*?)\s+类别：\s*(\d+).*?申请号/国际注册号：\s*([0-9A-Za-z]+)', 
-                         text, re.DOTALL):
-        trademarks.append({
-            "商标名称": m.group(1).strip(), 
-            "类别": int(m.group(2)), 
-            "注册号": m.group(3)
-        })
-    
-    return {
-        "文件名": filename, 
-        "案件类型": case_type, 
-        "申请人": applicant,
-        "统一社会信用代码": unified_credit_code,
-        "商标列表": trademarks
-    }
-
-def extract_non_use_case(text, filename):
-    case_type = "撤三申请"
-    applicant = re.search(r'(?:申请人名称|申请人)：\s*([^\n]*?)(?=\s+(?:统一社会信用代码|地址))', 
-                          text, re.DOTALL)
-    applicant = applicant.group(1).strip() if applicant else "N/A"
-    
-    # 提取统一社会信用代码
-    unified_credit_code_match = re.search(r'(?:统一社会信用代码|信用代码)[：:]\s*([0-9A-Z]{18})', text, re.IGNORECASE)
-    unified_credit_code = unified_credit_code_match.group(1).strip() if unified_credit_code_match else "N/A"
-    
-    trademarks = []
-    for m in re.finditer(r'商标：\s*(.*?)\s+类别：\s*(\d+).*?商标注册号：\s*([0-9A-Za-z]+)', 
-                         text, re.DOTALL):
-        trademarks.append({
-            "商标名称": m.group(1).strip(), 
-            "类别": int(m.group(2)), 
-            "注册号": m.group(3)
-        })
-    
-    return {
-        "文件名": filename, 
-        "案件类型": case_type, 
-        "申请人": applicant,
-        "统一社会信用代码": unified_credit_code,
-        "商标列表": trademarks
-    }
-
-def extract_opposition_case(text, filename):
-    case_type = "商标异议"
-    applicant = re.search(r'异议人名称：\s*([^\n]*?)\s+统一社会信用代码', 
-                          text, re.IGNORECASE)
-    applicant = applicant.group(1).strip() if applicant else "N/A"
-    
-    # 提取统一社会信用代码
-    unified_credit_code_match = re.search(r'(?:统一社会信用代码|信用代码)[：:]\s*([0-9A-Z]{18})', text, re.IGNORECASE)
-    unified_credit_code = unified_credit_code_match.group(1).strip() if unified_credit_code_match else "N/A"
-    
-    trademarks = []
-    for m in re.finditer(r'被异议商标：\s*(.*?)\s+被异议类别：\s*(\d+).*?商标注册号：\s*([0-9A-Za-z]+)', 
-                         text, re.DOTALL):
-        trademarks.append({
-            "商标名称": m.group(1).strip(), 
-            "类别": int(m.group(2)), 
-            "注册号": m.group(3)
-        })
-    
-    return {
-        "文件名": filename, 
-        "案件类型": case_type, 
-        "申请人": applicant,
-        "统一社会信用代码": unified_credit_code,
-        "商标列表": trademarks
-    }
-
-def extract_invalid_case(text, filename):
-    case_type = "无效宣告"
-    applicant = re.search(r'(?:申请人名称\$\$中文\$\$|申请人名称)：\s*([^\n]*?)(?=\s+(?:统一社会信用代码|地址))', 
-                          text, re.DOTALL)
-    applicant = applicant.group(1).strip() if applicant else "N/A"
-    
-    # 提取统一社会信用代码
-    unified_credit_code_match = re.search(r'(?:统一社会信用代码|信用代码)[：:]\s*([0-9A-Z]{18})', text, re.IGNORECASE)
-    unified_credit_code = unified_credit_code_match.group(1).strip() if unified_credit_code_match else "N/A"
-    
-    trademarks = []
-    for m in re.finditer(r'争议商标：\s*(.*?)\s+类别：\s*(\d+).*?注册号/国际注册号：\s*([0-9A-Za-z]+)', 
-                         text, re.DOTALL):
-        trademarks.append({
-            "商标名称": m.group(1).strip(), 
-            "类别": int(m.group(2)), 
-            "注册号": m.group(3)
-        })
-    
-    return {
-        "文件名": filename, 
-        "案件类型": case_type, 
-        "申请人": applicant,
-        "统一社会信用代码": unified_credit_code,
-        "商标列表": trademarks
-    }
+if 'extract_workers' not in st.session_state:
+    st.session_state.extract_workers = DEFAULT_WORKERS
+if 'text_backend' not in st.session_state:
+    st.session_state.text_backend = DEFAULT_BACKEND
+if 'profile' not in st.session_state:
+    st.session_state.profile = None  # 性能剖析方式，None 为关闭
+if 'batch_metrics' not in st.session_state:
+    st.session_state.batch_metrics = {}  # 各阶段最近一个批次的耗时统计 {阶段: Recorder}
 
 # ============================= 通用文档生成函数 =============================
-def create_word_doc(applicant, records, output_dir, case_type):
-    """生成Word请款单"""
+def record_metrics(label, stage, recorder):
+    """保存一个批次的耗时统计，并留在session中供侧边栏显示"""
+    save_metrics(recorder, stage)
+    st.session_state.batch_metrics[label] = recorder
+
+def update_categories(applicant, trademark_name, key):
+    """类别输入框的回调：把输入的类别写回申请人索引"""
+    st.session_state.batch.set_categories(applicant, trademark_name, st.session_state[key])
+
+def show_errors(errors):
+    """显示各申请人生成失败的错误信息"""
+    for applicant, error, tb in errors:
+        st.error(f"为申请人 '{applicant}' 生成请款单时出错: {error}")
+        st.text(tb)
+
+def create_word_docs(jobs, case_type, max_workers, previous=None, batch_id=None):
+    """并行生成各申请人的Word请款单，返回 (job, 文件) 列表，job 为 records.ApplicantRecords
+
+    previous 中同一批次（batch_id）输入未变的申请人沿用原文件；生成失败的申请人显示错误后跳过；
+    模板文件不存在时返回空列表。
+    """
     # 使用后台模板文件
-    template_path = "请款单模板.docx"
+    template_path = WORD_TEMPLATE_PATH
     
     if not os.path.exists(template_path):
         st.error(f"错误: 找不到请款单模板文件 '{template_path}'")
-        return None
+        return []
     
-    try:
-        doc = Document(template_path)
-        
-        # 计算汇总
-        if case_type == "新申请商标":
-            case_types = ["商标注册申请"]
-        else:
-            case_types = list({r["案件类型"] for r in records})
-        
-        case_type_str = "、".join(case_types)
-        total_official = sum(r["官费"] for r in records)
-        total_agent = sum(r["代理费"] for r in records)
-        total = total_official + total_agent
-        
-        # 替换正文占位符
-        today_str = datetime.date.today().strftime("%Y年%m月%d日")
-        for para in doc.paragraphs:
-            for run in para.runs:
-                run.text = run.text.replace("{申请人}", applicant) \
-                                  .replace("{事宜类型}", case_type_str) \
-                                  .replace("{日期}", today_str) \
-                                  .replace("{总官费}", str(total_official)) \
-                                  .replace("{总代理费}", str(total_agent)) \
-                                  .replace("{总计}", str(total)) \
-                                  .replace("{大写}", number_to_upper(total))
-        
-        # 动态写入表格
-        if doc.tables:
-            table = doc.tables[0]
-            
-            # 删除模板中的示例行（如果存在）
-            if len(table.rows) > 1:
-                for _ in range(len(table.rows) - 1, 0, -1):
-                    table._tbl.remove(table.rows[1]._tr)
-            
-            # 添加数据行
-            for idx, rec in enumerate(records, 1):
-                row = table.add_row().cells
-                row[0].text = str(idx)
-                row[1].text = rec["案件类型"] if case_type != "新申请商标" else "商标注册申请"
-                row[2].text = rec["商标名称"]
-                row[3].text = str(rec["类别"])
-                row[4].text = f"{rec['官费']}"
-                row[5].text = f"{rec['代理费']}"
-                row[6].text = f"{rec['官费'] + rec['代理费']}"
-            
-            # 追加合计行
-            total_row = table.add_row().cells
-            total_row[0].merge(total_row[3])
-            total_row[0].text = "合计"
-            total_row[4].text = f"{total_official}"
-            total_row[5].text = f"{total_agent}"
-            total_row[6].text = f"{total}"
-        
-        # 保存文件
-        filename = f"请款单（{applicant}-{case_type_str}）-{total}-{datetime.date.today().strftime('%Y%m%d')}.docx"
-        output_path = os.path.join(output_dir, filename)
-        doc.save(output_path)
-        
-        return filename, output_path
-    except Exception as e:
-        st.error(f"生成Word文档时出错: {str(e)}")
-        st.text(traceback.format_exc())
-        return None, None
+    progress_bar = st.progress(0.0)
+    
+    def on_progress(done, total, result):
+        progress_bar.progress(done / total, text=f"已生成 {done}/{total}: {result['applicant']}")
+    
+    word_docs, errors = generate_word_docs(jobs, case_type, max_workers=max_workers,
+                                           on_progress=on_progress, previous=previous, batch_id=batch_id)
+    show_errors(errors)
+    
+    reused = sum(1 for job, file in word_docs if previous and previous.get(job.applicant) is file)
+    if reused:
+        st.info(f"{reused} 份请款单的内容未变化，沿用上次生成的文件")
+    return word_docs
 
-def build_excel(rows, output_dir):
-    """生成Excel汇总表"""
+def build_excel(word_docs, previous=None):
+    """生成Excel汇总表文件列表（行数超过上限时拆分为多个文件）"""
     # 使用后台模板文件
-    template_path = "发票申请表.xlsx"
+    template_path = INVOICE_TEMPLATE_PATH
     
     if not os.path.exists(template_path):
         st.error(f"错误: 找不到发票申请表模板文件 '{template_path}'")
-        return None, None
+        return []
     
     try:
-        wb = load_workbook(template_path)
-        ws = wb.active
-        row_idx = 2
-        
-        for r in rows:
-            ws[f"B{row_idx}"] = r["申请人"]
-            ws[f"C{row_idx}"] = r["统一社会信用代码"]  # 统一社会信用代码列
-            ws[f"G{row_idx}"] = r["总官费"]
-            ws[f"H{row_idx}"] = r["总官费"]
-            ws[f"I{row_idx}"] = r["总计"]
-            ws[f"Q{row_idx}"] = datetime.date.today().strftime("%Y年%m月%d日")
-            row_idx += 1
-            
-            ws[f"B{row_idx}"] = r["申请人"]
-            ws[f"C{row_idx}"] = r["统一社会信用代码"]  # 统一社会信用代码列
-            ws[f"G{row_idx}"] = r["总代理费"]
-            ws[f"H{row_idx}"] = r["总代理费"]
-            ws[f"I{row_idx}"] = r["总计"]
-            ws[f"Q{row_idx}"] = datetime.date.today().strftime("%Y年%m月%d日")
-            row_idx += 1
-        
-        excel_name = f"发票申请表-{datetime.date.today().strftime('%Y%m%d')}.xlsx"
-        excel_path = os.path.join(output_dir, excel_name)
-        wb.save(excel_path)
-        
-        return excel_name, excel_path
+        return generate_invoices(word_docs, previous=previous)
     except Exception as e:
         st.error(f"生成Excel汇总时出错: {str(e)}")
         st.text(traceback.format_exc())
-        return None, None
-
-# ============================= 数据库操作函数 =============================
-def save_case_to_db(applicant, unified_credit_code, case_type, trademark_name, category, 
-                    official_fee, agent_fee, total_fee, processing_date, original_filename, 
-                    generated_doc_path=None):
-    conn = sqlite3.connect('trademark_data.db')
-    c = conn.cursor()
-    
-    c.execute('''INSERT INTO cases (
-                 applicant, unified_credit_code, case_type, trademark_name, category, 
-                 official_fee, agent_fee, total_fee, processing_date, original_filename, generated_doc_path
-                 ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''', 
-              (applicant, unified_credit_code, case_type, trademark_name, category, 
-               official_fee, agent_fee, total_fee, processing_date, original_filename, generated_doc_path))
-    
-    case_id = c.lastrowid
-    conn.commit()
-    conn.close()
-    return case_id
-
-def save_file_to_db(case_id, file_name, file_type, file_path):
-    conn = sqlite3.connect('trademark_data.db')
-    c = conn.cursor()
-    
-    c.execute('''INSERT INTO generated_files (
-                 case_id, file_name, file_type, file_path
-                 ) VALUES (?, ?, ?, ?)''', 
-              (case_id, file_name, file_type, file_path))
-    
-    conn.commit()
-    conn.close()
-
-def get_all_cases():
-    conn = sqlite3.connect('trademark_data.db')
-    df = pd.read_sql_query("SELECT * FROM cases", conn)
-    conn.close()
-    return df
-
-def get_case_files(case_id):
-    conn = sqlite3.connect('trademark_data.db')
-    df = pd.read_sql_query(f"SELECT * FROM generated_files WHERE case_id = {case_id}", conn)
-    conn.close()
-    return df
-
-def get_filtered_cases(start_date, end_date, applicant, case_type):
-    conn = sqlite3.connect('trademark_data.db')
-    
-    query = "SELECT * FROM cases WHERE 1=1"
-    params = []
-    
-    if start_date:
-        query += " AND processing_date >= ?"
-        params.append(start_date.strftime("%Y-%m-%d"))
-    
-    if end_date:
-        query += " AND processing_date <= ?"
-        params.append(end_date.strftime("%Y-%m-%d"))
-    
-    if applicant:
-        query += " AND applicant LIKE ?"
-        params.append(f"%{applicant}%")
-    
-    if case_type:
-        query += " AND case_type = ?"
-        params.append(case_type)
-    
-    df = pd.read_sql_query(query, conn, params=params)
-    conn.close()
-    return df
+        return []
 
 # ============================= 主应用逻辑 =============================
 def main_app():
@@ -489,7 +131,7 @@ def main_app():
     st.header("1. 选择案件类型")
     st.session_state.case_type = st.radio(
         "请选择处理的案件类型:",
-        ["新申请商标", "案件类商标"],
+        CASE_TYPES,
         index=0 if st.session_state.case_type == "新申请商标" else 1
     )
     
@@ -498,133 +140,110 @@ def main_app():
     # 文件上传和处理区域
     st.header("2. 上传案件PDF文件")
     uploaded_files = st.file_uploader("请选择PDF文件", type="pdf", accept_multiple_files=True)
+    st.session_state.extract_workers = st.number_input(
+        "并行处理进程数",
+        min_value=1,
+        max_value=os.cpu_count() or 1,
+        value=st.session_state.extract_workers
+    )
+    backend_names = list(BACKENDS)
+    st.session_state.text_backend = st.selectbox(
+        "文本提取引擎",
+        backend_names,
+        index=backend_names.index(st.session_state.text_backend)
+    )
 
     if uploaded_files and st.button("处理PDF文件"):
         with st.spinner("正在处理PDF文件..."):
             try:
-                # 创建临时目录
-                temp_dir = tempfile.mkdtemp()
-                st.session_state.temp_dir = temp_dir
+                # 直接从上传文件的缓冲区解析，不写入临时目录；同名文件以最后上传的为准
+                uploads = {uploaded_file.name: uploaded_file for uploaded_file in uploaded_files}
+                
+                # 按文件名排序，保证并行与顺序处理结果一致
+                pdfs = [PdfBytes(filename, uploads[filename].getbuffer())
+                        for filename in sorted(uploads)
+                        if filename.endswith(".pdf")]
+                
+                progress_bar = st.progress(0.0)
                 
-                pdf_dir = os.path.join(temp_dir, "pdf_files")
-                output_dir = os.path.join(temp_dir, "output")
-                os.makedirs(pdf_dir, exist_ok=True)
-                os.makedirs(output_dir, exist_ok=True)
+                def on_progress(done, total, result):
+                    progress_bar.progress(done / total, text=f"已处理 {done}/{total}: {result['filename']}")
                 
-                # 保存上传的文件
-                for uploaded_file in uploaded_files:
-                    file_path = os.path.join(pdf_dir, uploaded_file.name)
-                    with open(file_path, "wb") as f:
-                        f.write(uploaded_file.getbuffer())
+                with batch("extract", st.session_state.profile) as recorder:
+                    results = extract_files(pdfs, case_type,
+                                            max_workers=st.session_state.extract_workers,
+                                            on_progress=on_progress,
+                                            backend=st.session_state.text_backend,
+                                            cache=get_extraction_cache())
+                record_metrics("处理PDF", "extract", recorder)
+                
+                for result in results:
+                    filename = result["filename"]
+                    extra_note = "，使用缓存" if result["cached"] else ""
+                    if result["page_stats"].get("skipped"):
+                        extra_note += f"，跳过 {result['page_stats']['skipped']}/{result['page_stats']['total']} 页"
+                    for warning in result["warnings"]:
+                        st.warning(warning)
+                    
+                    if result["error"]:
+                        st.error(f"处理文件 {filename} 时出错: {result['error']}")
+                        st.text(result["traceback"])
+                        continue
+                    
+                    data = result["data"]
+                    if case_type == "新申请商标":
+                        st.success(f"成功处理: {filename} (申请人: {data['申请人']}{extra_note})")
+                    else:
+                        st.success(f"成功处理: {filename} (申请人: {data['申请人']}, 类型: {data['案件类型']}{extra_note})")
                 
                 # 按申请人聚合
-                applicant_map = defaultdict(list)
-                extracted_data = []
+                applicant_batch = aggregate_results(results, case_type)
                 
-                for filename in os.listdir(pdf_dir):
-                    if filename.endswith(".pdf"):
-                        try:
-                            file_path = os.path.join(pdf_dir, filename)
-                            
-                            if case_type == "新申请商标":
-                                # 新申请商标处理
-                                data = extract_pdf_data(file_path)
-                                applicant = data["申请人"]
-                                unified_credit_code = data["统一社会信用代码"]
-                                
-                                for tm in data["商标列表"]:
-                                    # 处理需要手动输入的类别
-                                    if tm["类别"] == "MANUAL_INPUT_REQUIRED":
-                                        # 在后续步骤中处理
-                                        continue
-                                    
-                                    applicant_map[applicant].append({
-                                        "商标名称": tm["商标名称"],
-                                        "类别": tm["类别"],
-                                        "案件类型": "商标注册申请",
-                                        "官费": OFFICIAL_FEES["新申请商标"],
-                                        "统一社会信用代码": unified_credit_code,  # 添加统一社会信用代码
-                                        "original_filename": filename,
-                                    })
-                                
-                                extracted_data.append(data)
-                                st.success(f"成功处理: {filename} (申请人: {applicant})")
-                            
-                            else:
-                                # 案件类商标处理
-                                with pdfplumber.open(file_path) as pdf:
-                                    text = []
-                                    for page in pdf.pages:
-                                        txt = page.extract_text()
-                                        if not txt:
-                                            continue
-                                        if any(k in txt for k in ["申请书", "申 请 书", "撤销", "异议", "无效", "宣告"]):
-                                            txt = txt.replace("　", " ").replace("\xa0", " ")
-                                            txt = re.sub(r'[\u3000]', ' ', txt)
-                                            text.append(txt)
-                                    text = "".join(text).strip()
-                                
-                                # 提取案件信息
-                                data = extract_case_info(text, filename)
-                                applicant = data["申请人"]
-                                unified_credit_code = data["统一社会信用代码"]
-                                
-                                for tm in data["商标列表"]:
-                                    applicant_map[applicant].append({
-                                        "商标名称": tm["商标名称"],
-                                        "类别": tm["类别"],
-                                        "案件类型": data["案件类型"],
-                                        "官费": OFFICIAL_FEES[data["案件类型"]],
-                                        "统一社会信用代码": unified_credit_code,  # 添加统一社会信用代码
-                                        "original_filename": filename,
-                                    })
-                                
-                                extracted_data.append(data)
-                                st.success(f"成功处理: {filename} (申请人: {applicant}, 类型: {data['案件类型']})")
-                                
-                        except Exception as e:
-                            st.error(f"处理文件 {filename} 时出错: {str(e)}")
-                            st.text(traceback.format_exc())
+                # 重新处理后输入框仍显示此前输入的类别，以输入框的值为准
+                for applicant, trademark_name, _ in list(applicant_batch.pending_manual()):
+                    key = f"manual_{applicant}_{trademark_name}"
+                    if st.session_state.get(key):
+                        applicant_batch.set_categories(applicant, trademark_name, st.session_state[key])
                 
-                # 保存处理结果到session
-                st.session_state.extracted_data = extracted_data
-                st.session_state.applicant_map = dict(applicant_map)
+                # 保存处理结果到session；上一批次生成的文件不再沿用或取代
+                st.session_state.batch = applicant_batch
+                st.session_state.generated_files = []
+                st.session_state.word_documents = {}
                 st.session_state.processing_stage = 1
                 
                 st.success(f"成功处理 {len(uploaded_files)} 个PDF文件！")
-                st.info(f"共发现 {len(applicant_map)} 个申请人")
+                st.info(f"共发现 {len(applicant_batch)} 个申请人")
                 
             except Exception as e:
                 st.error(f"处理过程中发生错误: {str(e)}")
                 st.text(traceback.format_exc())
 
     # 显示提取结果
-    if st.session_state.processing_stage >= 1 and st.session_state.extracted_data:
+    if st.session_state.processing_stage >= 1 and st.session_state.batch:
         st.header("3. 提取结果")
         
-        for applicant, records in st.session_state.applicant_map.items():
-            with st.expander(f"申请人: {applicant}"):
-                st.write(f"统一社会信用代码: {records[0].get('统一社会信用代码', 'N/A')}")
+        for group in st.session_state.batch.applicants.values():
+            with st.expander(f"申请人: {group.applicant}"):
+                records = group.confirmed()
+                st.write(f"统一社会信用代码: {group.unified_credit_code}")
+                st.write(f"来源文件: {'、'.join(group.files)}")
                 st.write(f"案件数量: {len(records)}")
                 for record in records:
-                    st.write(f"- 商标: {record['商标名称']}, 类别: {record['类别']}, 类型: {record['案件类型']}, 官费: {record['官费']}元")
+                    st.write(f"- 商标: {record.trademark_name}, 类别: {record.category}, 类型: {record.case_type}, 官费: {record.official_fee}元")
                 
                 # 显示新申请商标需要手动输入的类别
                 if case_type == "新申请商标":
-                    for data in st.session_state.extracted_data:
-                        if data["申请人"] == applicant:
-                            for tm in data["商标列表"]:
-                                if tm["类别"] == "MANUAL_INPUT_REQUIRED":
-                                    st.warning(f"商标 '{tm['商标名称']}' 需要手动输入类别")
+                    for trademark_name in group.pending:
+                        st.warning(f"商标 '{trademark_name}' 需要手动输入类别")
 
     # 设置代理费和手动输入类别
-    if st.session_state.processing_stage >= 1 and st.session_state.applicant_map:
+    if st.session_state.processing_stage >= 1 and st.session_state.batch:
         st.header("4. 设置参数")
         
         # 设置代理费
         st.subheader("代理费设置")
-        for applicant in st.session_state.applicant_map.keys():
-            default_fee = st.session_state.agent_fees.get(applicant, 1000)
+        for applicant in st.session_state.batch.applicants:
+            default_fee = st.session_state.agent_fees.get(applicant, DEFAULT_AGENT_FEE)
             fee = st.number_input(
                 f"{applicant}的代理费(元/件)", 
                 min_value=0, 
@@ -636,165 +255,49 @@ def main_app():
         # 新申请商标需要手动输入类别
         if case_type == "新申请商标":
             st.subheader("商标类别设置")
-            for data in st.session_state.extracted_data:
-                applicant = data["申请人"]
-                for tm in data["商标列表"]:
-                    if tm["类别"] == "MANUAL_INPUT_REQUIRED":
-                        key = f"manual_{applicant}_{tm['商标名称']}"
-                        categories = st.text_input(
-                            f"商标 '{tm['商标名称']}' 的类别(多个类别用逗号分隔)", 
-                            key=key,
-                            placeholder="例如: 9,35,42"
-                        )
-                        
-                        # 保存手动输入的类别
-                        if categories:
-                            st.session_state[key] = categories
+            # 只遍历有待输入类别商标的申请人；输入的类别由回调直接写回索引
+            for applicant, trademark_name, _ in st.session_state.batch.pending_manual():
+                key = f"manual_{applicant}_{trademark_name}"
+                st.text_input(
+                    f"商标 '{trademark_name}' 的类别(多个类别用逗号分隔)", 
+                    key=key,
+                    placeholder="例如: 9,35,42",
+                    on_change=update_categories,
+                    args=(applicant, trademark_name, key)
+                )
 
     # 生成文档按钮
-    if st.session_state.processing_stage >= 1 and st.session_state.applicant_map and st.button("生成请款单"):
+    if st.session_state.processing_stage >= 1 and st.session_state.batch and st.button("生成请款单"):
         with st.spinner("正在生成请款单和汇总表..."):
             try:
-                output_dir = os.path.join(st.session_state.temp_dir, "output")
-                os.makedirs(output_dir, exist_ok=True)
-                
-                generated_files = []
-                excel_rows = []
-                
-                for applicant, records in st.session_state.applicant_map.items():
-                    try:
-                        # 添加代理费到记录
-                        agent_fee = st.session_state.agent_fees.get(applicant, 1000)
-                        
-                        # 对于新申请商标，添加手动输入的类别
-                        if st.session_state.case_type == "新申请商标":
-                            # 创建一个新的记录列表，处理手动输入
-                            processed_records = []
-                            unified_credit_code = records[0].get("统一社会信用代码", "N/A")
-                            
-                            for data in st.session_state.extracted_data:
-                                if data["申请人"] == applicant:
-                                    for tm in data["商标列表"]:
-                                        if tm["类别"] == "MANUAL_INPUT_REQUIRED":
-                                            key = f"manual_{applicant}_{tm['商标名称']}"
-                                            categories_input = st.session_state.get(key, "")
-                                            if categories_input:
-                                                categories = [cat.strip() for cat in categories_input.split(",") if cat.strip()]
-                                                for cat in categories:
-                                                    processed_records.append({
-                                                        "商标名称": tm["商标名称"],
-                                                        "类别": cat,
-                                                        "案件类型": "商标注册申请",
-                                                        "官费": OFFICIAL_FEES["新申请商标"],
-                                                        "代理费": agent_fee,
-                                                        "统一社会信用代码": unified_credit_code,
-                                                        "original_filename": tm.get("original_filename", "未知文件"),
-                                                    })
-                                        else:
-                                            processed_records.append({
-                                                "商标名称": tm["商标名称"],
-                                                "类别": tm["类别"],
-                                                "案件类型": "商标注册申请",
-                                                "官费": OFFICIAL_FEES["新申请商标"],
-                                                "代理费": agent_fee,
-                                                "统一社会信用代码": unified_credit_code,
-                                                "original_filename": tm.get("original_filename", "未知文件"),
-                                            })
-                        else:
-                            # 案件类商标直接添加代理费
-                            processed_records = []
-                            unified_credit_code = records[0].get("统一社会信用代码", "N/A")
-                            
-                            for record in records:
-                                record["代理费"] = agent_fee
-                                record["统一社会信用代码"] = unified_credit_code
-                                processed_records.append(record)
-                        
-                        # 生成Word文档
-                        if processed_records:
-                            word_filename, word_path = create_word_doc(
-                                applicant, 
-                                processed_records, 
-                                output_dir,
-                                st.session_state.case_type
-                            )
-                            
-                            if word_filename:
-                                # 保存生成的文件到session
-                                with open(word_path, "rb") as f:
-                                    word_data = f.read()
-                                
-                                generated_files.append({
-                                    "name": word_filename,
-                                    "data": word_data,
-                                    "type": "word",
-                                    "path": word_path
-                                })
-                                
-                                # 收集汇总数据
-                                total_official = sum(r["官费"] for r in processed_records)
-                                total_agent = sum(r["代理费"] for r in processed_records)
-                                excel_rows.append({
-                                    "申请人": applicant,
-                                    "统一社会信用代码": unified_credit_code,  # 添加统一社会信用代码
-                                    "总官费": total_official,
-                                    "总代理费": total_agent,
-                                    "总计": total_official + total_agent,
-                                })
-                                
-                                # 保存到数据库
-                                for record in processed_records:
-                                    case_id = save_case_to_db(
-                                        applicant=applicant,
-                                        unified_credit_code=unified_credit_code,
-                                        case_type=record["案件类型"],
-                                        trademark_name=record["商标名称"],
-                                        category=record["类别"],
-                                        official_fee=record["官费"],
-                                        agent_fee=record["代理费"],
-                                        total_fee=record["官费"] + record["代理费"],
-                                        processing_date=datetime.date.today().strftime("%Y-%m-%d"),
-                                        original_filename=record.get("original_filename", "未知文件"),
-                                        generated_doc_path=word_path
-                                    )
-                                    
-                                    # 保存文件记录
-                                    save_file_to_db(
-                                        case_id=case_id,
-                                        file_name=word_filename,
-                                        file_type="word",
-                                        file_path=word_path
-                                    )
+                with batch("generate", st.session_state.profile) as recorder:
+                    jobs, errors = build_jobs(st.session_state.batch, agent_fees=st.session_state.agent_fees)
+                    show_errors(errors)
                     
-                    except Exception as e:
-                        st.error(f"为申请人 '{applicant}' 生成请款单时出错: {str(e)}")
-                        st.text(traceback.format_exc())
-                
-                # 生成Excel汇总
-                if excel_rows:
-                    excel_filename, excel_path = build_excel(excel_rows, output_dir)
-                    if excel_filename:
-                        # 保存生成的文件到session
-                        with open(excel_path, "rb") as f:
-                            excel_data = f.read()
-                        
-                        generated_files.append({
-                            "name": excel_filename,
-                            "data": excel_data,
-                            "type": "excel",
-                            "path": excel_path
-                        })
-                        
-                        # 保存Excel文件记录
-                        save_file_to_db(
-                            case_id=None,  # 与特定case无关
-                            file_name=excel_filename,
-                            file_type="excel",
-                            file_path=excel_path
-                        )
+                    # 重复请款检查：整批与已保存的案件比对，本批次上次生成的请款单不算重复
+                    for warning in find_duplicates(jobs, batch_id=st.session_state.batch.batch_id):
+                        st.warning(warning)
+                    
+                    # 并行生成Word文档（在内存中生成，不写入临时目录）
+                    # 只重新生成输入（记录、代理费、手动类别）有变化的申请人
+                    word_docs = create_word_docs(jobs, st.session_state.case_type,
+                                                 st.session_state.extract_workers,
+                                                 previous=st.session_state.word_documents,
+                                                 batch_id=st.session_state.batch.batch_id) if jobs else []
+                    
+                    # 生成Excel汇总（汇总内容未变时沿用上次的文件）
+                    previous_excel = [f for f in st.session_state.generated_files if f["type"] == "excel"]
+                    excel_files = build_excel(word_docs, previous=previous_excel) if word_docs else []
+                    generated_files = [file for _, file in word_docs] + excel_files
+                    
+                    # 持久化：新生成的文件按内容写入存储（相同内容只保存一份），再在同一事务中写入或更新案件及文件记录
+                    save_results(word_docs, excel_files, get_blob_store(),
+                                 batch_id=st.session_state.batch.batch_id)
+                record_metrics("生成请款单", "generate", recorder)
                 
                 # 保存生成的文件到session
                 st.session_state.generated_files = generated_files
+                st.session_state.word_documents = {job.applicant: file for job, file in word_docs}
                 st.session_state.processing_stage = 2
                 st.success("文档生成完成！")
             except Exception as e:
@@ -833,29 +336,55 @@ def main_app():
 
     # 重置按钮
     if st.button("重置所有数据"):
-        # 清除所有session状态
+        # 清除所有session状态（保留案件类型、页面和侧边栏的处理设置）
+        keys_to_keep = {'case_type', 'show_history', 'extract_workers', 'text_backend', 'profile'}
         keys_to_clear = list(st.session_state.keys())
         for key in keys_to_clear:
-            if key != 'temp_dir' and key != 'case_type' and key != 'show_history':  # 保留temp_dir和case_type
+            if key not in keys_to_keep:
                 del st.session_state[key]
         
-        # 清理临时目录
-        if st.session_state.temp_dir and os.path.exists(st.session_state.temp_dir):
-            try:
-                shutil.rmtree(st.session_state.temp_dir)
-            except:
-                pass
-        
         # 重新初始化必要的状态
         st.session_state.processing_stage = 0
-        st.session_state.extracted_data = None
+        st.session_state.batch = None
         st.session_state.agent_fees = {}
         st.session_state.generated_files = []
-        st.session_state.temp_dir = ""
+        st.session_state.word_documents = {}
+        st.session_state.batch_metrics = {}
         
         st.success("系统已重置，可以开始新的处理流程！")
 
 # ============================= 历史数据查询页面 =============================
+# 相关文件每页显示数量
+FILES_PAGE_SIZE = 20
+# 案件明细每页条数选项
+PAGE_SIZE_OPTIONS = [50, 100, 200, 500]
+SUMMARY_GROUP_LABELS = {"按月份": "month", "按申请人": "applicant", "按案件类型": "case_type"}
+SUMMARY_COLUMN_LABELS = {
+    "month": "月份",
+    "applicant": "申请人",
+    "case_type": "案件类型",
+    "case_count": "案件数",
+    "official_fee": "官费合计",
+    "agent_fee": "代理费合计",
+    "total_fee": "总计",
+}
+
+def read_stored_file(path, blob_hash=None):
+    """读取历史文件内容用于下载：优先从内容寻址存储读取（按需解压），旧记录按原路径读取
+
+    返回 bytes 而不是文件对象：st.download_button 不接受 GzipFile 等解压读取器，
+    文件在读取后即关闭。
+    """
+    if blob_hash:
+        return get_blob_store().read(blob_hash)
+    with open(path, "rb") as f:
+        return f.read()
+
+def stored_file_exists(path, blob_hash=None):
+    if blob_hash:
+        return get_blob_store().find(blob_hash) is not None
+    return os.path.exists(path)
+
 def history_page():
     st.header("历史数据查询")
     
@@ -866,64 +395,116 @@ def history_page():
     with col2:
         end_date = st.date_input("结束日期", value=datetime.date.today())
     
-    col3, col4 = st.columns(2)
+    col3, col4, col5 = st.columns(3)
     with col3:
         applicant = st.text_input("申请人")
     with col4:
+        trademark_name = st.text_input("商标名称")
+    with col5:
         case_type = st.selectbox("案件类型", ["", "新申请商标", "驳回复审", "商标异议", "撤三申请", "无效宣告"])
     
-    # 查询按钮
+    # 查询按钮（查询条件保存在session中，翻页时无需重新点击）
     if st.button("查询数据"):
-        cases_df = get_filtered_cases(start_date, end_date, applicant, case_type)
+        st.session_state.history_query = {
+            "start_date": start_date,
+            "end_date": end_date,
+            "applicant": applicant,
+            "case_type": case_type,
+            "trademark_name": trademark_name,
+        }
+        st.session_state.history_file_page = 1
+        st.session_state.history_cursors = [None]
+    
+    query = st.session_state.get("history_query")
+    if query:
+        total_cases = count_filtered_cases(**query)
         
-        if not cases_df.empty:
-            st.success(f"查询到 {len(cases_df)} 条记录")
+        if total_cases:
+            st.success(f"查询到 {total_cases} 条记录")
             
-            # 显示数据
+            # 分页显示数据（键集分页，history_cursors 保存已访问各页的起始位置）
+            page_size = st.selectbox("每页条数", PAGE_SIZE_OPTIONS, index=1, key="history_page_size",
+                                     on_change=lambda: st.session_state.update(history_cursors=[None]))
+            cursors = st.session_state.history_cursors
+            cases_df, next_cursor = get_cases_page(**query, page_size=page_size, cursor=cursors[-1])
             st.dataframe(cases_df)
             
-            # 导出按钮
-            csv = cases_df.to_csv(index=False).encode('utf-8')
-            st.download_button(
-                label="导出为CSV",
-                data=csv,
-                file_name=f"商标案件数据_{datetime.datetime.now().strftime('%Y%m%d%H%M')}.csv",
-                mime='text/csv',
-            )
+            col_prev, col_info, col_next = st.columns([1, 2, 1])
+            with col_prev:
+                if st.button("上一页", disabled=len(cursors) <= 1):
+                    cursors.pop()
+                    st.rerun()
+            with col_info:
+                st.write(f"第 {len(cursors)} 页 / 共 {(total_cases - 1) // page_size + 1} 页")
+            with col_next:
+                if st.button("下一页", disabled=next_cursor is None):
+                    cursors.append(next_cursor)
+                    st.rerun()
             
-            # 显示文件下载
+            # 导出按钮（点击时才从数据库分块读取并生成文件）
+            col_fmt, col_files, col_export = st.columns(3)
+            with col_fmt:
+                export_format = st.selectbox("导出格式", list(EXPORT_FORMATS), format_func=str.upper)
+            with col_files:
+                include_files = st.checkbox("包含关联文件信息")
+            with col_export:
+                st.download_button(
+                    label=f"导出为{export_format.upper()}",
+                    data=functools.partial(export_cases, export_format, dict(query), include_files),
+                    file_name=f"商标案件数据_{datetime.datetime.now().strftime('%Y%m%d%H%M')}.{export_format}",
+                    mime=EXPORT_FORMATS[export_format],
+                )
+            
+            # 显示文件下载（同一申请人的多条案件共用一个请款单，只列出一次）
             st.subheader("相关文件")
-            for _, row in cases_df.iterrows():
-                case_id = row['id']
-                files_df = get_case_files(case_id)
+            file_count = count_filtered_files(**query)
+            if file_count:
+                page_count = (file_count - 1) // FILES_PAGE_SIZE + 1
+                page = st.number_input(f"文件页码（共 {page_count} 页，{file_count} 个文件）",
+                                       min_value=1, max_value=page_count, key="history_file_page")
+                files_df = get_filtered_files(**query, limit=FILES_PAGE_SIZE,
+                                              offset=(page - 1) * FILES_PAGE_SIZE)
                 
-                if not files_df.empty:
-                    st.write(f"案件 {case_id} 的相关文件:")
-                    for _, file_row in files_df.iterrows():
-                        if os.path.exists(file_row['file_path']):
-                            with open(file_row['file_path'], "rb") as f:
-                                file_data = f.read()
-                            
-                            st.download_button(
-                                label=f"下载 {file_row['file_name']}",
-                                data=file_data,
-                                file_name=file_row['file_name'],
-                                mime="application/octet-stream",
-                                key=f"download_{file_row['id']}"
-                            )
-                        else:
-                            st.warning(f"文件不存在: {file_row['file_name']}")
+                for _, file_row in files_df.iterrows():
+                    st.write(f"{file_row['file_name']}（关联案件: {file_row['case_ids']}）")
+                    if stored_file_exists(file_row['file_path'], file_row['blob_hash']):
+                        # 点击下载时才读取文件
+                        st.download_button(
+                            label=f"下载 {file_row['file_name']}",
+                            data=functools.partial(read_stored_file, file_row['file_path'],
+                                                   file_row['blob_hash']),
+                            file_name=file_row['file_name'],
+                            mime="application/octet-stream",
+                            key=f"download_{file_row['id']}"
+                        )
+                    else:
+                        st.warning(f"文件不存在: {file_row['file_name']}")
         else:
             st.warning("没有找到符合条件的记录")
+    
+    # 费用汇总（由月度汇总表直接计算，不读取明细行）
+    st.subheader("费用汇总")
+    group_label = st.selectbox("汇总方式", list(SUMMARY_GROUP_LABELS))
+    summary_df = get_fee_summary(SUMMARY_GROUP_LABELS[group_label],
+                                 start_date, end_date, applicant, case_type)
+    st.caption("按月份统计，包含起止日期所在的整月")
+    st.dataframe(summary_df.rename(columns=SUMMARY_COLUMN_LABELS))
 
 # ============================= 应用入口 =============================
 # 显示模板状态
 st.sidebar.header("系统状态")
-payment_template_exists = os.path.exists("请款单模板.docx")
-invoice_template_exists = os.path.exists("发票申请表.xlsx")
+payment_template_exists, invoice_template_exists = template_status()
 
 # 主菜单
 app_mode = st.sidebar.selectbox("选择功能", ["案件处理", "历史数据查询"])
+profile_options = ["关闭", *PROFILERS]
+profile_choice = st.sidebar.selectbox(
+    "性能剖析",
+    profile_options,
+    index=profile_options.index(st.session_state.profile or "关闭"),
+    help="对每个批次进行剖析并把结果写入 profiles 目录；子进程中的工作不在剖析范围内，需要时把并行处理进程数设为1"
+)
+st.session_state.profile = None if profile_choice == "关闭" else profile_choice
 
 if payment_template_exists and invoice_template_exists:
     st.sidebar.success("✅ 模板文件已就绪")
@@ -931,7 +512,7 @@ if payment_template_exists and invoice_template_exists:
     st.sidebar.info("发票申请表模板: 发票申请表.xlsx")
     
     if app_mode == "案件处理":
-        ()
+        main_app()
     elif app_mode == "历史数据查询":
         history_page()
 else:
@@ -947,4 +528,26 @@ else:
     
     st.info("请上传模板文件后重新启动应用程序")
 
-
+# 显示提取缓存统计
+cache_stats = get_extraction_cache().stats()
+st.sidebar.caption(
+    f"提取缓存: 命中 {cache_stats['hits']} 次，未命中 {cache_stats['misses']} 次，"
+    f"共 {cache_stats['entries']} 条（{cache_stats['bytes'] / 1024:.1f} KB）"
+)
+
+# 显示最近一个批次各阶段的耗时
+with st.sidebar.expander("耗时统计"):
+    if not st.session_state.batch_metrics:
+        st.caption("处理PDF或生成请款单后在此显示各步骤耗时")
+    for label, recorder in st.session_state.batch_metrics.items():
+        st.markdown(f"**{label}**（批次 {recorder.batch_id}）")
+        st.dataframe([{
+            "步骤": row["name"],
+            "次数": row["calls"],
+            "总耗时(ms)": round(row["total_ms"], 1) if row["kind"] == "span" else None,
+            "自身(ms)": round(row["self_ms"], 1) if row["kind"] == "span" else None,
+            "平均(ms)": round(row["avg_ms"], 2) if row["kind"] == "span" else None,
+            "最长(ms)": round(row["max_ms"], 1) if row["kind"] == "span" else None,
+        } for row in recorder.rows()], hide_index=True)
+        if recorder.profile_path:
+            st.caption(f"剖析结果: {recorder.profile_path}")
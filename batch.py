@@ -0,0 +1,154 @@
+"""命令行批处理：处理一个目录下的全部PDF，生成请款单和发票申请表
+
+与页面使用同一套流水线（pipeline.py），进度和警告输出到标准错误，
+生成的文件写入输出目录，并像页面一样写入存储和数据库（--no-save 时跳过）。
+需在项目目录下运行（模板文件和数据库使用相对路径）。
+
+用法: python batch.py PDF目录 --case-type 案件类商标 [--output output] [--workers 4]
+      [--agent-fee 1000] [--agent-fees fees.json] [--manual-categories categories.json]
+      [--metrics] [--profile cprofile]
+"""
+import argparse
+import json
+import os
+import sys
+
+from db import DB_PATH, init_database, save_metrics
+from documents import INVOICE_TEMPLATE_PATH, WORD_TEMPLATE_PATH
+from extraction_cache import ExtractionCache
+from extraction_pool import DEFAULT_WORKERS, extract_files
+from metrics import PROFILE_DIR, PROFILERS, batch
+from pipeline import (CASE_TYPES, DEFAULT_AGENT_FEE, aggregate_results, build_jobs, find_duplicates,
+                      generate_invoices, generate_word_docs, save_results)
+from text_backends import BACKENDS, DEFAULT_BACKEND
+
+
+def log(message):
+    print(message, file=sys.stderr, flush=True)
+
+
+def load_json(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def print_errors(errors):
+    for applicant, error, tb in errors:
+        log(f"为申请人 '{applicant}' 生成请款单时出错: {error}")
+        log(tb)
+
+
+def print_metrics(stage, recorder):
+    log(f"\n[{stage}] 批次 {recorder.batch_id}")
+    log(f"{'步骤':<24}{'次数':>8}{'总耗时(ms)':>12}{'自身(ms)':>12}{'最长(ms)':>12}")
+    for row in recorder.rows():
+        if row["kind"] == "span":
+            log(f"{row['name']:<24}{row['calls']:>8}{row['total_ms']:>12.1f}"
+                f"{row['self_ms']:>12.1f}{row['max_ms']:>12.1f}")
+        else:
+            log(f"{row['name']:<24}{row['calls']:>8}")
+    if recorder.profile_path:
+        log(f"剖析结果: {recorder.profile_path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="批量处理商标案件PDF")
+    parser.add_argument("pdf_dir", help="PDF文件所在目录")
+    parser.add_argument("--case-type", choices=CASE_TYPES, required=True)
+    parser.add_argument("--output", default="output", help="生成文件的输出目录")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="并行处理进程数")
+    parser.add_argument("--backend", choices=list(BACKENDS), default=DEFAULT_BACKEND, help="文本提取引擎")
+    parser.add_argument("--agent-fee", type=int, default=DEFAULT_AGENT_FEE, help="默认代理费(元/件)")
+    parser.add_argument("--agent-fees", help='各申请人代理费JSON文件: {"申请人": 代理费}')
+    parser.add_argument("--manual-categories",
+                        help='新申请中需手动输入的类别JSON文件: {"申请人": {"商标名称": "9,35"}}')
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--no-cache", action="store_true", help="不使用提取结果缓存")
+    parser.add_argument("--no-save", action="store_true", help="只写输出目录，不写入存储和数据库")
+    parser.add_argument("--metrics", action="store_true", help="输出各步骤耗时统计")
+    parser.add_argument("--profile", choices=PROFILERS,
+                        help="剖析每个批次（只包含主进程，需要时配合 --workers 1）")
+    parser.add_argument("--profile-dir", default=PROFILE_DIR)
+    args = parser.parse_args()
+
+    for template_path in (WORD_TEMPLATE_PATH, INVOICE_TEMPLATE_PATH):
+        if not os.path.exists(template_path):
+            sys.exit(f"错误: 找不到模板文件 '{template_path}'，请在项目目录下运行")
+
+    pdfs = sorted(os.path.join(args.pdf_dir, name) for name in os.listdir(args.pdf_dir)
+                  if name.lower().endswith(".pdf"))
+    if not pdfs:
+        sys.exit(f"目录 {args.pdf_dir} 中没有PDF文件")
+
+    init_database(args.db)
+    cache = None if args.no_cache else ExtractionCache(args.db)
+
+    # 1. 提取
+    def on_extracted(done, total, result):
+        status = "出错" if result["error"] else ("缓存" if result["cached"] else "完成")
+        log(f"[提取 {done}/{total}] {result['filename']} {status}")
+
+    with batch("extract", args.profile, args.profile_dir) as extract_metrics:
+        results = extract_files(pdfs, args.case_type, max_workers=args.workers,
+                                on_progress=on_extracted, backend=args.backend, cache=cache)
+    failed = 0
+    for result in results:
+        for warning in result["warnings"]:
+            log(f"警告: {warning}")
+        if result["error"]:
+            failed += 1
+            log(f"处理文件 {result['filename']} 时出错: {result['error']}")
+            log(result["traceback"])
+
+    # 2. 按申请人聚合并计算费用
+    applicant_batch = aggregate_results(results, args.case_type)
+    agent_fees = load_json(args.agent_fees) if args.agent_fees else {}
+    for applicant in applicant_batch.applicants:
+        agent_fees.setdefault(applicant, args.agent_fee)
+    manual_categories = load_json(args.manual_categories) if args.manual_categories else {}
+    for applicant, trademark_name, _ in list(applicant_batch.pending_manual()):
+        text = manual_categories.get(applicant, {}).get(trademark_name)
+        if text:
+            applicant_batch.set_categories(applicant, trademark_name, text)
+        else:
+            log(f"警告: 申请人 '{applicant}' 的商标 '{trademark_name}' 需要手动输入类别，本次跳过")
+
+    # 3. 生成请款单和发票申请表
+    def on_generated(done, total, result):
+        status = "出错" if result["error"] else "完成"
+        log(f"[生成 {done}/{total}] {result['applicant']} {status}")
+
+    with batch("generate", args.profile, args.profile_dir) as generate_metrics:
+        jobs, errors = build_jobs(applicant_batch, agent_fees=agent_fees)
+        print_errors(errors)
+        for warning in find_duplicates(jobs, batch_id=applicant_batch.batch_id, db_path=args.db):
+            log(f"警告: {warning}")
+        word_docs, errors = generate_word_docs(jobs, args.case_type, max_workers=args.workers,
+                                               on_progress=on_generated, batch_id=applicant_batch.batch_id)
+        print_errors(errors)
+        excel_files = generate_invoices(word_docs) if word_docs else []
+
+        # 4. 写入输出目录和数据库
+        os.makedirs(args.output, exist_ok=True)
+        files = [file for _, file in word_docs] + excel_files
+        for file in files:
+            with open(os.path.join(args.output, file["name"]), "wb") as f:
+                f.write(file["data"])
+        if not args.no_save:
+            save_results(word_docs, excel_files, db_path=args.db, batch_id=applicant_batch.batch_id)
+
+    if not args.no_save:
+        save_metrics(extract_metrics, "extract", args.db)
+        save_metrics(generate_metrics, "generate", args.db)
+    if args.metrics:
+        print_metrics("提取", extract_metrics)
+        print_metrics("生成", generate_metrics)
+
+    print(f"处理 {len(pdfs)} 个PDF（失败 {failed} 个），{len(applicant_batch)} 个申请人，"
+          f"生成 {len(word_docs)} 份请款单、{len(excel_files)} 份发票申请表，输出到 {args.output}")
+    if failed or len(word_docs) < len(jobs):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
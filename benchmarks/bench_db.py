@@ -0,0 +1,83 @@
+"""比较逐行写入与批量事务写入案件记录的吞吐量
+
+逐行写入复现原有做法：每条案件和文件记录各自连接、插入、提交、关闭。
+
+用法: python benchmarks/bench_db.py [--rows 300]
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db  # noqa: E402
+
+
+def make_cases(n):
+    return [{
+        "applicant": f"测试科技有限公司{i % 20}",
+        "unified_credit_code": "91440300MA5ABCDE1X",
+        "case_type": "驳回复审",
+        "trademark_name": f"商标{i}",
+        "category": str(i % 45 + 1),
+        "official_fee": 675,
+        "agent_fee": 1000,
+        "total_fee": 1675,
+        "processing_date": "2024-05-06",
+        "original_filename": f"驳回复审{i}.pdf",
+        "generated_doc_path": "/tmp/请款单.docx",
+        "registration_number": str(10000000 + i),
+        "batch_id": None,
+    } for i in range(n)]
+
+
+def per_row(db_path, cases):
+    for case in cases:
+        conn = sqlite3.connect(db_path)
+        c = conn.cursor()
+        c.execute(f'''INSERT INTO cases ({", ".join(db.CASE_COLUMNS)})
+                      VALUES ({", ".join("?" for _ in db.CASE_COLUMNS)})''',
+                  tuple(case[col] for col in db.CASE_COLUMNS))
+        case_id = c.lastrowid
+        conn.commit()
+        conn.close()
+
+        conn = sqlite3.connect(db_path)
+        conn.execute('''INSERT INTO generated_files (case_id, file_name, file_type, file_path)
+                        VALUES (?, ?, ?, ?)''', (case_id, "请款单.docx", "word", "/tmp/请款单.docx"))
+        conn.commit()
+        conn.close()
+
+
+def bulk(db_path, cases):
+    db.save_cases_with_file(cases, "请款单.docx", "word", "/tmp/请款单.docx", db_path=db_path)
+
+
+def run(func, cases):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        db.init_database(db_path)
+        start = time.perf_counter()
+        func(db_path, cases)
+        elapsed = time.perf_counter() - start
+        db.close_connections()
+        return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="案件记录写入基准")
+    parser.add_argument("--rows", type=int, default=300, help="案件（商标）条数")
+    args = parser.parse_args()
+
+    cases = make_cases(args.rows)
+    print(f"{'方式':<10}{'案件数':>8}{'耗时(s)':>10}{'行/秒':>12}")
+    for name, func in (("逐行提交", per_row), ("批量事务", bulk)):
+        elapsed = run(func, cases)
+        print(f"{name:<10}{args.rows:>8}{elapsed:>10.3f}{args.rows / elapsed:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""发票申请表生成基准：对比 load_workbook 逐单元格写入与流式写入
+
+每种方式在独立子进程中运行，记录耗时和常驻内存（RSS）峰值增量，
+并核对两种方式写出的单元格值一致。
+
+用法: python benchmarks/bench_excel.py [--applicants 10000] [--max-rows 1048575]
+"""
+import argparse
+import datetime
+import io
+import multiprocessing
+import os
+import resource
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from openpyxl import load_workbook  # noqa: E402
+
+from documents import INVOICE_MAX_ROWS, INVOICE_TEMPLATE_PATH, render_invoice_files  # noqa: E402
+
+
+def legacy_excel(rows, template_path):
+    """原有做法：载入模板后按单元格坐标逐个赋值，每行重新格式化日期"""
+    wb = load_workbook(template_path)
+    ws = wb.active
+    row_idx = 2
+    for r in rows:
+        ws[f"B{row_idx}"] = r["申请人"]
+        ws[f"C{row_idx}"] = r["统一社会信用代码"]
+        ws[f"G{row_idx}"] = r["总官费"]
+        ws[f"H{row_idx}"] = r["总官费"]
+        ws[f"I{row_idx}"] = r["总计"]
+        ws[f"Q{row_idx}"] = datetime.date.today().strftime("%Y年%m月%d日")
+        row_idx += 1
+
+        ws[f"B{row_idx}"] = r["申请人"]
+        ws[f"C{row_idx}"] = r["统一社会信用代码"]
+        ws[f"G{row_idx}"] = r["总代理费"]
+        ws[f"H{row_idx}"] = r["总代理费"]
+        ws[f"I{row_idx}"] = r["总计"]
+        ws[f"Q{row_idx}"] = datetime.date.today().strftime("%Y年%m月%d日")
+        row_idx += 1
+    output = io.BytesIO()
+    wb.save(output)
+    return [("legacy.xlsx", output.getvalue())]
+
+
+def make_summaries(applicants):
+    return [{
+        "申请人": f"测试科技有限公司{i}",
+        "统一社会信用代码": "91440300MA5ABCDE1X",
+        "总官费": 675 * (i % 5 + 1),
+        "总代理费": 1000 * (i % 5 + 1),
+        "总计": 1675 * (i % 5 + 1),
+    } for i in range(applicants)]
+
+
+def sheet_values(files):
+    values = []
+    for _, data in files:
+        wb = load_workbook(io.BytesIO(data), read_only=True)
+        values.extend(list(wb.active.iter_rows(min_row=2, values_only=True)))
+        wb.close()
+    return values
+
+
+def run_method(name, applicants, max_rows, queue):
+    summaries = make_summaries(applicants)
+    base_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    if name == "legacy":
+        files = legacy_excel(summaries, INVOICE_TEMPLATE_PATH)
+    else:
+        files = render_invoice_files(summaries, max_rows=max_rows)
+    elapsed = time.perf_counter() - start
+    # Linux下 ru_maxrss 单位为KB
+    peak = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - base_rss) * 1024
+    queue.put((elapsed, peak, len(files), sum(len(data) for _, data in files), sheet_values(files)))
+
+
+def measure(name, applicants, max_rows):
+    queue = multiprocessing.Queue()
+    proc = multiprocessing.Process(target=run_method, args=(name, applicants, max_rows, queue))
+    proc.start()
+    result = queue.get()
+    proc.join()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="发票申请表生成基准")
+    parser.add_argument("--applicants", type=int, default=10000)
+    parser.add_argument("--max-rows", type=int, default=INVOICE_MAX_ROWS, help="单个文件的数据行上限")
+    args = parser.parse_args()
+
+    os.chdir(ROOT)
+    results = {}
+    print(f"{'方式':<12}{'耗时(s)':>10}{'RSS增量(MB)':>14}{'文件数':>8}{'输出(MB)':>10}")
+    for label, name in (("逐单元格", "legacy"), ("流式写入", "streaming")):
+        elapsed, peak, count, size, values = results[name] = measure(name, args.applicants, args.max_rows)
+        print(f"{label:<12}{elapsed:>10.2f}{peak / 1e6:>14.1f}{count:>8}{size / 1e6:>10.2f}")
+
+    if results["legacy"][4] != results["streaming"][4]:
+        sys.exit("两种方式写出的单元格值不一致")
+
+
+if __name__ == "__main__":
+    main()
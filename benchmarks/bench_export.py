@@ -0,0 +1,123 @@
+"""历史数据导出基准：对比一次性读入DataFrame导出与分块流式导出
+
+在临时目录中生成合成数据库。每种方式在独立子进程中运行，记录耗时和
+相对于子进程启动时的常驻内存（RSS）峰值增量。计时前先用 Streamlit 的
+下载数据转换函数检查导出结果能否直接交给 st.download_button。
+
+用法: python benchmarks/bench_export.py [--rows 500000] [--formats csv,xlsx]
+"""
+import argparse
+import datetime
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import pandas as pd  # noqa: E402
+from streamlit.runtime.download_data_util import convert_data_to_bytes_and_infer_mime  # noqa: E402
+
+import db  # noqa: E402
+from export import export_cases  # noqa: E402
+
+CASE_TYPES = ["新申请商标", "驳回复审", "商标异议", "撤三申请", "无效宣告"]
+BATCH = 50000
+
+
+def populate(rows):
+    start = datetime.date(2020, 1, 1)
+    for offset in range(0, rows, BATCH):
+        cases = [{
+            "applicant": f"测试科技有限公司{i % 2000}",
+            "unified_credit_code": "91440300MA5ABCDE1X",
+            "case_type": CASE_TYPES[i % len(CASE_TYPES)],
+            "trademark_name": f"商标{i}",
+            "category": str(i % 45 + 1),
+            "official_fee": 270,
+            "agent_fee": 1000,
+            "total_fee": 1270,
+            "processing_date": (start + datetime.timedelta(days=i % 1800)).strftime("%Y-%m-%d"),
+            "original_filename": f"file{i}.pdf",
+            "generated_doc_path": f"/archive/{i % 2000}.docx",
+        } for i in range(offset, min(offset + BATCH, rows))]
+        db.save_cases_with_file(cases, "请款单.docx", "word", "/archive/请款单.docx")
+
+
+def dataframe_csv(query):
+    # 原有做法：全部读入DataFrame后整体编码
+    return pd.read_sql_query("SELECT * FROM cases", db.get_connection()).to_csv(index=False).encode("utf-8")
+
+
+def check_download(fmt, query):
+    """导出结果须能被 st.download_button 接受，且转换得到完整的文件内容"""
+    out = export_cases(fmt, query)
+    try:
+        size = os.fstat(out.fileno()).st_size
+        data, _ = convert_data_to_bytes_and_infer_mime(
+            out, TypeError(f"st.download_button 不支持导出结果的类型 {type(out).__name__}"))
+    finally:
+        out.close()
+    if len(data) != size:
+        raise AssertionError(f"{fmt}: 下载数据 {len(data)} 字节，导出文件 {size} 字节")
+
+
+def run_method(name, query, queue):
+    base_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    if name == "dataframe":
+        size = len(dataframe_csv(query))
+    else:
+        fmt, include_files = name
+        out = export_cases(fmt, query, include_files)
+        size = os.fstat(out.fileno()).st_size
+        out.close()
+    elapsed = time.perf_counter() - start
+    # Linux下 ru_maxrss 单位为KB
+    peak = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - base_rss) * 1024
+    queue.put((elapsed, peak, size))
+
+
+def measure(name, query):
+    queue = multiprocessing.Queue()
+    proc = multiprocessing.Process(target=run_method, args=(name, query, queue))
+    proc.start()
+    result = queue.get()
+    proc.join()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="历史数据导出基准")
+    parser.add_argument("--rows", type=int, default=500000)
+    parser.add_argument("--formats", default="csv,xlsx")
+    args = parser.parse_args()
+
+    query = {"start_date": None, "end_date": None, "applicant": "", "case_type": ""}
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        db.init_database()
+        print(f"生成 {args.rows} 行合成数据...")
+        populate(args.rows)
+
+        for fmt in args.formats.split(","):
+            check_download(fmt, dict(query, applicant="测试科技有限公司1"))
+        db.close_connections()
+
+        runs = [("DataFrame CSV", "dataframe")]
+        for fmt in args.formats.split(","):
+            runs.append((f"流式 {fmt.upper()}", (fmt, False)))
+            runs.append((f"流式 {fmt.upper()}+文件", (fmt, True)))
+
+        print(f"{'方式':<18}{'耗时(s)':>10}{'RSS增量(MB)':>14}{'输出(MB)':>10}")
+        for label, name in runs:
+            elapsed, peak, size = measure(name, query)
+            print(f"{label:<18}{elapsed:>10.2f}{peak / 1e6:>14.1f}{size / 1e6:>10.1f}")
+        os.chdir(ROOT)
+
+
+if __name__ == "__main__":
+    main()
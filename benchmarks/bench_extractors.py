@@ -0,0 +1,173 @@
+"""字段提取（正则部分）微基准
+
+对页面文本语料按案件类型计时，可与基线JSON比较以发现性能回退。
+benchmarks/baseline_extractors.json 为内置合成语料的基线。
+
+语料目录结构为 <语料目录>/<案件类型>/*.txt，每个文件为一份PDF的页面文本，
+页与页之间以换页符 \\f 分隔。未指定语料目录时使用内置的合成语料。
+
+用法:
+    python benchmarks/bench_extractors.py [--corpus DIR] [--baseline FILE] [--save-baseline FILE]
+    python benchmarks/bench_extractors.py --baseline benchmarks/baseline_extractors.json
+    python benchmarks/bench_extractors.py dump --case-type 驳回复审 --out DIR a.pdf b.pdf
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from extractors import extract_case_by_spec, parse_new_application  # noqa: E402
+from patterns import CASE_SPECS  # noqa: E402
+from text_backends import PdfTextReader  # noqa: E402
+
+NEW_APPLICATION = "新申请商标"
+
+# 各案件类型申请书中商标条目的标签（名称、类别、注册号）
+CASE_LABELS = {
+    "驳回复审": ("申请商标", "类别", "申请号/国际注册号"),
+    "撤三申请": ("商标", "类别", "商标注册号"),
+    "商标异议": ("被异议商标", "被异议类别", "商标注册号"),
+    "无效宣告": ("争议商标", "类别", "注册号/国际注册号"),
+}
+CASE_APPLICANT_LABEL = {
+    "驳回复审": "申请人名称",
+    "撤三申请": "申请人名称",
+    "商标异议": "异议人名称",
+    "无效宣告": "申请人名称",
+}
+
+
+def synthetic_case_pages(case_type, trademarks, filler_lines, complete=True):
+    name_label, category_label, number_label = CASE_LABELS[case_type]
+    lines = [f"{case_type}申请书",
+             f"{CASE_APPLICANT_LABEL[case_type]}： 测试科技有限公司 统一社会信用代码：91440300MA5ABCDE1X",
+             "地址： 广东省深圳市南山区"]
+    for i in range(trademarks):
+        lines.append(f"{name_label}： 商标{i} {category_label}： {i % 45 + 1}")
+        lines.extend(f"指定商品/服务 第{j}项" for j in range(filler_lines))
+        # complete=False 时缺少注册号，用于检验匹配失败时的回溯开销
+        if complete:
+            lines.append(f"{number_label}： {10000000 + i}")
+    return ["\n".join(lines)]
+
+
+def synthetic_new_application_pages(trademarks):
+    pages = ["商标注册申请书\n申请人名称(中文)： 测试科技有限公司 (英文) Test Co.\n"
+             "统一社会信用代码：91440300MA5ABCDE1X\n2024年5月6日"]
+    for i in range(trademarks):
+        pages.append(f"类别：{i % 45 + 1}\n商品/服务项目\n" + "\n".join(f"第{j}项" for j in range(30)))
+        pages.append("商 标 代 理 委 托 书\n商标代理委托书\n委托人 测试科技有限公司\n"
+                     f"现委托 北京代理有限公司 代理 商标{i} 商标 的 如下 “商标注册申请”事宜\n"
+                     "2024年5月7日")
+    return pages
+
+
+def synthetic_corpus():
+    corpus = {NEW_APPLICATION: [synthetic_new_application_pages(n) for n in (1, 10, 50)]}
+    for case_type in CASE_SPECS:
+        corpus[case_type] = [
+            synthetic_case_pages(case_type, 1, 5),
+            synthetic_case_pages(case_type, 20, 20),
+            synthetic_case_pages(case_type, 50, 40, complete=False),
+        ]
+    return corpus
+
+
+def load_corpus(corpus_dir):
+    corpus = {}
+    for case_type in sorted(os.listdir(corpus_dir)):
+        case_dir = os.path.join(corpus_dir, case_type)
+        if not os.path.isdir(case_dir):
+            continue
+        docs = []
+        for name in sorted(os.listdir(case_dir)):
+            if name.endswith(".txt"):
+                with open(os.path.join(case_dir, name), encoding="utf-8") as f:
+                    docs.append(f.read().split("\f"))
+        if docs:
+            corpus[case_type] = docs
+    return corpus
+
+
+def run_extraction(case_type, pages):
+    if case_type == NEW_APPLICATION:
+        return parse_new_application(pages, "bench.pdf")
+    return extract_case_by_spec("".join(pages), "bench.pdf", case_type)
+
+
+def bench(corpus, repeat):
+    """返回 {案件类型: 每份文档平均耗时(毫秒，取各轮中位数)}"""
+    results = {}
+    for case_type, docs in corpus.items():
+        rounds = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for pages in docs:
+                run_extraction(case_type, pages)
+            rounds.append((time.perf_counter() - start) * 1000 / len(docs))
+        results[case_type] = statistics.median(rounds)
+    return results
+
+
+def dump(args):
+    out_dir = os.path.join(args.out, args.case_type)
+    os.makedirs(out_dir, exist_ok=True)
+    for pdf_path in args.pdfs:
+        with PdfTextReader(pdf_path) as reader:
+            pages = [reader.page_text(i) for i in range(len(reader))]
+        name = os.path.splitext(os.path.basename(pdf_path))[0] + ".txt"
+        with open(os.path.join(out_dir, name), "w", encoding="utf-8") as f:
+            f.write("\f".join(pages))
+        print(f"已保存 {len(pages)} 页: {os.path.join(out_dir, name)}")
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "dump":
+        parser = argparse.ArgumentParser(description="从PDF导出页面文本语料")
+        parser.add_argument("--case-type", required=True,
+                            choices=[NEW_APPLICATION] + list(CASE_SPECS))
+        parser.add_argument("--out", required=True, help="语料目录")
+        parser.add_argument("pdfs", nargs="+")
+        dump(parser.parse_args(sys.argv[2:]))
+        return
+
+    parser = argparse.ArgumentParser(description="字段提取微基准")
+    parser.add_argument("--corpus", help="语料目录，缺省使用合成语料")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--baseline", help="基线JSON，用于检测性能回退")
+    parser.add_argument("--save-baseline", help="将本次结果保存为基线JSON")
+    parser.add_argument("--tolerance", type=float, default=1.5,
+                        help="超过基线耗时的倍数即视为回退")
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus) if args.corpus else synthetic_corpus()
+    results = bench(corpus, args.repeat)
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    regressions = []
+    print(f"{'案件类型':<10}{'文档数':>8}{'耗时(ms/份)':>14}{'基线':>10}")
+    for case_type, elapsed in results.items():
+        base = baseline.get(case_type)
+        base_str = f"{base:.3f}" if base is not None else "-"
+        print(f"{case_type:<10}{len(corpus[case_type]):>8}{elapsed:>14.3f}{base_str:>10}")
+        if base is not None and elapsed > base * args.tolerance:
+            regressions.append(case_type)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+    if regressions:
+        sys.exit(f"性能回退: {', '.join(regressions)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+"""全流程基准：合成PDF → 提取 → 请款单 → 发票申请表 → 入库
+
+不经过Streamlit页面，直接调用 pipeline 中的各步骤。每个阶段在单独的子进程
+中运行，阶段之间的结果以 pickle 文件传递，因此各阶段的峰值内存互不影响
+（含该阶段进程池中的子进程）。报告每个阶段的吞吐量、单项耗时的 p50/p95
+和峰值RSS，并可与基线JSON比较以在部署前发现性能回退：
+
+- 提取：每份PDF一项，耗时取 extract.file
+- Word：每份请款单一项，耗时取 word.render
+- Excel：每批发票申请表一项
+- 数据库：每批保存（写入存储并入库）一项，每轮使用新的数据库和存储目录；
+  保存后从存储中读回每个文件（--compression 指定压缩方式）并核对内容
+
+未指定 --corpus 时先用 synthetic_pdfs.py 在临时目录中生成语料（同样在子进程中，
+Linux 下峰值RSS会被 exec 出的子进程继承）。
+
+benchmarks/baseline_pipeline.json 为默认参数（合成语料、4个进程、3轮）下的基线，
+在单核机器上测得；换用其他机器时先用 --save-baseline 重新生成。
+
+用法: python benchmarks/bench_pipeline.py [--corpus DIR] [--pages 2,10,50,200,500] [--copies 1]
+      [--workers 4] [--repeat 3] [--compression {gzip,zstd}]
+      [--baseline FILE] [--save-baseline FILE] [--tolerance 1.5]
+"""
+import argparse
+import json
+import os
+import pickle
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from synthetic_pdfs import CASE_TYPES, NEW_APPLICATION  # noqa: E402
+
+STAGES = ("extract", "word", "excel", "db")
+STAGE_NAMES = {"extract": "提取", "word": "Word", "excel": "Excel", "db": "数据库"}
+# 流水线按新申请和案件类两种方式处理
+PIPELINE_CASE_TYPE = {case_type: "新申请商标" if case_type == NEW_APPLICATION else "案件类商标"
+                      for case_type in CASE_TYPES}
+
+
+def load_corpus(corpus_dir):
+    """读取 <语料目录>/<案件类型>/*.pdf，返回 {流水线案件类型: [PDF路径, ...]}"""
+    corpus = {}
+    for case_type in CASE_TYPES:
+        case_dir = os.path.join(corpus_dir, case_type)
+        if not os.path.isdir(case_dir):
+            continue
+        paths = sorted(os.path.join(case_dir, name) for name in os.listdir(case_dir)
+                       if name.lower().endswith(".pdf"))
+        corpus.setdefault(PIPELINE_CASE_TYPE[case_type], []).extend(paths)
+    return corpus
+
+
+def percentile(values, q):
+    """最近秩法百分位数"""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    rank = max(1, -(-len(ordered) * q // 100))
+    return ordered[int(rank) - 1]
+
+
+def span_ms(result, name):
+    spans = (result.get("metrics") or {}).get("spans", {})
+    return spans[name][1] / 1e6 if name in spans else None
+
+
+def run_extract(workdir, workers, repeat, compression):
+    from extraction_pool import extract_files
+    from pipeline import aggregate_results, build_jobs
+
+    with open(os.path.join(workdir, "corpus.pkl"), "rb") as f:
+        corpus = pickle.load(f)
+    latencies, rounds, jobs = [], [], {}
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for case_type, paths in corpus.items():
+            def on_progress(done, total, result):
+                if result["error"]:
+                    raise RuntimeError(f"{result['filename']}: {result['error']}")
+                latencies.append(span_ms(result, "extract.file"))
+
+            results = extract_files(paths, case_type, workers, on_progress)
+            jobs[case_type], errors = build_jobs(aggregate_results(results, case_type))
+            if errors:
+                raise RuntimeError(f"计算费用出错: {errors[0][1]}")
+        rounds.append(time.perf_counter() - start)
+    with open(os.path.join(workdir, "extract.pkl"), "wb") as f:
+        pickle.dump(jobs, f)
+    return sum(map(len, corpus.values())), latencies, rounds
+
+
+def run_word(workdir, workers, repeat, compression):
+    from pipeline import generate_word_docs
+
+    with open(os.path.join(workdir, "extract.pkl"), "rb") as f:
+        jobs = pickle.load(f)
+    latencies, rounds, word_docs = [], [], {}
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for case_type, case_jobs in jobs.items():
+            word_docs[case_type], errors = generate_word_docs(
+                case_jobs, case_type, workers,
+                lambda done, total, result: latencies.append(span_ms(result, "word.render")))
+            if errors:
+                raise RuntimeError(f"{errors[0][0]}: {errors[0][1]}")
+        rounds.append(time.perf_counter() - start)
+    with open(os.path.join(workdir, "word.pkl"), "wb") as f:
+        pickle.dump(word_docs, f)
+    return sum(map(len, jobs.values())), latencies, rounds
+
+
+def run_excel(workdir, workers, repeat, compression):
+    from pipeline import generate_invoices
+
+    with open(os.path.join(workdir, "word.pkl"), "rb") as f:
+        word_docs = pickle.load(f)
+    latencies, rounds, excel_files = [], [], {}
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for case_type, docs in word_docs.items():
+            item_start = time.perf_counter()
+            excel_files[case_type] = generate_invoices(docs)
+            latencies.append((time.perf_counter() - item_start) * 1000)
+        rounds.append(time.perf_counter() - start)
+    with open(os.path.join(workdir, "excel.pkl"), "wb") as f:
+        pickle.dump(excel_files, f)
+    return len(word_docs), latencies, rounds
+
+
+def run_db(workdir, workers, repeat, compression):
+    from db import init_database
+    from pipeline import save_results
+    from storage import BlobStore
+
+    with open(os.path.join(workdir, "word.pkl"), "rb") as f:
+        word_docs = pickle.load(f)
+    with open(os.path.join(workdir, "excel.pkl"), "rb") as f:
+        excel_files = pickle.load(f)
+    latencies, rounds = [], []
+    for n in range(repeat):
+        round_dir = os.path.join(workdir, f"db-{n}")
+        db_path = os.path.join(round_dir, "trademark_data.db")
+        os.makedirs(round_dir)
+        init_database(db_path)
+        store = BlobStore(os.path.join(round_dir, "generated_files"), compression)
+        saved = []
+        start = time.perf_counter()
+        for case_type, docs in word_docs.items():
+            # save_results 会为文件补充存储路径，每轮使用新的副本
+            docs = [(job, dict(file)) for job, file in docs]
+            files = [dict(file) for file in excel_files[case_type]]
+            item_start = time.perf_counter()
+            save_results(docs, files, store, db_path)
+            latencies.append((time.perf_counter() - item_start) * 1000)
+            saved.extend([file for _, file in docs] + files)
+        rounds.append(time.perf_counter() - start)
+        # 与下载历史文件相同，按哈希读回（不计时）
+        for file in saved:
+            if store.read(file["blob_hash"]) != file["data"]:
+                raise RuntimeError(f"{file['name']}: 从存储读回的内容与原文件不一致")
+    return len(word_docs), latencies, rounds
+
+
+RUNNERS = {"extract": run_extract, "word": run_word, "excel": run_excel, "db": run_db}
+
+
+def peak_rss_mb():
+    """本进程及已结束的子进程（进程池）中最大的常驻内存，Linux 下单位为KB"""
+    return max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss) / 1024
+
+
+def child(stage, workdir, workers, repeat, compression):
+    os.chdir(ROOT)
+    items, latencies, rounds = RUNNERS[stage](workdir, workers, repeat, compression)
+    latencies = [ms for ms in latencies if ms is not None]
+    elapsed = sorted(rounds)[len(rounds) // 2]
+    result = {
+        "items": items,
+        "throughput": items / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+    with open(os.path.join(workdir, f"{stage}.json"), "w", encoding="utf-8") as f:
+        json.dump(result, f)
+
+
+def run_stage(stage, workdir, workers, repeat, compression):
+    command = [sys.executable, os.path.abspath(__file__), "--child", stage, "--workdir", workdir,
+               "--workers", str(workers), "--repeat", str(repeat)]
+    if compression:
+        command += ["--compression", compression]
+    subprocess.run(command, check=True)
+    with open(os.path.join(workdir, f"{stage}.json"), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def regressions_of(result, base, tolerance):
+    """超出基线容差的指标：耗时和内存不得高于基线的 tolerance 倍，吞吐量不得低于 1/tolerance"""
+    found = [key for key in ("p50_ms", "p95_ms", "peak_rss_mb")
+             if key in base and result[key] > base[key] * tolerance]
+    if "throughput" in base and result["throughput"] < base["throughput"] / tolerance:
+        found.append("throughput")
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description="全流程基准")
+    parser.add_argument("--corpus", help="PDF语料目录（<目录>/<案件类型>/*.pdf），缺省生成合成语料")
+    parser.add_argument("--pages", default="2,10,50,200,500", help="合成PDF的页数")
+    parser.add_argument("--copies", type=int, default=1, help="每种页数生成的份数")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--compression", choices=["gzip", "zstd"], help="数据库阶段存储文件的压缩方式")
+    parser.add_argument("--baseline", help="基线JSON，用于检测性能回退")
+    parser.add_argument("--save-baseline", help="将本次结果保存为基线JSON")
+    parser.add_argument("--tolerance", type=float, default=1.5,
+                        help="耗时、内存超过基线或吞吐量低于基线的倍数即视为回退")
+    parser.add_argument("--child", choices=STAGES, help=argparse.SUPPRESS)
+    parser.add_argument("--workdir", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child, args.workdir, args.workers, args.repeat, args.compression)
+        return
+
+    with tempfile.TemporaryDirectory(prefix="bench_pipeline-") as workdir:
+        if args.corpus:
+            corpus = load_corpus(args.corpus)
+        else:
+            start = time.perf_counter()
+            corpus_dir = os.path.join(workdir, "corpus")
+            subprocess.run([sys.executable, os.path.join(ROOT, "benchmarks", "synthetic_pdfs.py"),
+                            "--out", corpus_dir, "--pages", args.pages, "--copies", str(args.copies)],
+                           check=True, stdout=subprocess.DEVNULL)
+            corpus = load_corpus(corpus_dir)
+            print(f"已生成 {sum(map(len, corpus.values()))} 份合成PDF，"
+                  f"耗时 {time.perf_counter() - start:.1f}s")
+        if not corpus:
+            sys.exit("语料目录中没有PDF")
+        with open(os.path.join(workdir, "corpus.pkl"), "wb") as f:
+            pickle.dump(corpus, f)
+        results = {stage: run_stage(stage, workdir, args.workers, args.repeat, args.compression)
+                   for stage in STAGES}
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    regressions = []
+    print(f"{'阶段':<8}{'项数':>6}{'吞吐(项/s)':>12}{'p50(ms)':>10}{'p95(ms)':>10}"
+          f"{'峰值RSS(MB)':>13}{'基线p95':>10}")
+    for stage, result in results.items():
+        base = baseline.get(stage, {})
+        base_str = f"{base['p95_ms']:.1f}" if "p95_ms" in base else "-"
+        print(f"{STAGE_NAMES[stage]:<8}{result['items']:>6}{result['throughput']:>12.2f}"
+              f"{result['p50_ms']:>10.1f}{result['p95_ms']:>10.1f}{result['peak_rss_mb']:>13.1f}"
+              f"{base_str:>10}")
+        regressions.extend(f"{STAGE_NAMES[stage]}.{key}"
+                           for key in regressions_of(result, base, args.tolerance))
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+    if regressions:
+        sys.exit(f"性能回退: {', '.join(regressions)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""记录模型内存基准：对比原有中文键字典与 records.Batch
+
+以合成的提取结果（每份文件一个申请人）构造一批商标，分别按原有做法
+（applicant_map + extracted_data，生成时逐申请人重新扫描 extracted_data
+展开记录）和 Batch + build_jobs 处理，报告聚合后常驻内存、计算费用后
+常驻内存、过程峰值（tracemalloc）和耗时，并核对两者的请款单记录一致。
+
+另外对比新申请页面每次重新运行时查找待输入类别商标的耗时：原有做法在
+提取结果中逐申请人扫描全部文件（O(申请人×文件)），Batch 直接读取索引。
+
+用法: python benchmarks/bench_records.py [--trademarks 10000] [--per-file 10]
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pipeline import DEFAULT_AGENT_FEE, OFFICIAL_FEES, aggregate_results, build_jobs  # noqa: E402
+from records import MANUAL_CATEGORY  # noqa: E402
+
+
+def make_results(trademarks, per_file, case_type):
+    results = []
+    for n in range(-(-trademarks // per_file)):
+        data = {
+            "申请人": f"测试科技有限公司{n}",
+            "统一社会信用代码": f"91440300MA{n:08d}",
+            "商标列表": [{"商标名称": f"商标{n}-{i}",
+                      # 新申请中每10件有1件需要手动输入类别
+                      "类别": MANUAL_CATEGORY if case_type == "新申请商标" and i % 10 == 0 else i % 45 + 1}
+                     for i in range(min(per_file, trademarks - n * per_file))],
+        }
+        if case_type != "新申请商标":
+            data["案件类型"] = "驳回复审"
+        results.append({"filename": f"文件{n}.pdf", "data": data, "error": None})
+    return results
+
+
+def legacy_aggregate(results, case_type):
+    """原有做法：每件商标一个字典，信用代码复制到每条记录"""
+    applicant_map = defaultdict(list)
+    extracted_data = []
+    for result in results:
+        data = result["data"]
+        for tm in data["商标列表"]:
+            if tm["类别"] == MANUAL_CATEGORY:
+                continue
+            record_type = "商标注册申请" if case_type == "新申请商标" else data["案件类型"]
+            applicant_map[data["申请人"]].append({
+                "商标名称": tm["商标名称"],
+                "类别": tm["类别"],
+                "案件类型": record_type,
+                "官费": OFFICIAL_FEES["新申请商标" if case_type == "新申请商标" else record_type],
+                "统一社会信用代码": data["统一社会信用代码"],
+                "original_filename": result["filename"],
+            })
+        extracted_data.append(data)
+    return dict(applicant_map), extracted_data
+
+
+def legacy_build_jobs(applicant_map, extracted_data, case_type, manual_categories):
+    """原有做法：新申请逐申请人重新扫描全部提取结果展开记录"""
+    jobs = []
+    for applicant, records in applicant_map.items():
+        code = records[0]["统一社会信用代码"]
+        processed = []
+        if case_type == "新申请商标":
+            for data in extracted_data:
+                if data["申请人"] != applicant:
+                    continue
+                for tm in data["商标列表"]:
+                    if tm["类别"] == MANUAL_CATEGORY:
+                        text = manual_categories.get((applicant, tm["商标名称"]), "")
+                        categories = [cat.strip() for cat in text.split(",") if cat.strip()]
+                    else:
+                        categories = [tm["类别"]]
+                    for cat in categories:
+                        processed.append({"商标名称": tm["商标名称"], "类别": cat, "案件类型": "商标注册申请",
+                                          "官费": OFFICIAL_FEES["新申请商标"], "代理费": DEFAULT_AGENT_FEE,
+                                          "统一社会信用代码": code, "original_filename": "未知文件"})
+        else:
+            for record in records:
+                record["代理费"] = DEFAULT_AGENT_FEE
+                processed.append(record)
+        jobs.append((applicant, processed))
+    return jobs
+
+
+def legacy_rerun(applicant_map, extracted_data):
+    """原有做法中一次页面重新运行的查找：提取结果逐申请人扫描，设置参数和生成各扫描一遍"""
+    found = []
+    for applicant in applicant_map:
+        found.extend(name for data in extracted_data if data["申请人"] == applicant
+                     for name in (tm["商标名称"] for tm in data["商标列表"] if tm["类别"] == MANUAL_CATEGORY))
+    for _ in range(2):
+        found.extend(tm["商标名称"] for data in extracted_data for tm in data["商标列表"]
+                     if tm["类别"] == MANUAL_CATEGORY)
+    return found
+
+
+def batch_rerun(batch):
+    found = []
+    for group in batch.applicants.values():
+        found.extend(group.pending)
+    found.extend(name for _, name, _ in batch.pending_manual())
+    return found
+
+
+def timed(func, repeat=20):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) * 1000 / repeat
+
+
+def measure(func):
+    """返回 (结果, 常驻内存MB, 峰值MB, 耗时秒)；常驻内存为调用后仍被引用的分配
+
+    tracemalloc 会明显拖慢分配，耗时取另一次不跟踪内存的调用。
+    """
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    result = func()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current / 1e6, peak / 1e6, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="记录模型内存基准")
+    parser.add_argument("--trademarks", type=int, default=10000)
+    parser.add_argument("--per-file", type=int, default=10, help="每份文件（申请人）的商标数")
+    args = parser.parse_args()
+
+    print(f"{'案件类型':<10}{'方式':<8}{'聚合后(MB)':>12}{'计费后(MB)':>12}{'峰值(MB)':>10}{'耗时(ms)':>10}")
+    for case_type in ("案件类商标", "新申请商标"):
+        results = make_results(args.trademarks, args.per_file, case_type)
+        manual = {(r["data"]["申请人"], tm["商标名称"]): "9,35"
+                  for r in results for tm in r["data"]["商标列表"] if tm["类别"] == MANUAL_CATEGORY}
+
+        (applicant_map, extracted_data), legacy_mb, legacy_peak, legacy_time = measure(
+            lambda: legacy_aggregate(results, case_type))
+        legacy_jobs, legacy_jobs_mb, peak, elapsed = measure(
+            lambda: legacy_build_jobs(applicant_map, extracted_data, case_type, manual))
+        print(f"{case_type:<10}{'字典':<8}{legacy_mb:>12.2f}{legacy_mb + legacy_jobs_mb:>12.2f}"
+              f"{max(legacy_peak, legacy_mb + peak):>10.2f}{(legacy_time + elapsed) * 1000:>10.1f}")
+
+        batch, batch_mb, batch_peak, batch_time = measure(lambda: aggregate_results(results, case_type))
+        for (applicant, trademark_name), text in manual.items():
+            batch.set_categories(applicant, trademark_name, text)
+        (jobs, errors), jobs_mb, peak, elapsed = measure(lambda: build_jobs(batch))
+        print(f"{'':<10}{'Batch':<8}{batch_mb:>12.2f}{batch_mb + jobs_mb:>12.2f}"
+              f"{max(batch_peak, batch_mb + peak):>10.2f}{(batch_time + elapsed) * 1000:>10.1f}")
+
+        expected = [(applicant, [(r["商标名称"], r["类别"], r["官费"], r["代理费"]) for r in records])
+                    for applicant, records in legacy_jobs]
+        actual = [(job.applicant, [(r.trademark_name, r.category, r.official_fee, r.agent_fee)
+                                   for r in job.records]) for job in jobs]
+        if errors or actual != expected:
+            sys.exit(f"{case_type}: 两种方式计算的请款单记录不一致")
+
+        if case_type == "新申请商标":
+            print(f"\n重新运行查找待输入类别商标: 扫描提取结果 "
+                  f"{timed(lambda: legacy_rerun(applicant_map, extracted_data)):.2f} ms，"
+                  f"读取索引 {timed(lambda: batch_rerun(batch)):.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""页面启动与重新运行开销基准
+
+Streamlit 每次交互都会重新执行 app.py。对比：
+- 冷启动：子进程中导入页面依赖的模块并完成首次运行，分别按原有做法
+  （启动时即导入 pandas、openpyxl、python-docx、pdfplumber、PyMuPDF）
+  和按需导入测量；
+- 空操作交互：把侧边栏功能选择设为当前值后重新运行的耗时。原有做法每次
+  重新运行还要执行 init_database() 和模板文件检查，这部分单独计时，
+  “原有做法” 一行为两者之和。
+
+在临时目录中运行（复制模板文件，使用临时数据库），不影响工作目录下的数据。
+
+用法: python benchmarks/bench_startup.py [--repeats 5] [--reruns 50]
+"""
+import argparse
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# 原有做法在导入页面模块时一并导入的第三方库
+HEAVY_MODULES = ("pandas", "openpyxl", "docx", "pdfplumber", "pymupdf")
+# 页面直接导入的项目模块
+APP_MODULES = ("extraction_pool", "text_backends", "extraction_cache", "db", "export",
+               "documents", "pipeline", "storage")
+APP_PATH = os.path.join(ROOT, "app.py")
+# 模板文件名（与 documents.py 一致；冷启动测量前不导入项目模块）
+TEMPLATES = ("请款单模板.docx", "发票申请表.xlsx")
+
+
+def make_workdir():
+    workdir = tempfile.mkdtemp(prefix="bench_startup_")
+    for name in TEMPLATES:
+        shutil.copy(os.path.join(ROOT, name), workdir)
+    return workdir
+
+
+def cold_start(eager):
+    """在子进程中测量 (导入耗时, 首次运行耗时)，单位秒"""
+    workdir = make_workdir()
+    try:
+        output = subprocess.run(
+            [sys.executable, __file__, "--child", "eager" if eager else "lazy"],
+            cwd=workdir, check=True, capture_output=True, text=True,
+        ).stdout
+    finally:
+        shutil.rmtree(workdir)
+    imports, first_run = map(float, output.split())
+    return imports, first_run
+
+
+def child(mode):
+    start = time.perf_counter()
+    if mode == "eager":
+        for name in HEAVY_MODULES:
+            __import__(name)
+    from streamlit.testing.v1 import AppTest
+    for name in APP_MODULES:
+        __import__(name)
+    imports = time.perf_counter() - start
+
+    start = time.perf_counter()
+    at = AppTest.from_file(APP_PATH, default_timeout=120)
+    at.run()
+    if at.exception:
+        sys.exit(at.exception[0].value)
+    print(imports, time.perf_counter() - start)
+
+
+def rerun_latency(reruns):
+    """返回每次空操作交互的耗时列表（秒）"""
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(APP_PATH, default_timeout=120)
+    at.run()
+    selectbox = next(s for s in at.selectbox if s.label == "选择功能")
+    timings = []
+    for _ in range(reruns):
+        start = time.perf_counter()
+        selectbox.set_value(selectbox.value).run()
+        timings.append(time.perf_counter() - start)
+        if at.exception:
+            sys.exit(at.exception[0].value)
+        selectbox = next(s for s in at.selectbox if s.label == "选择功能")
+    return timings
+
+
+def removed_work(reruns):
+    """原有做法每次重新运行都要执行的初始化和模板检查的平均耗时（秒）"""
+    from db import init_database
+
+    start = time.perf_counter()
+    for _ in range(reruns):
+        init_database()
+        for name in TEMPLATES:
+            os.path.exists(name)
+    return (time.perf_counter() - start) / reruns
+
+
+def main():
+    parser = argparse.ArgumentParser(description="页面启动与重新运行开销基准")
+    parser.add_argument("--repeats", type=int, default=5, help="冷启动测量次数（取中位数）")
+    parser.add_argument("--reruns", type=int, default=50, help="空操作交互次数")
+    parser.add_argument("--child", choices=("eager", "lazy"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child)
+        return
+
+    print(f"{'冷启动':<12}{'导入(ms)':>10}{'首次运行(ms)':>14}{'合计(ms)':>10}")
+    for name, eager in (("原有做法", True), ("按需导入", False)):
+        samples = [cold_start(eager) for _ in range(args.repeats)]
+        imports = statistics.median(s[0] for s in samples) * 1000
+        first_run = statistics.median(s[1] for s in samples) * 1000
+        print(f"{name:<12}{imports:>10.0f}{first_run:>14.0f}{imports + first_run:>10.0f}")
+
+    workdir = make_workdir()
+    os.chdir(workdir)
+    try:
+        timings = rerun_latency(args.reruns)
+        extra = removed_work(args.reruns)
+    finally:
+        os.chdir(ROOT)
+        shutil.rmtree(workdir)
+    p50 = statistics.median(timings) * 1000
+    print(f"\n{'空操作交互':<12}{'p50(ms)':>10}{'平均(ms)':>10}")
+    print(f"{'原有做法':<12}{p50 + extra * 1000:>10.1f}{statistics.mean(timings) * 1000 + extra * 1000:>10.1f}")
+    print(f"{'缓存初始化':<12}{p50:>10.1f}{statistics.mean(timings) * 1000:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
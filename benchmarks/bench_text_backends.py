@@ -0,0 +1,59 @@
+"""比较各文本提取后端的吞吐量（页/秒）
+
+用法: python benchmarks/bench_text_backends.py <PDF文件或目录> [...] [--repeat N]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from text_backends import BACKENDS, PdfTextReader  # noqa: E402
+
+
+def collect_pdfs(paths):
+    pdfs = []
+    for path in paths:
+        if os.path.isdir(path):
+            pdfs.extend(os.path.join(path, name) for name in sorted(os.listdir(path))
+                        if name.lower().endswith(".pdf"))
+        else:
+            pdfs.append(path)
+    return pdfs
+
+
+def bench_backend(backend, pdfs, repeat):
+    pages = 0
+    fallback_pages = 0
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for pdf_path in pdfs:
+            with PdfTextReader(pdf_path, backend) as reader:
+                for i in range(len(reader)):
+                    reader.page_text(i)
+                pages += len(reader)
+                fallback_pages += reader.fallback_pages
+    elapsed = time.perf_counter() - start
+    return pages, fallback_pages, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("paths", nargs="+", help="PDF文件或包含PDF的目录")
+    parser.add_argument("--repeat", type=int, default=3, help="重复次数")
+    args = parser.parse_args()
+
+    pdfs = collect_pdfs(args.paths)
+    if not pdfs:
+        sys.exit("未找到PDF文件")
+
+    print(f"{'后端':<12}{'页数':>8}{'回退页':>8}{'耗时(s)':>10}{'页/秒':>10}")
+    for backend in BACKENDS:
+        pages, fallback_pages, elapsed = bench_backend(backend, pdfs, args.repeat)
+        rate = pages / elapsed if elapsed else float("inf")
+        print(f"{backend:<12}{pages:>8}{fallback_pages:>8}{elapsed:>10.3f}{rate:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""Word请款单生成基准：对比逐份解析模板与缓存模板的吞吐量（份/秒）
+
+同时核对两种方式生成的段落和表格文字一致。原有做法对每个文字块赋值，
+会清掉模板中同一文字块里的图片和线条；缓存模板只改写含占位符的文字块。
+
+另外核对按原型行批量写表格与逐行 add_row() 生成的正文XML逐字节相同，
+并对比两者在 500~5000 行时的耗时。
+
+用法: python benchmarks/bench_word.py [--applicants 500] [--trademarks 5] [--rows 500,1000,2000,5000]
+"""
+import argparse
+import datetime
+import io
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from docx import Document  # noqa: E402
+
+from docx.opc.oxml import serialize_part_xml  # noqa: E402
+
+from documents import WORD_TEMPLATE_PATH, get_word_template, number_to_upper, render_word_doc  # noqa: E402
+from records import TrademarkRecord  # noqa: E402
+
+
+def legacy_word_doc(applicant, records, case_type, template_path):
+    """原有做法：每份文档重新解析模板，逐个文字块链式替换，python-docx整体保存"""
+    doc = Document(template_path)
+    case_types = ["商标注册申请"] if case_type == "新申请商标" else list({r.case_type for r in records})
+    case_type_str = "、".join(case_types)
+    total_official = sum(r.official_fee for r in records)
+    total_agent = sum(r.agent_fee for r in records)
+    total = total_official + total_agent
+    today_str = datetime.date.today().strftime("%Y年%m月%d日")
+    for para in doc.paragraphs:
+        for run in para.runs:
+            run.text = run.text.replace("{申请人}", applicant) \
+                               .replace("{事宜类型}", case_type_str) \
+                               .replace("{日期}", today_str) \
+                               .replace("{总官费}", str(total_official)) \
+                               .replace("{总代理费}", str(total_agent)) \
+                               .replace("{总计}", str(total)) \
+                               .replace("{大写}", number_to_upper(total))
+    table = doc.tables[0]
+    for tr in table._tbl.tr_lst[1:]:
+        table._tbl.remove(tr)
+    for idx, rec in enumerate(records, 1):
+        row = table.add_row().cells
+        row[0].text = str(idx)
+        row[1].text = rec.case_type if case_type != "新申请商标" else "商标注册申请"
+        row[2].text = rec.trademark_name
+        row[3].text = str(rec.category)
+        row[4].text = f"{rec.official_fee}"
+        row[5].text = f"{rec.agent_fee}"
+        row[6].text = f"{rec.total_fee}"
+    total_row = table.add_row().cells
+    total_row[0].merge(total_row[3])
+    total_row[0].text = "合计"
+    total_row[4].text = f"{total_official}"
+    total_row[5].text = f"{total_agent}"
+    total_row[6].text = f"{total}"
+    out = io.BytesIO()
+    doc.save(out)
+    return out.getvalue()
+
+
+def make_batch(applicants, trademarks):
+    return [(f"测试科技有限公司{a}", [
+        TrademarkRecord(f"商标{a}-{i}", i % 45 + 1, "驳回复审", 675, agent_fee=1000)
+        for i in range(trademarks)]) for a in range(applicants)]
+
+
+def proxy_table(doc, rows, total_row):
+    """原有做法：通过 python-docx 代理对象逐行 add_row() 并逐个单元格赋值"""
+    table = doc.tables[0]
+    for tr in table._tbl.tr_lst[1:]:
+        table._tbl.remove(tr)
+    for values in rows:
+        cells = table.add_row().cells
+        for cell, value in zip(cells, values):
+            cell.text = value
+    cells = table.add_row().cells
+    cells[0].merge(cells[3])
+    for idx, value in zip((0, 4, 5, 6), total_row):
+        cells[idx].text = value
+
+
+def table_rows(count):
+    rows = [(str(i), "驳回复审", f"商标{i}", str(i % 45 + 1), "675", "1000", "1675") for i in range(1, count + 1)]
+    # 含首尾空格、制表符和换行的商标名称
+    rows[0] = ("1", "驳回复审", " 前后空格 ", "9", "675", "1000", "1675")
+    if count > 1:
+        rows[1] = ("2", "驳回复审", "制表\t换行\n名称", "35", "675", "1000", "1675")
+    return rows, ("合计", "675", "1000", str(1675 * count))
+
+
+def timed_table(fill, template, rows, total_row):
+    doc = template.new_document()
+    start = time.perf_counter()
+    fill(doc, rows, total_row)
+    return time.perf_counter() - start, serialize_part_xml(doc.element)
+
+
+def visible_content(data):
+    doc = Document(io.BytesIO(data))
+    return ([p.text for p in doc.paragraphs],
+            [[cell.text for cell in row.cells] for table in doc.tables for row in table.rows])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Word请款单生成基准")
+    parser.add_argument("--applicants", type=int, default=500)
+    parser.add_argument("--trademarks", type=int, default=5, help="每个申请人的商标数")
+    parser.add_argument("--rows", default="500,1000,2000,5000", help="单份请款单表格行数")
+    args = parser.parse_args()
+
+    os.chdir(ROOT)
+    batch = make_batch(args.applicants, args.trademarks)
+
+    legacy = legacy_word_doc(*batch[0], "案件类商标", WORD_TEMPLATE_PATH)
+    cached = render_word_doc(*batch[0], "案件类商标")[1]
+    if visible_content(legacy) != visible_content(cached):
+        sys.exit("两种方式生成的文档内容不一致")
+
+    print(f"{'方式':<12}{'份数':>8}{'耗时(s)':>10}{'份/秒':>10}")
+    for name, func in (
+            ("逐份解析", lambda a, r: legacy_word_doc(a, r, "案件类商标", WORD_TEMPLATE_PATH)),
+            ("缓存模板", lambda a, r: render_word_doc(a, r, "案件类商标"))):
+        start = time.perf_counter()
+        for applicant, records in batch:
+            func(applicant, records)
+        elapsed = time.perf_counter() - start
+        print(f"{name:<12}{len(batch):>8}{elapsed:>10.2f}{len(batch) / elapsed:>10.1f}")
+
+    template = get_word_template()
+    print(f"\n{'行数':<8}{'add_row(s)':>12}{'原型行(s)':>12}{'每行(ms)':>10}")
+    for count in map(int, args.rows.split(",")):
+        rows, total_row = table_rows(count)
+        proxy_time, expected = timed_table(proxy_table, template, rows, total_row)
+        bulk_time, actual = timed_table(template.fill_table, template, rows, total_row)
+        if actual != expected:
+            sys.exit(f"{count} 行时原型行写出的正文XML与 add_row() 不一致")
+        print(f"{count:<8}{proxy_time:>12.3f}{bulk_time:>12.3f}{bulk_time / count * 1000:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
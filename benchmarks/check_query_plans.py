@@ -0,0 +1,116 @@
+"""检查历史数据查询页面的各条查询（及生成前的重复请款检查）都使用索引
+
+在临时数据库中写入合成数据并执行迁移，然后用 EXPLAIN QUERY PLAN 检查
+每条查询：案件分页和计数、关联文件的计数和分页、费用汇总。任何查询对
+cases 或 generated_files 做全表扫描、或分页排序需要临时B树时以非零状态
+退出。关联文件按文件去重（GROUP BY）后再排序，排序的是去重后的文件而
+不是表中的行，允许使用临时B树；费用汇总读取按月、申请人、案件类型聚合
+的 fee_summary，行数远少于 cases，按申请人模糊匹配时允许扫描。
+
+用法: python benchmarks/check_query_plans.py [--rows 20000]
+"""
+import argparse
+import datetime
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db  # noqa: E402
+
+CASE_TYPES = ["新申请商标", "驳回复审", "商标异议", "撤三申请", "无效宣告"]
+
+
+def populate(db_path, rows):
+    start = datetime.date(2020, 1, 1)
+    cases = [{
+        "applicant": f"测试科技有限公司{i % 500}",
+        "unified_credit_code": "91440300MA5ABCDE1X",
+        "case_type": CASE_TYPES[i % len(CASE_TYPES)],
+        "trademark_name": f"商标{i}",
+        "category": str(i % 45 + 1),
+        "official_fee": 270,
+        "agent_fee": 1000,
+        "total_fee": 1270,
+        "processing_date": (start + datetime.timedelta(days=i % 1500)).strftime("%Y-%m-%d"),
+        "original_filename": f"file{i}.pdf",
+        "generated_doc_path": f"/tmp/{i % 500}.docx",
+        "registration_number": None if i % len(CASE_TYPES) == 0 else str(10000000 + i),
+    } for i in range(rows)]
+    db.save_cases_with_file(cases, "请款单.docx", "word", "/tmp/请款单.docx", db_path=db_path)
+    db.get_connection(db_path).execute("ANALYZE")
+
+
+def history_queries(conn):
+    """历史页面实际发出的查询（与 db.get_filtered_cases 使用同一构造函数）"""
+    end = datetime.date(2023, 12, 31)
+    start = end - datetime.timedelta(days=30)
+    filters = {
+        "日期范围": (start, end, "", ""),
+        "日期+案件类型": (start, end, "", "驳回复审"),
+        "日期+申请人": (start, end, "测试科技有限公司1", ""),
+        "申请人": (None, None, "测试科技有限公司1", ""),
+        "商标名称": (None, None, "", "", "商标123"),
+    }
+    queries = {name: db.build_filtered_cases_query(*args, conn=conn) for name, args in filters.items()}
+    queries["分页首页"] = db.build_cases_page_query(start, end, "", "", conn=conn)
+    queries["分页后续页"] = db.build_cases_page_query(start, end, "", "驳回复审",
+                                                 cursor=("2023-12-20", 15000), conn=conn)
+    queries["案件总数"] = db.build_count_query(*db.build_filtered_cases_query(start, end, "", "", conn=conn))
+    queries["申请人案件总数"] = db.build_count_query(
+        *db.build_filtered_cases_query(None, None, "测试科技有限公司1", "", conn=conn))
+    queries["文件总数"] = db.build_count_query(*db.build_filtered_files_query(start, end, "", "", conn=conn))
+    queries["文件分页"] = db.build_files_page_query(start, end, "", "", limit=20, offset=20, conn=conn)
+    queries["申请人文件分页"] = db.build_files_page_query(None, None, "测试科技有限公司1", "",
+                                                   limit=20, conn=conn)
+    for group_by in db.SUMMARY_GROUPS:
+        queries[f"费用汇总({group_by})"] = db.build_fee_summary_query(group_by, start, end)
+    queries["申请人费用汇总"] = db.build_fee_summary_query("month", applicant="测试科技有限公司1")
+    queries["重复请款检查"] = db.build_billed_cases_query(
+        [("91440300MA5ABCDE1X", str(10000000 + i), str(i % 45 + 1), CASE_TYPES[i % len(CASE_TYPES)])
+         for i in range(1, 200)])
+    return queries
+
+
+def uses_index(plan):
+    grouped = any("USE TEMP B-TREE FOR GROUP BY" in detail for detail in plan)
+    for detail in plan:
+        if "USE TEMP B-TREE FOR ORDER BY" in detail and not grouped:
+            return False
+        if detail.startswith("SCAN") and ("cases" in detail or "generated_files" in detail) \
+                and "VIRTUAL TABLE" not in detail:
+            return False
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="历史查询索引覆盖检查")
+    parser.add_argument("--rows", type=int, default=20000)
+    args = parser.parse_args()
+
+    failures = []
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "plans.db")
+        db.init_database(db_path)
+        populate(db_path, args.rows)
+        conn = db.get_connection(db_path)
+        if not db.has_search_index(conn):
+            print("提示: 当前SQLite不支持FTS5 trigram，申请人/商标名称搜索使用LIKE")
+
+        for name, (query, params) in history_queries(conn).items():
+            plan = db.explain_query_plan(query, params, db_path)
+            ok = uses_index(plan)
+            print(f"[{'OK' if ok else '全表扫描'}] {name}")
+            for detail in plan:
+                print(f"    {detail}")
+            if not ok:
+                failures.append(name)
+        db.close_connections()
+
+    if failures:
+        sys.exit(f"以下查询未使用索引: {', '.join(failures)}")
+
+
+if __name__ == "__main__":
+    main()
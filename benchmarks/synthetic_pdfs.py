@@ -0,0 +1,112 @@
+"""合成测试PDF语料
+
+按提取规则期望的标签排版生成新申请和各类案件（驳回复审、商标异议、无效宣告、
+撤三申请）PDF，每份文件一个申请人：
+- 新申请：首页（申请人、信用代码）加每个商标的类别页和委托书页，不足的页数
+  以商品/服务续页补齐；至少需要3页，要求2页时生成3页。
+- 案件类：申请书页（每页带“申请书”标题，商标条目可跨页）加不含关键词的
+  证据附件页，用于检验跳过附件页的逻辑。
+
+生成的语料也可直接用于 bench_text_backends.py。
+
+用法: python benchmarks/synthetic_pdfs.py --out corpus [--pages 2,10,50,200,500] [--copies 1]
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_extractors import CASE_APPLICANT_LABEL, CASE_LABELS, NEW_APPLICATION  # noqa: E402
+from text_backends import _import_pymupdf  # noqa: E402
+
+CASE_TYPES = (NEW_APPLICATION, *CASE_LABELS)
+# 每页最多的文字行数（A4、10号字）
+LINES_PER_PAGE = 60
+# 案件类申请书中的商标条目数
+CASE_TRADEMARKS = 3
+
+
+def credit_code(seed):
+    return f"91440300MA{seed % 10 ** 8:08d}"
+
+
+def new_application_pages(applicant, code, pages):
+    trademarks = max(1, (pages - 1) // 2)
+    result = [f"商标注册申请书\n申请人名称(中文)： {applicant} (英文) Test Co.\n"
+              f"统一社会信用代码：{code}\n2024年5月6日"]
+    for i in range(trademarks):
+        result.append(f"类别：{i % 45 + 1}\n商品/服务项目\n" + "\n".join(f"第{j}项" for j in range(30)))
+        result.append("商 标 代 理 委 托 书\n商标代理委托书\n"
+                      f"委托人 {applicant}\n"
+                      f"现委托 北京代理有限公司 代理 商标{i} 商标 的 如下 “商标注册申请”事宜\n"
+                      "2024年5月7日")
+    while len(result) < pages:
+        result.append("商品/服务项目（续）\n" + "\n".join(f"第{j}项" for j in range(30)))
+    return result
+
+
+def case_pages(case_type, applicant, code, pages):
+    name_label, category_label, number_label = CASE_LABELS[case_type]
+    lines = [f"{CASE_APPLICANT_LABEL[case_type]}： {applicant} 统一社会信用代码：{code}",
+             "地址： 广东省深圳市南山区"]
+    for i in range(CASE_TRADEMARKS):
+        lines.append(f"{name_label}： 商标{i} {category_label}： {i % 45 + 1}")
+        lines.extend(f"指定商品/服务 第{j}项" for j in range(20))
+        lines.append(f"{number_label}： {10000000 + i}")
+    # 每页首行为标题，保证续页也被识别为申请书页
+    per_page = LINES_PER_PAGE - 1
+    result = [f"{case_type}申请书\n" + "\n".join(lines[start:start + per_page])
+              for start in range(0, len(lines), per_page)]
+    while len(result) < pages:
+        n = len(result) + 1
+        result.append(f"证据材料 第{n}页\n" + "\n".join(f"附件{n}-{j} 使用证明材料" for j in range(40)))
+    return result
+
+
+def write_pdf(path, pages):
+    pymupdf = _import_pymupdf()
+    doc = pymupdf.open()
+    for text in pages:
+        page = doc.new_page()
+        page.insert_text((40, 50), text, fontname="china-s", fontsize=10)
+    doc.save(path, garbage=3, deflate=True)
+    doc.close()
+
+
+def generate_corpus(out_dir, page_counts, copies=1):
+    """生成语料，返回 {案件类型: [PDF路径, ...]}；文件名中含案件类型关键词"""
+    corpus = {}
+    seed = 0
+    for case_type in CASE_TYPES:
+        case_dir = os.path.join(out_dir, case_type)
+        os.makedirs(case_dir, exist_ok=True)
+        paths = corpus[case_type] = []
+        for pages in page_counts:
+            for copy in range(copies):
+                seed += 1
+                applicant = f"合成测试有限公司{seed:04d}"
+                if case_type == NEW_APPLICATION:
+                    texts = new_application_pages(applicant, credit_code(seed), pages)
+                else:
+                    texts = case_pages(case_type, applicant, credit_code(seed), pages)
+                path = os.path.join(case_dir, f"{case_type}-{pages}页-{copy + 1}.pdf")
+                write_pdf(path, texts)
+                paths.append(path)
+    return corpus
+
+
+def main():
+    parser = argparse.ArgumentParser(description="生成合成测试PDF语料")
+    parser.add_argument("--out", required=True, help="输出目录（按案件类型分子目录）")
+    parser.add_argument("--pages", default="2,10,50,200,500", help="每份PDF的页数")
+    parser.add_argument("--copies", type=int, default=1, help="每种页数生成的份数")
+    args = parser.parse_args()
+
+    corpus = generate_corpus(args.out, [int(n) for n in args.pages.split(",")], args.copies)
+    for case_type, paths in corpus.items():
+        print(f"{case_type}: {len(paths)} 份 -> {os.path.join(args.out, case_type)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,652 @@
+"""数据库访问层
+
+每个进程的每个线程复用一个SQLite连接，使用WAL日志模式，使多个Streamlit
+会话同时读写时不再出现 database is locked。多行写入通过 transaction()
+在一个事务中用 executemany 完成。
+"""
+import os
+import sqlite3
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+
+from metrics import count, traced
+
+DB_PATH = 'trademark_data.db'
+# 等待其他连接释放写锁的最长时间（毫秒）
+BUSY_TIMEOUT_MS = 10000
+
+CASE_COLUMNS = (
+    "applicant", "unified_credit_code", "case_type", "trademark_name", "category",
+    "official_fee", "agent_fee", "total_fee", "processing_date", "original_filename",
+    "generated_doc_path", "registration_number", "batch_id",
+)
+# 判断是否重复请款的列：同一委托人的同一注册号、类别和案件类型只应请款一次
+BILLING_KEY_COLUMNS = ("unified_credit_code", "registration_number", "category", "case_type")
+# 重复请款检查返回的已保存案件信息
+BILLED_CASE_COLUMNS = ("applicant", "trademark_name", "processing_date", "generated_doc_path", "batch_id")
+# 重复请款检查每条查询的键数（每个键4个参数，不超过SQLite参数个数上限）
+BILLING_CHECK_CHUNK = 200
+
+_local = threading.local()
+
+
+def get_connection(db_path=DB_PATH):
+    """返回当前线程的共享连接（自动提交模式，多语句写入请使用 transaction()）"""
+    connections = getattr(_local, "connections", None)
+    # fork出的子进程不能复用父进程的连接
+    if connections is None or _local.pid != os.getpid():
+        connections = _local.connections = {}
+        _local.pid = os.getpid()
+
+    conn = connections.get(db_path)
+    if conn is None:
+        conn = sqlite3.connect(db_path, isolation_level=None)
+        conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        connections[db_path] = conn
+    return conn
+
+
+@contextmanager
+def transaction(db_path=DB_PATH):
+    """在一个写事务中执行，异常时回滚"""
+    conn = get_connection(db_path)
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+
+
+def close_connections():
+    for conn in getattr(_local, "connections", {}).values():
+        conn.close()
+    _local.connections = {}
+
+
+# ============================= 表结构与迁移 =============================
+def _create_base_tables(c):
+    # 创建案件记录表
+    c.execute('''CREATE TABLE IF NOT EXISTS cases (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                applicant TEXT NOT NULL,
+                unified_credit_code TEXT,
+                case_type TEXT NOT NULL,
+                trademark_name TEXT NOT NULL,
+                category TEXT,
+                official_fee REAL,
+                agent_fee REAL,
+                total_fee REAL,
+                processing_date DATE NOT NULL,
+                original_filename TEXT NOT NULL,
+                generated_doc_path TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )''')
+
+    # 创建文件记录表
+    c.execute('''CREATE TABLE IF NOT EXISTS generated_files (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                case_id INTEGER,
+                file_name TEXT NOT NULL,
+                file_type TEXT NOT NULL,
+                file_path TEXT NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (case_id) REFERENCES cases (id)
+                )''')
+
+
+def _add_history_indexes(c):
+    c.execute("CREATE INDEX IF NOT EXISTS idx_cases_date_type ON cases (processing_date, case_type)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_generated_files_case_id ON generated_files (case_id)")
+
+
+def _add_search_index(c):
+    """申请人/商标名称子串搜索用的FTS5 trigram索引，SQLite不支持时跳过"""
+    if not trigram_supported(c):
+        return
+    c.execute('''CREATE VIRTUAL TABLE IF NOT EXISTS cases_fts USING fts5(
+                applicant, trademark_name,
+                content='cases', content_rowid='id', tokenize='trigram'
+                )''')
+    c.execute('''CREATE TRIGGER IF NOT EXISTS cases_fts_insert AFTER INSERT ON cases BEGIN
+                INSERT INTO cases_fts (rowid, applicant, trademark_name)
+                VALUES (new.id, new.applicant, new.trademark_name);
+                END''')
+    c.execute('''CREATE TRIGGER IF NOT EXISTS cases_fts_delete AFTER DELETE ON cases BEGIN
+                INSERT INTO cases_fts (cases_fts, rowid, applicant, trademark_name)
+                VALUES ('delete', old.id, old.applicant, old.trademark_name);
+                END''')
+    c.execute('''CREATE TRIGGER IF NOT EXISTS cases_fts_update AFTER UPDATE ON cases BEGIN
+                INSERT INTO cases_fts (cases_fts, rowid, applicant, trademark_name)
+                VALUES ('delete', old.id, old.applicant, old.trademark_name);
+                INSERT INTO cases_fts (rowid, applicant, trademark_name)
+                VALUES (new.id, new.applicant, new.trademark_name);
+                END''')
+    c.execute("INSERT INTO cases_fts (cases_fts) VALUES ('rebuild')")
+
+
+# 费用汇总的分组方式：视图名后缀 -> fee_summary 列
+SUMMARY_GROUPS = {
+    "month": "month",
+    "applicant": "applicant",
+    "case_type": "case_type",
+}
+
+
+def _summary_add(row):
+    return f'''INSERT INTO fee_summary (month, applicant, case_type, case_count,
+                                      official_fee, agent_fee, total_fee)
+               VALUES (substr({row}.processing_date, 1, 7), {row}.applicant, {row}.case_type, 1,
+                       COALESCE({row}.official_fee, 0), COALESCE({row}.agent_fee, 0),
+                       COALESCE({row}.total_fee, 0))
+               ON CONFLICT (month, applicant, case_type) DO UPDATE SET
+                   case_count = case_count + 1,
+                   official_fee = official_fee + excluded.official_fee,
+                   agent_fee = agent_fee + excluded.agent_fee,
+                   total_fee = total_fee + excluded.total_fee;'''
+
+
+def _summary_remove(row):
+    key = (f"month = substr({row}.processing_date, 1, 7) AND applicant = {row}.applicant "
+           f"AND case_type = {row}.case_type")
+    return f'''UPDATE fee_summary SET
+                   case_count = case_count - 1,
+                   official_fee = official_fee - COALESCE({row}.official_fee, 0),
+                   agent_fee = agent_fee - COALESCE({row}.agent_fee, 0),
+                   total_fee = total_fee - COALESCE({row}.total_fee, 0)
+               WHERE {key};
+               DELETE FROM fee_summary WHERE {key} AND case_count <= 0;'''
+
+
+def _add_pagination_and_summary(c):
+    """按日期倒序分页用的索引，以及由触发器维护的月度费用汇总表和汇总视图"""
+    c.execute("CREATE INDEX IF NOT EXISTS idx_cases_date ON cases (processing_date)")
+
+    c.execute('''CREATE TABLE IF NOT EXISTS fee_summary (
+                month TEXT NOT NULL,
+                applicant TEXT NOT NULL,
+                case_type TEXT NOT NULL,
+                case_count INTEGER NOT NULL,
+                official_fee REAL NOT NULL,
+                agent_fee REAL NOT NULL,
+                total_fee REAL NOT NULL,
+                PRIMARY KEY (month, applicant, case_type)
+                ) WITHOUT ROWID''')
+    c.execute(f"CREATE TRIGGER IF NOT EXISTS fee_summary_insert AFTER INSERT ON cases BEGIN "
+              f"{_summary_add('new')} END")
+    c.execute(f"CREATE TRIGGER IF NOT EXISTS fee_summary_delete AFTER DELETE ON cases BEGIN "
+              f"{_summary_remove('old')} END")
+    c.execute(f"CREATE TRIGGER IF NOT EXISTS fee_summary_update AFTER UPDATE ON cases BEGIN "
+              f"{_summary_remove('old')} {_summary_add('new')} END")
+    c.execute('''INSERT OR REPLACE INTO fee_summary
+                SELECT substr(processing_date, 1, 7), applicant, case_type, COUNT(*),
+                       COALESCE(SUM(official_fee), 0), COALESCE(SUM(agent_fee), 0),
+                       COALESCE(SUM(total_fee), 0)
+                FROM cases GROUP BY 1, 2, 3''')
+
+    for name, column in SUMMARY_GROUPS.items():
+        c.execute(f'''CREATE VIEW IF NOT EXISTS fee_totals_by_{name} AS
+                    SELECT {column}, SUM(case_count) AS case_count,
+                           SUM(official_fee) AS official_fee, SUM(agent_fee) AS agent_fee,
+                           SUM(total_fee) AS total_fee
+                    FROM fee_summary GROUP BY {column}''')
+
+
+def _add_blob_hash(c):
+    """生成文件在内容寻址存储中的哈希，gc 按此查找仍被引用的文件"""
+    c.execute("ALTER TABLE generated_files ADD COLUMN blob_hash TEXT")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_generated_files_blob_hash ON generated_files (blob_hash)")
+
+
+def _add_batch_id(c):
+    """写入案件和生成文件的处理批次（records.Batch.batch_id）
+
+    重新生成时只替换本批次写入的案件和发票申请表；请款单按内容存储，其他批次
+    内容相同的请款单路径相同，不能只按文件路径查找。
+    """
+    c.execute("ALTER TABLE cases ADD COLUMN batch_id TEXT")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_cases_batch ON cases (batch_id, generated_doc_path)")
+    c.execute("ALTER TABLE generated_files ADD COLUMN batch_id TEXT")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_generated_files_batch ON generated_files (batch_id)")
+
+
+def _add_metrics(c):
+    """各批次的耗时统计：span 为调用次数和耗时（纳秒），counter 只有计数（calls）"""
+    c.execute('''CREATE TABLE IF NOT EXISTS metrics (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                batch_id TEXT NOT NULL,
+                stage TEXT NOT NULL,
+                name TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                calls INTEGER NOT NULL,
+                total_ns INTEGER,
+                self_ns INTEGER,
+                max_ns INTEGER,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )''')
+    c.execute("CREATE INDEX IF NOT EXISTS idx_metrics_batch ON metrics (batch_id)")
+
+
+def _add_registration_number(c):
+    """案件类商标的注册号，以及重复请款检查用的索引
+
+    不建唯一索引：每次请款各保存一行，重复检查据此给出请款次数；确需再次
+    办理的案件仍可保存，由生成前的重复检查提示。此前保存的案件没有注册号，
+    不参与检查。
+    """
+    c.execute("ALTER TABLE cases ADD COLUMN registration_number TEXT")
+    c.execute(f"CREATE INDEX IF NOT EXISTS idx_cases_billing ON cases ({', '.join(BILLING_KEY_COLUMNS)}) "
+              "WHERE registration_number IS NOT NULL")
+
+
+# 按顺序执行的迁移，第 n 项把 PRAGMA user_version 从 n 升级到 n+1。
+# 已发布的迁移不要修改，新的表结构变更追加到末尾。
+MIGRATIONS = [
+    _create_base_tables,
+    _add_history_indexes,
+    _add_search_index,
+    _add_pagination_and_summary,
+    _add_blob_hash,
+    _add_batch_id,
+    _add_metrics,
+    _add_registration_number,
+]
+
+
+def trigram_supported(conn):
+    try:
+        conn.execute("CREATE VIRTUAL TABLE temp.trigram_probe USING fts5(x, tokenize='trigram')")
+    except sqlite3.OperationalError:
+        return False
+    conn.execute("DROP TABLE temp.trigram_probe")
+    return True
+
+
+def has_search_index(conn):
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'cases_fts'").fetchone() is not None
+
+
+# 初始化数据库
+def init_database(db_path=DB_PATH):
+    """创建表结构并执行尚未应用的迁移"""
+    with transaction(db_path) as c:
+        version = c.execute("PRAGMA user_version").fetchone()[0]
+        for target, migration in enumerate(MIGRATIONS[version:], version + 1):
+            migration(c)
+            c.execute(f"PRAGMA user_version = {target}")
+
+
+# ============================= 写入 =============================
+def _chunks(values, size=500):
+    """把 IN (...) 查询的参数分块（不超过SQLite参数个数上限），产出 (参数块, 占位符)"""
+    values = list(values)
+    for start in range(0, len(values), size):
+        chunk = values[start:start + size]
+        yield chunk, ", ".join("?" for _ in chunk)
+
+
+def insert_cases(conn, cases):
+    """在调用方的事务中批量插入案件，返回按输入顺序排列的案件ID
+
+    cases 为包含 CASE_COLUMNS 各字段的字典列表。调用方须持有写事务
+    （transaction()），此时新行的自增ID是连续的。
+    """
+    if not cases:
+        return []
+    conn.executemany(
+        f'''INSERT INTO cases ({", ".join(CASE_COLUMNS)})
+            VALUES ({", ".join("?" for _ in CASE_COLUMNS)})''',
+        [tuple(case.get(col) for col in CASE_COLUMNS) for case in cases])
+    last_id = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+    return list(range(last_id - len(cases) + 1, last_id + 1))
+
+
+def insert_files(conn, files):
+    """在调用方的事务中批量插入文件记录
+
+    files 为 (case_id, file_name, file_type, file_path, blob_hash, batch_id) 列表。
+    """
+    conn.executemany('''INSERT INTO generated_files (
+                        case_id, file_name, file_type, file_path, blob_hash, batch_id
+                        ) VALUES (?, ?, ?, ?, ?, ?)''', files)
+
+
+def delete_cases(conn, case_ids):
+    """在调用方的事务中删除案件及其文件记录"""
+    for chunk, marks in _chunks(case_ids):
+        conn.execute(f"DELETE FROM generated_files WHERE case_id IN ({marks})", chunk)
+        conn.execute(f"DELETE FROM cases WHERE id IN ({marks})", chunk)
+
+
+def delete_document_cases(conn, batch_id, doc_paths):
+    """在调用方的事务中删除本批次写入的、引用这些请款单（按文件路径）的案件及其文件记录"""
+    case_ids = []
+    for chunk, marks in _chunks(set(doc_paths)):
+        case_ids.extend(case_id for case_id, in conn.execute(
+            f"SELECT id FROM cases WHERE batch_id = ? AND generated_doc_path IN ({marks})",
+            [batch_id, *chunk]))
+    delete_cases(conn, case_ids)
+
+
+def delete_batch_files(conn, batch_id):
+    """在调用方的事务中删除本批次写入的、不关联案件的文件记录（发票申请表）"""
+    conn.execute("DELETE FROM generated_files WHERE batch_id = ? AND case_id IS NULL", (batch_id,))
+
+
+def save_case_files(conn, cases, file_name, file_type, file_path, blob_hash=None, batch_id=None):
+    """在调用方的事务中写入一组案件，并把它们关联到同一个生成文件"""
+    case_ids = insert_cases(conn, cases)
+    insert_files(conn, [(case_id, file_name, file_type, file_path, blob_hash, batch_id)
+                        for case_id in case_ids])
+    return case_ids
+
+
+def save_cases_with_file(cases, file_name, file_type, file_path, blob_hash=None, db_path=DB_PATH):
+    """在一个事务中保存一批案件及其共同的生成文件记录，返回案件ID列表"""
+    with transaction(db_path) as conn:
+        return save_case_files(conn, cases, file_name, file_type, file_path, blob_hash)
+
+
+@traced("db.save")
+def save_generated_documents(documents, files=(), superseded=(), batch_id=None, db_path=DB_PATH):
+    """在一个事务中保存一次生成的全部结果
+
+    documents 为 (案件列表, 文件名, 文件类型, 文件路径, 内容哈希) 序列，每组案件
+    关联同一个生成文件；files 为不关联案件的文件记录
+    (case_id, 文件名, 文件类型, 文件路径, 内容哈希)。superseded 为被本次结果
+    取代的旧请款单路径，batch_id 为生成这些结果的批次。
+
+    重新生成只替换本批次写入的记录：被取代的请款单中的案件先连同文件记录
+    删除再写入本次结果；有新的 files 时，本批次此前保存的 files（上一版
+    发票申请表）一并删除。其他批次的记录（包括内容相同、存储路径相同的
+    请款单，以及以前对同一商标的请款）不动。没有 batch_id 时不替换。
+    """
+    with transaction(db_path) as conn:
+        if batch_id is not None:
+            delete_document_cases(conn, batch_id, superseded)
+            if files:
+                delete_batch_files(conn, batch_id)
+        for cases, file_name, file_type, file_path, blob_hash in documents:
+            save_case_files(conn, cases, file_name, file_type, file_path, blob_hash, batch_id)
+            count("db.cases", len(cases))
+        insert_files(conn, [(*file, batch_id) for file in files])
+
+
+def save_metrics(recorder, stage, db_path=DB_PATH):
+    """保存一个批次的耗时统计（metrics.Recorder）"""
+    snapshot = recorder.snapshot()
+    rows = [(recorder.batch_id, stage, name, "span", calls, total_ns, self_ns, max_ns)
+            for name, (calls, total_ns, self_ns, max_ns) in snapshot["spans"].items()]
+    rows.extend((recorder.batch_id, stage, name, "counter", n, None, None, None)
+                for name, n in snapshot["counters"].items())
+    with transaction(db_path) as conn:
+        conn.executemany('''INSERT INTO metrics (
+                            batch_id, stage, name, kind, calls, total_ns, self_ns, max_ns
+                            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)''', rows)
+
+
+def save_case_to_db(applicant, unified_credit_code, case_type, trademark_name, category,
+                    official_fee, agent_fee, total_fee, processing_date, original_filename,
+                    generated_doc_path=None, registration_number=None, batch_id=None):
+    with transaction() as conn:
+        return insert_cases(conn, [{
+            "applicant": applicant,
+            "unified_credit_code": unified_credit_code,
+            "case_type": case_type,
+            "trademark_name": trademark_name,
+            "category": category,
+            "official_fee": official_fee,
+            "agent_fee": agent_fee,
+            "total_fee": total_fee,
+            "processing_date": processing_date,
+            "original_filename": original_filename,
+            "generated_doc_path": generated_doc_path,
+            "registration_number": registration_number,
+            "batch_id": batch_id,
+        }])[0]
+
+
+def save_file_to_db(case_id, file_name, file_type, file_path, blob_hash=None):
+    get_connection().execute('''INSERT INTO generated_files (
+                                case_id, file_name, file_type, file_path, blob_hash
+                                ) VALUES (?, ?, ?, ?, ?)''',
+                             (case_id, file_name, file_type, file_path, blob_hash))
+
+
+# ============================= 查询 =============================
+def read_dataframe(query, conn, params=None):
+    """执行查询并返回DataFrame；pandas导入较慢，在首次查询时才导入"""
+    import pandas as pd
+    return pd.read_sql_query(query, conn, params=params)
+
+
+def get_all_cases():
+    return read_dataframe("SELECT * FROM cases", get_connection())
+
+
+def get_case_files(case_id):
+    return read_dataframe("SELECT * FROM generated_files WHERE case_id = ?",
+                          get_connection(), params=(int(case_id),))
+
+
+def fts_phrase(column, text):
+    """构造FTS5列过滤短语查询"""
+    return f'{column} : "{text.replace(chr(34), chr(34) * 2)}"'
+
+
+# trigram索引只能匹配不少于3个字符的子串，更短的关键词仍使用LIKE
+FTS_MIN_CHARS = 3
+
+
+def build_filtered_cases_query(start_date, end_date, applicant, case_type, trademark_name=None,
+                               conn=None):
+    """返回历史查询的 (SQL, 参数)"""
+    conn = conn or get_connection()
+    use_fts = has_search_index(conn)
+    query = "SELECT * FROM cases WHERE 1=1"
+    params = []
+
+    if start_date:
+        query += " AND processing_date >= ?"
+        params.append(start_date.strftime("%Y-%m-%d"))
+
+    if end_date:
+        query += " AND processing_date <= ?"
+        params.append(end_date.strftime("%Y-%m-%d"))
+
+    for column, value in (("applicant", applicant), ("trademark_name", trademark_name)):
+        if not value:
+            continue
+        if use_fts and len(value) >= FTS_MIN_CHARS:
+            query += " AND id IN (SELECT rowid FROM cases_fts WHERE cases_fts MATCH ?)"
+            params.append(fts_phrase(column, value))
+        else:
+            query += f" AND {column} LIKE ?"
+            params.append(f"%{value}%")
+
+    if case_type:
+        query += " AND case_type = ?"
+        params.append(case_type)
+
+    return query, params
+
+
+def get_filtered_cases(start_date, end_date, applicant, case_type, trademark_name=None):
+    conn = get_connection()
+    query, params = build_filtered_cases_query(start_date, end_date, applicant, case_type,
+                                               trademark_name, conn)
+    return read_dataframe(query, conn, params=params)
+
+
+def build_count_query(query, params):
+    """返回统计 (SQL, 参数) 查询结果行数的 (SQL, 参数)"""
+    return f"SELECT COUNT(*) FROM ({query})", params
+
+
+def count_filtered_cases(start_date, end_date, applicant, case_type, trademark_name=None):
+    conn = get_connection()
+    query, params = build_count_query(*build_filtered_cases_query(start_date, end_date, applicant,
+                                                                  case_type, trademark_name, conn))
+    return conn.execute(query, params).fetchone()[0]
+
+
+def build_cases_page_query(start_date, end_date, applicant, case_type, trademark_name=None,
+                           page_size=100, cursor=None, conn=None):
+    """返回键集分页查询的 (SQL, 参数)，多取一行用于判断是否还有下一页"""
+    query, params = build_filtered_cases_query(start_date, end_date, applicant, case_type,
+                                               trademark_name, conn)
+    if cursor is not None:
+        query += " AND (processing_date, id) < (?, ?)"
+        params = params + list(cursor)
+    query += " ORDER BY processing_date DESC, id DESC LIMIT ?"
+    return query, params + [page_size + 1]
+
+
+def get_cases_page(start_date, end_date, applicant, case_type, trademark_name=None,
+                   page_size=100, cursor=None):
+    """按处理日期、ID倒序返回一页案件（键集分页）
+
+    cursor 为上一页最后一行的 (processing_date, id)，首页为None。
+    返回 (DataFrame, 下一页cursor)；没有下一页时cursor为None。
+    """
+    conn = get_connection()
+    query, params = build_cases_page_query(start_date, end_date, applicant, case_type,
+                                           trademark_name, page_size, cursor, conn)
+    df = read_dataframe(query, conn, params=params)
+    if len(df) <= page_size:
+        return df, None
+    df = df.iloc[:page_size]
+    last = df.iloc[-1]
+    return df, (last["processing_date"], int(last["id"]))
+
+
+def build_fee_summary_query(group_by, start_date=None, end_date=None, applicant=None, case_type=None):
+    """返回费用汇总的 (SQL, 参数)"""
+    column = SUMMARY_GROUPS[group_by]
+    query = f'''SELECT {column}, SUM(case_count) AS case_count,
+                       SUM(official_fee) AS official_fee, SUM(agent_fee) AS agent_fee,
+                       SUM(total_fee) AS total_fee
+                FROM fee_summary WHERE 1=1'''
+    params = []
+
+    if start_date:
+        query += " AND month >= ?"
+        params.append(start_date.strftime("%Y-%m"))
+
+    if end_date:
+        query += " AND month <= ?"
+        params.append(end_date.strftime("%Y-%m"))
+
+    if applicant:
+        query += " AND applicant LIKE ?"
+        params.append(f"%{applicant}%")
+
+    if case_type:
+        query += " AND case_type = ?"
+        params.append(case_type)
+
+    query += f" GROUP BY {column} ORDER BY {column}"
+    return query, params
+
+
+def get_fee_summary(group_by, start_date=None, end_date=None, applicant=None, case_type=None):
+    """从月度汇总表按 group_by（month/applicant/case_type）汇总费用
+
+    日期条件按月份匹配（包含起止日期所在的整月）。
+    """
+    query, params = build_fee_summary_query(group_by, start_date, end_date, applicant, case_type)
+    return read_dataframe(query, get_connection(), params=params)
+
+
+def build_filtered_files_query(start_date, end_date, applicant, case_type, trademark_name=None,
+                               conn=None):
+    """返回筛选结果关联文件的 (SQL, 参数)
+
+    一次连接查询取出所有案件的文件，多个案件共用的同一文件只返回一行，
+    case_ids 为引用该文件的案件ID（逗号分隔）。
+    """
+    cases_query, params = build_filtered_cases_query(start_date, end_date, applicant, case_type,
+                                                     trademark_name, conn)
+    query = f'''WITH filtered AS ({cases_query})
+                SELECT MIN(f.id) AS id, f.file_name, f.file_type, f.file_path, f.blob_hash,
+                       COUNT(*) AS case_count, GROUP_CONCAT(f.case_id) AS case_ids
+                FROM filtered JOIN generated_files f ON f.case_id = filtered.id
+                GROUP BY f.file_path, f.file_name, f.file_type, f.blob_hash'''
+    return query, params
+
+
+def count_filtered_files(start_date, end_date, applicant, case_type, trademark_name=None):
+    conn = get_connection()
+    query, params = build_count_query(*build_filtered_files_query(start_date, end_date, applicant,
+                                                                  case_type, trademark_name, conn))
+    return conn.execute(query, params).fetchone()[0]
+
+
+def build_files_page_query(start_date, end_date, applicant, case_type, trademark_name=None,
+                           limit=None, offset=0, conn=None):
+    """返回一页关联文件的 (SQL, 参数)，按文件记录ID排序"""
+    query, params = build_filtered_files_query(start_date, end_date, applicant, case_type,
+                                               trademark_name, conn)
+    query += " ORDER BY id"
+    if limit is not None:
+        query += " LIMIT ? OFFSET ?"
+        params = params + [limit, offset]
+    return query, params
+
+
+def get_filtered_files(start_date, end_date, applicant, case_type, trademark_name=None,
+                       limit=None, offset=0):
+    """分页返回筛选结果关联的文件（已去重），按文件记录ID排序"""
+    conn = get_connection()
+    query, params = build_files_page_query(start_date, end_date, applicant, case_type,
+                                           trademark_name, limit, offset, conn)
+    return read_dataframe(query, conn, params=params)
+
+
+def build_billed_cases_query(keys):
+    """查询与 keys 中任一键相同的已保存案件，返回 (SQL, 参数)
+
+    keys 以 VALUES 表的形式与 cases 连接，每个键经 idx_cases_billing 查找一次。
+    """
+    key = ", ".join(BILLING_KEY_COLUMNS)
+    on = " AND ".join(f"c.{col} = k.{col}" for col in BILLING_KEY_COLUMNS)
+    query = f'''WITH k ({key}) AS (VALUES {", ".join("(?, ?, ?, ?)" for _ in keys)})
+                SELECT {", ".join(f"c.{col}" for col in BILLING_KEY_COLUMNS + BILLED_CASE_COLUMNS)}
+                FROM k JOIN cases c ON {on}'''
+    return query, [value for k in keys for value in k]
+
+
+@traced("db.billing_check")
+def find_billed_cases(keys, db_path=DB_PATH):
+    """批量查询已保存的相同案件，返回 {键: [案件, ...]}（按处理日期倒序）
+
+    keys 为 BILLING_KEY_COLUMNS 各列组成的元组（类别为文本），每块键只发出
+    一条查询，而不是逐件查询；案件为包含 BILLED_CASE_COLUMNS 的字典。
+    """
+    conn = get_connection(db_path)
+    found = defaultdict(list)
+    for chunk, _ in _chunks(dict.fromkeys(keys), BILLING_CHECK_CHUNK):
+        for row in conn.execute(*build_billed_cases_query(chunk)):
+            found[tuple(row[:len(BILLING_KEY_COLUMNS)])].append(
+                dict(zip(BILLED_CASE_COLUMNS, row[len(BILLING_KEY_COLUMNS):])))
+    for cases in found.values():
+        cases.sort(key=lambda case: case["processing_date"], reverse=True)
+    return dict(found)
+
+
+def get_referenced_blobs(db_path=DB_PATH):
+    """返回仍被文件记录引用的内容哈希集合"""
+    rows = get_connection(db_path).execute(
+        "SELECT DISTINCT blob_hash FROM generated_files WHERE blob_hash IS NOT NULL")
+    return {row[0] for row in rows}
+
+
+def explain_query_plan(query, params=(), db_path=DB_PATH):
+    """返回 EXPLAIN QUERY PLAN 的各行说明"""
+    rows = get_connection(db_path).execute(f"EXPLAIN QUERY PLAN {query}", params).fetchall()
+    return [row[3] for row in rows]
@@ -0,0 +1,303 @@
+"""请款单与发票申请表生成（不依赖Streamlit）
+
+请款单模板在每个进程中只解析一次：生成时深拷贝模板的文档XML树，
+只替换预先定位好的含占位符的文字块。模板中的其他部件（图片、页眉页脚等）
+只压缩一次，保存时只重新序列化和压缩 word/document.xml。
+
+发票申请表同样保留模板的全部部件（表头、样式、列宽、数据验证等），
+只把数据行以流式方式写入工作表XML，不经过 openpyxl 逐单元格建模。
+python-docx 在首次加载请款单模板时才导入。
+"""
+import copy
+import datetime
+import io
+import os
+import re
+import threading
+import zipfile
+from xml.sax.saxutils import escape
+
+from metrics import count, span, traced
+
+WORD_TEMPLATE_PATH = "请款单模板.docx"
+DOCUMENT_PART = "word/document.xml"
+
+INVOICE_TEMPLATE_PATH = "发票申请表.xlsx"
+INVOICE_SHEET_PART = "xl/worksheets/sheet1.xml"
+# 单个发票申请表文件的数据行上限（不含表头），超过时拆分为多个文件；
+# 默认取Excel单个工作表的最大行数
+INVOICE_MAX_ROWS = 1048576 - 1
+# 流式写入工作表时每次拼接的行数
+INVOICE_WRITE_BATCH = 1000
+# XML 1.0 不允许的控制字符
+ILLEGAL_XML_CHARS_RE = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+PLACEHOLDERS = ("申请人", "事宜类型", "日期", "总官费", "总代理费", "总计", "大写")
+PLACEHOLDER_RE = re.compile("{(" + "|".join(PLACEHOLDERS) + ")}")
+# 可以直接写入 w:t 的文字：非空、无首尾空白、不含制表符和换行等控制字符
+PLAIN_TEXT_RE = re.compile(r"[^\s\x00-\x1f](?:[^\t\n\r\x00-\x1f]*[^\s\x00-\x1f])?")
+
+# 金额转大写函数
+CN_NUM = ['零', '壹', '贰', '叁', '肆', '伍', '陆', '柒', '捌', '玖']
+CN_UNIT = ['', '拾', '佰', '仟', '万', '拾', '佰', '仟', '亿']
+
+def number_to_upper(amount):
+    s = str(int(amount))
+    result = []
+    for i, ch in enumerate(s[::-1]):
+        if int(ch) != 0:
+            result.append(f"{CN_NUM[int(ch)]}{CN_UNIT[i]}")
+    return ''.join(reversed(result)) + "元整"
+
+
+class WordTemplate:
+    """解析一次、可重复生成文档的请款单模板"""
+
+    def __init__(self, path):
+        from docx import Document
+        from docx.oxml.ns import qn
+
+        with open(path, "rb") as f:
+            data = f.read()
+        # 正文以外的部件只压缩一次，生成时在这份归档后追加新的正文部件
+        base = io.BytesIO()
+        with zipfile.ZipFile(io.BytesIO(data)) as src, zipfile.ZipFile(base, "w") as dst:
+            for info in src.infolist():
+                if info.filename == DOCUMENT_PART:
+                    self.document_info = info
+                else:
+                    dst.writestr(info, src.read(info))
+        self.base_archive = base.getvalue()
+
+        self.document = Document(io.BytesIO(data))
+        self.root = self.document.element
+        self.run_tag = qn("w:r")
+        # 含占位符的文字块位置：(段落序号, 文字块序号)
+        self.placeholder_runs = [
+            (p_idx, r_idx)
+            for p_idx, para in enumerate(self.document.paragraphs)
+            for r_idx, run in enumerate(para.runs)
+            if PLACEHOLDER_RE.search(run.text)
+        ]
+        self.row_prototype, self.total_row_prototype = self._build_row_prototypes()
+
+    def _build_row_prototypes(self):
+        """在模板副本的第一个表格中用 python-docx 生成一条数据行和一条合计行作为原型
+
+        与逐行 add_row() 再给单元格赋值得到的XML完全相同，之后每行只需复制原型并改写文字。
+        """
+        doc = self.new_document()
+        if not doc.tables:
+            return None, None
+        table = doc.tables[0]
+
+        row = table.add_row().cells
+        for cell in row:
+            cell.text = "0"
+
+        total_row = table.add_row().cells
+        total_row[0].merge(total_row[3])
+        for idx in (0, 4, 5, 6):
+            total_row[idx].text = "0"
+
+        return table.rows[-2]._tr, table.rows[-1]._tr
+
+    def _clone_row(self, prototype, values):
+        tr = copy.deepcopy(prototype)
+        for run, value in zip(tr.iter(self.run_tag), values):
+            if PLAIN_TEXT_RE.fullmatch(value):
+                # 原型文字块只有一个 w:t，普通文字直接改写
+                run[0].text = value
+            else:
+                # 首尾空白、制表符、换行等交给 python-docx 生成对应元素
+                run.text = value
+        return tr
+
+    def new_document(self):
+        """返回基于模板XML树副本的文档对象（不影响模板本身）"""
+        from docx.document import Document as DocumentProxy
+        return DocumentProxy(copy.deepcopy(self.root), self.document.part)
+
+    def fill_placeholders(self, doc, values):
+        paragraphs = doc.paragraphs
+        for p_idx, r_idx in self.placeholder_runs:
+            run = paragraphs[p_idx].runs[r_idx]
+            run.text = PLACEHOLDER_RE.sub(lambda m: values[m.group(1)], run.text)
+
+    def fill_table(self, doc, rows, total_row):
+        """删除第一个表格的示例行，一次性追加数据行（每行7列文字）和合计行（4段文字）"""
+        tbl = doc.tables[0]._tbl
+        for tr in tbl.tr_lst[1:]:
+            tbl.remove(tr)
+        tbl.extend(self._clone_row(self.row_prototype, values) for values in rows)
+        tbl.append(self._clone_row(self.total_row_prototype, total_row))
+
+    def to_bytes(self, doc):
+        """写出docx：复用预先压缩好的其他部件，只重新序列化和压缩文档正文部件"""
+        from docx.opc.oxml import serialize_part_xml
+        with span("word.save"):
+            out = io.BytesIO(self.base_archive)
+            with zipfile.ZipFile(out, "a") as zf:
+                zf.writestr(self.document_info, serialize_part_xml(doc.element))
+            return out.getvalue()
+
+
+class InvoiceTemplate:
+    """发票申请表模板：保留表头行及其之前的工作表XML，数据行在其后流式写入"""
+
+    def __init__(self, path):
+        with zipfile.ZipFile(path) as zf:
+            self.entries = [(info, zf.read(info)) for info in zf.infolist()]
+        sheet_xml = {info.filename: data for info, data in self.entries}[INVOICE_SHEET_PART].decode("utf-8")
+
+        # 表头为第一行；模板中表头之后的空白示例行丢弃
+        header_end = sheet_xml.index("</row>") + len("</row>")
+        self.sheet_head = sheet_xml[:header_end]
+        self.sheet_tail = sheet_xml[sheet_xml.index("</sheetData>"):]
+
+    def write(self, rows, fileobj):
+        """把数据行写入 fileobj（xlsx）
+
+        rows 为 [(行内各单元格 (列字母, 值) 序列), ...]，从第2行开始写入；
+        值为数字时写为数值，其余写为文本，None 跳过。
+        """
+        count("excel.rows", len(rows))
+        last_row = len(rows) + 1
+        head = re.sub(r'<dimension ref="[^"]*"/>', f'<dimension ref="A1:S{last_row}"/>', self.sheet_head, count=1)
+        with zipfile.ZipFile(fileobj, "w") as zf:
+            for info, data in self.entries:
+                if info.filename != INVOICE_SHEET_PART:
+                    zf.writestr(info, data)
+                    continue
+                with zf.open(info, "w") as sheet:
+                    sheet.write(head.encode("utf-8"))
+                    for start in range(0, len(rows), INVOICE_WRITE_BATCH):
+                        batch = rows[start:start + INVOICE_WRITE_BATCH]
+                        sheet.write("".join(
+                            _row_xml(row_idx, cells)
+                            for row_idx, cells in enumerate(batch, start + 2)
+                        ).encode("utf-8"))
+                    sheet.write(self.sheet_tail.encode("utf-8"))
+
+
+def _cell_xml(ref, value):
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return f'<c r="{ref}" t="n"><v>{value}</v></c>'
+    text = str(value)
+    if ILLEGAL_XML_CHARS_RE.search(text):
+        raise ValueError(f"单元格 {ref} 含有Excel不支持的控制字符: {text!r}")
+    space = ' xml:space="preserve"' if text != text.strip() else ""
+    return f'<c r="{ref}" t="inlineStr"><is><t{space}>{escape(text)}</t></is></c>'
+
+
+def _row_xml(row_idx, cells):
+    return f'<row r="{row_idx}">' + "".join(
+        _cell_xml(f"{column}{row_idx}", value) for column, value in cells if value is not None
+    ) + "</row>"
+
+
+_template_cache = {}
+_template_lock = threading.Lock()
+
+
+def _get_template(cls, path):
+    """按路径和修改时间缓存解析后的模板，模板文件更新后自动重新加载"""
+    mtime = os.path.getmtime(path)
+    with _template_lock:
+        cached = _template_cache.get((cls, path))
+        if cached is None or cached[0] != mtime:
+            with span("template.load"):
+                cached = _template_cache[(cls, path)] = (mtime, cls(path))
+        return cached[1]
+
+
+def get_word_template(path=WORD_TEMPLATE_PATH):
+    return _get_template(WordTemplate, path)
+
+
+def get_invoice_template(path=INVOICE_TEMPLATE_PATH):
+    return _get_template(InvoiceTemplate, path)
+
+
+@traced("word.render")
+def render_word_doc(applicant, records, case_type, template_path=WORD_TEMPLATE_PATH):
+    """生成Word请款单，返回 (文件名, 文件内容)；records 为 records.TrademarkRecord 列表"""
+    template = get_word_template(template_path)
+    doc = template.new_document()
+
+    # 计算汇总
+    if case_type == "新申请商标":
+        case_types = ["商标注册申请"]
+    else:
+        case_types = list({r.case_type for r in records})
+
+    case_type_str = "、".join(case_types)
+    total_official = sum(r.official_fee for r in records)
+    total_agent = sum(r.agent_fee for r in records)
+    total = total_official + total_agent
+
+    # 替换正文占位符
+    today = datetime.date.today()
+    with span("word.fill"):
+        template.fill_placeholders(doc, {
+            "申请人": applicant,
+            "事宜类型": case_type_str,
+            "日期": today.strftime("%Y年%m月%d日"),
+            "总官费": str(total_official),
+            "总代理费": str(total_agent),
+            "总计": str(total),
+            "大写": number_to_upper(total),
+        })
+
+        # 动态写入表格
+        if doc.tables:
+            template.fill_table(doc, [
+                (str(idx),
+                 rec.case_type if case_type != "新申请商标" else "商标注册申请",
+                 rec.trademark_name,
+                 str(rec.category),
+                 f"{rec.official_fee}",
+                 f"{rec.agent_fee}",
+                 f"{rec.total_fee}")
+                for idx, rec in enumerate(records, 1)
+            ], ("合计", f"{total_official}", f"{total_agent}", f"{total}"))
+
+    filename = f"请款单（{applicant}-{case_type_str}）-{total}-{today.strftime('%Y%m%d')}.docx"
+    return filename, template.to_bytes(doc)
+
+
+def invoice_rows(summaries, date_str):
+    """每个申请人两行：官费一行、代理费一行"""
+    for r in summaries:
+        for fee in (r["总官费"], r["总代理费"]):
+            yield (
+                ("B", r["申请人"]),
+                ("C", r["统一社会信用代码"]),  # 统一社会信用代码列
+                ("G", fee),
+                ("H", fee),
+                ("I", r["总计"]),
+                ("Q", date_str),
+            )
+
+
+@traced("excel.render")
+def render_invoice_files(summaries, max_rows=INVOICE_MAX_ROWS, template_path=INVOICE_TEMPLATE_PATH):
+    """生成发票申请表，返回 [(文件名, 文件内容), ...]
+
+    summaries 为每个申请人的 {"申请人", "统一社会信用代码", "总官费", "总代理费", "总计"}。
+    数据行超过 max_rows 时按申请人拆分为多个文件（同一申请人的两行不拆开），
+    文件名依次加 -1、-2 等后缀。
+    """
+    template = get_invoice_template(template_path)
+    today = datetime.date.today()
+    rows = list(invoice_rows(summaries, today.strftime("%Y年%m月%d日")))
+
+    chunk_rows = max(2, max_rows - max_rows % 2)
+    chunks = [rows[start:start + chunk_rows] for start in range(0, len(rows), chunk_rows)] or [[]]
+    files = []
+    for idx, chunk in enumerate(chunks, 1):
+        suffix = f"-{idx}" if len(chunks) > 1 else ""
+        output = io.BytesIO()
+        template.write(chunk, output)
+        files.append((f"发票申请表-{today.strftime('%Y%m%d')}{suffix}.xlsx", output.getvalue()))
+    return files
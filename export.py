@@ -0,0 +1,103 @@
+"""历史案件导出
+
+按块从SQLite读取查询结果并逐行写出CSV或XLSX（openpyxl只写模式），
+内存占用不随导出行数增长。
+"""
+import contextlib
+import csv
+import io
+import os
+import tempfile
+
+from db import build_filtered_cases_query, get_connection
+
+# 每次从数据库读取的行数
+CHUNK_SIZE = 5000
+# Excel单个工作表最多1048576行，超出时续写到新工作表
+XLSX_MAX_ROWS = 1048576
+
+EXPORT_FORMATS = {
+    "csv": "text/csv",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+
+def iter_export_rows(query, include_files=False, chunk_size=CHUNK_SIZE):
+    """先产出表头，再逐行产出筛选结果
+
+    query 为 db.get_filtered_cases 的筛选条件字典。include_files 为True时
+    附加关联文件的名称和路径（多个以分号分隔）。
+    """
+    conn = get_connection()
+    sql, params = build_filtered_cases_query(conn=conn, **query)
+    if include_files:
+        # 相关子查询逐行走 generated_files(case_id) 索引，不需要对整个结果分组排序
+        sql = f'''SELECT c.*,
+                         (SELECT GROUP_CONCAT(file_name, ';') FROM generated_files
+                          WHERE case_id = c.id) AS file_names,
+                         (SELECT GROUP_CONCAT(file_path, ';') FROM generated_files
+                          WHERE case_id = c.id) AS file_paths
+                  FROM ({sql}) c'''
+
+    cursor = conn.execute(sql, params)
+    try:
+        yield [col[0] for col in cursor.description]
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield from rows
+    finally:
+        cursor.close()
+
+
+def write_csv(rows, fileobj):
+    """把行写入二进制文件对象（UTF-8编码）"""
+    text = io.TextIOWrapper(fileobj, encoding="utf-8", newline="")
+    csv.writer(text, lineterminator="\n").writerows(rows)
+    text.flush()
+    # 与调用方共用底层文件，避免包装器关闭时一并关闭
+    text.detach()
+
+
+def write_xlsx(rows, fileobj, sheet_title="商标案件数据", max_rows=XLSX_MAX_ROWS):
+    """写入只写模式工作簿；第一行为表头，超过 max_rows 时在新工作表中重复表头后续写"""
+    from openpyxl import Workbook  # 只在导出XLSX时才导入
+
+    wb = Workbook(write_only=True)
+    rows = iter(rows)
+    header = list(next(rows))
+    ws = None
+    sheet_rows = max_rows
+    for row in rows:
+        if sheet_rows >= max_rows:
+            ws = wb.create_sheet(sheet_title if ws is None else f"{sheet_title}{len(wb.worksheets) + 1}")
+            ws.append(header)
+            sheet_rows = 1
+        ws.append(list(row))
+        sheet_rows += 1
+    if ws is None:
+        wb.create_sheet(sheet_title).append(header)
+    wb.save(fileobj)
+
+
+def export_cases(fmt, query, include_files=False):
+    """导出筛选结果到临时文件，返回以只读方式打开的文件（io.BufferedReader）
+
+    st.download_button 只接受 bytes、BytesIO、BufferedReader 等类型，
+    TemporaryFile 返回的 BufferedRandom 会被拒绝，因此写完后重新以 "rb" 打开。
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"不支持的导出格式: {fmt}")
+    with tempfile.NamedTemporaryFile(suffix=f".{fmt}", delete=False) as out:
+        rows = iter_export_rows(query, include_files)
+        if fmt == "csv":
+            write_csv(rows, out)
+        else:
+            write_xlsx(rows, out)
+    try:
+        return open(out.name, "rb")
+    finally:
+        # 已打开的文件删除后仍可读取，关闭时释放；Windows 下不能删除打开的文件，留在临时目录中
+        with contextlib.suppress(OSError):
+            os.unlink(out.name)
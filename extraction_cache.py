@@ -0,0 +1,112 @@
+"""PDF提取结果缓存
+
+以PDF内容的SHA-256、提取逻辑版本号、提取方式和文本后端作为键，将提取结果以JSON
+保存在 trademark_data.db 的 extraction_cache 表中。重复上传的文件直接
+复用缓存结果，不再解析PDF。
+"""
+import hashlib
+import json
+import threading
+import time
+
+from db import DB_PATH, get_connection, transaction
+from extractors import EXTRACTOR_VERSION, case_extractor
+from text_backends import DEFAULT_BACKEND, PdfBytes, pdf_name
+
+# 缓存条目最长保留天数
+DEFAULT_MAX_AGE_DAYS = 90
+# 缓存数据总大小上限（字节），超出时按最近使用时间淘汰
+DEFAULT_MAX_BYTES = 200 * 1024 * 1024
+
+
+def file_sha256(pdf):
+    """PDF内容的SHA-256；pdf 为文件路径或 PdfBytes"""
+    if isinstance(pdf, PdfBytes):
+        return hashlib.sha256(pdf.data).hexdigest()
+    sha = hashlib.sha256()
+    with open(pdf, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+class ExtractionCache:
+    def __init__(self, db_path=DB_PATH, max_age_days=DEFAULT_MAX_AGE_DAYS,
+                 max_bytes=DEFAULT_MAX_BYTES):
+        self.db_path = db_path
+        self.max_age_days = max_age_days
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        get_connection(self.db_path).execute('''CREATE TABLE IF NOT EXISTS extraction_cache (
+                        cache_key TEXT PRIMARY KEY,
+                        payload TEXT NOT NULL,
+                        size INTEGER NOT NULL,
+                        created_at REAL NOT NULL,
+                        last_used REAL NOT NULL
+                        )''')
+
+    def key_for(self, pdf, case_type, backend=DEFAULT_BACKEND):
+        """生成缓存键；案件类文件无法识别类型时返回None（不缓存）
+
+        不同文本后端的提取结果分别缓存：改用 pdfplumber 绕过 PyMuPDF 读错的文件时
+        不会命中原来的结果。
+        """
+        if case_type == "新申请商标":
+            mode = case_type
+        else:
+            try:
+                mode = case_extractor(pdf_name(pdf)).__name__
+            except ValueError:
+                return None
+        return f"{file_sha256(pdf)}:{EXTRACTOR_VERSION}:{mode}:{backend}"
+
+    def get(self, key):
+        """返回缓存的 {"data": ..., "warnings": [...]}，未命中返回None"""
+        conn = get_connection(self.db_path)
+        row = conn.execute("SELECT payload, created_at FROM extraction_cache WHERE cache_key = ?",
+                           (key,)).fetchone()
+        now = time.time()
+        if row and now - row[1] <= self.max_age_days * 86400:
+            conn.execute("UPDATE extraction_cache SET last_used = ? WHERE cache_key = ?", (now, key))
+            with self._lock:
+                self.hits += 1
+            return json.loads(row[0])
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put_many(self, entries):
+        """写入 [(key, data, warnings), ...] 并执行淘汰"""
+        now = time.time()
+        rows = []
+        for key, data, warnings in entries:
+            payload = json.dumps({"data": data, "warnings": warnings}, ensure_ascii=False)
+            rows.append((key, payload, len(payload.encode("utf-8")), now, now))
+
+        with transaction(self.db_path) as conn:
+            conn.executemany('''INSERT OR REPLACE INTO extraction_cache (
+                                cache_key, payload, size, created_at, last_used
+                                ) VALUES (?, ?, ?, ?, ?)''', rows)
+            self._evict(conn, now)
+
+    def _evict(self, conn, now):
+        conn.execute("DELETE FROM extraction_cache WHERE created_at < ?",
+                     (now - self.max_age_days * 86400,))
+        # 从最近使用的条目开始累计大小，超出上限的部分删除
+        conn.execute('''DELETE FROM extraction_cache WHERE cache_key IN (
+                            SELECT cache_key FROM (
+                                SELECT cache_key,
+                                       SUM(size) OVER (ORDER BY last_used DESC, cache_key) AS running
+                                FROM extraction_cache)
+                            WHERE running > ?)''', (self.max_bytes,))
+
+    def stats(self):
+        entries, size = get_connection(self.db_path).execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM extraction_cache").fetchone()
+        return {"hits": self.hits, "misses": self.misses, "entries": entries, "bytes": size}
+
+    def clear(self):
+        get_connection(self.db_path).execute("DELETE FROM extraction_cache")
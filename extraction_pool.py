@@ -0,0 +1,132 @@
+"""多进程PDF提取引擎"""
+import multiprocessing
+import os
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import metrics
+from extractors import extract_file
+from text_backends import DEFAULT_BACKEND, PdfBytes, pdf_name
+
+# 默认并行进程数
+DEFAULT_WORKERS = min(4, os.cpu_count() or 1)
+# 进程池的启动方式：Streamlit 服务器是多线程的，fork 会把其他线程持有的锁原样
+# 复制到子进程中，可能导致子进程死锁。forkserver 从一个干净的单线程服务进程
+# fork 子进程，并预先导入提取和生成模块；不支持时（Windows）使用 spawn。
+if "forkserver" in multiprocessing.get_all_start_methods():
+    MP_CONTEXT = multiprocessing.get_context("forkserver")
+    MP_CONTEXT.set_forkserver_preload(["extraction_pool", "generation_pool"])
+else:
+    MP_CONTEXT = multiprocessing.get_context("spawn")
+
+
+def extract_one(pdf, case_type, backend=DEFAULT_BACKEND):
+    """提取单个文件，异常转为结果中的错误信息，便于跨进程返回"""
+    result = {
+        "filename": pdf_name(pdf),
+        "data": None,
+        "warnings": [],
+        "error": None,
+        "traceback": None,
+        "cached": False,
+        "page_stats": {},
+        "metrics": None,
+    }
+    # 单独记录本文件的耗时，随结果返回后由父进程合并
+    with metrics.recording() as recorder:
+        try:
+            with metrics.span("extract.file"):
+                result["data"] = extract_file(pdf, case_type, result["warnings"], backend,
+                                              result["page_stats"])
+        except Exception as e:
+            result["error"] = str(e)
+            result["traceback"] = traceback.format_exc()
+    result["metrics"] = recorder.snapshot()
+    return result
+
+
+def picklable(pdf):
+    """提交到子进程前把 memoryview 形式的内存PDF转换为 bytes"""
+    if isinstance(pdf, PdfBytes) and isinstance(pdf.data, memoryview):
+        return PdfBytes(pdf.filename, pdf.data.tobytes())
+    return pdf
+
+
+def extract_files(pdfs, case_type, max_workers=DEFAULT_WORKERS, on_progress=None,
+                  backend=DEFAULT_BACKEND, cache=None):
+    """并行提取多个PDF文件（路径或 PdfBytes）
+
+    返回结果与 pdfs 顺序一致；每完成一个文件调用一次
+    on_progress(已完成数, 总数, 结果)。传入 cache 时先按文件内容查询
+    提取缓存，只有未命中的文件才会被解析。顺序处理时内存PDF直接在
+    当前进程解析，不产生额外副本。
+    """
+    pdfs = list(pdfs)
+    total = len(pdfs)
+    results = [None] * total
+    keys = [None] * total
+    done = 0
+
+    def finish(idx, result):
+        nonlocal done
+        results[idx] = result
+        metrics.merge(result["metrics"])
+        done += 1
+        if on_progress:
+            on_progress(done, total, result)
+
+    pending = []
+    for idx, pdf in enumerate(pdfs):
+        if cache is not None:
+            keys[idx] = cache.key_for(pdf, case_type, backend)
+            cached = cache.get(keys[idx]) if keys[idx] else None
+            if cached is not None:
+                data = cached["data"]
+                if "文件名" in data:
+                    data["文件名"] = pdf_name(pdf)
+                finish(idx, {
+                    "filename": pdf_name(pdf),
+                    "data": data,
+                    "warnings": cached["warnings"],
+                    "error": None,
+                    "traceback": None,
+                    "cached": True,
+                    "page_stats": {},
+                    "metrics": None,
+                })
+                metrics.count("extract.cache_hits")
+                continue
+        pending.append(idx)
+
+    if max_workers <= 1 or len(pending) <= 1:
+        for idx in pending:
+            finish(idx, extract_one(pdfs[idx], case_type, backend))
+    else:
+        with ProcessPoolExecutor(max_workers=min(max_workers, len(pending)), mp_context=MP_CONTEXT) as executor:
+            futures = {executor.submit(extract_one, picklable(pdfs[idx]), case_type, backend): idx
+                       for idx in pending}
+            for future in as_completed(futures):
+                idx = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    # 子进程异常退出等情况
+                    result = {
+                        "filename": pdf_name(pdfs[idx]),
+                        "data": None,
+                        "warnings": [],
+                        "error": str(e),
+                        "traceback": traceback.format_exc(),
+                        "cached": False,
+                        "page_stats": {},
+                        "metrics": None,
+                    }
+                finish(idx, result)
+
+    if cache is not None:
+        entries = [(keys[idx], results[idx]["data"], results[idx]["warnings"])
+                   for idx in pending if keys[idx] and not results[idx]["error"]]
+        if entries:
+            with metrics.span("extract.cache_store"):
+                cache.put_many(entries)
+    return results
@@ -0,0 +1,224 @@
+"""PDF字段提取函数（不依赖Streamlit，可在子进程中调用）"""
+import logging
+import patterns
+from metrics import traced
+from text_backends import DEFAULT_BACKEND, PdfTextReader, looks_wrong, normalize_page_text, pdf_name
+
+# 提取逻辑版本号，修改提取规则后需递增以使提取缓存失效
+EXTRACTOR_VERSION = 4
+
+# 案件类文件中需要保留的页面关键词
+CASE_PAGE_KEYWORDS = ["申请书", "申 请 书", "撤销", "异议", "无效", "宣告"]
+
+# 案件类提取结果中必须找到的字段，全部找到后遇到非申请书页即停止读取
+CASE_REQUIRED_FIELDS = ("申请人", "商标列表")
+
+logger = logging.getLogger(__name__)
+
+# 新申请PDF首页应包含的锚点标签，缺失时该页回退到pdfplumber
+FIRST_PAGE_ANCHORS = ("申请人名称",)
+
+# ============================= 新申请商标处理函数 =============================
+def extract_pdf_data(pdf, warnings=None, backend=DEFAULT_BACKEND):
+    """从新申请PDF（路径或 PdfBytes）提取数据，提示信息追加到 warnings 列表"""
+    with PdfTextReader(pdf, backend) as reader:
+        return parse_new_application(iter_new_application_pages(reader),
+                                     pdf_name(pdf), warnings)
+
+def iter_new_application_pages(reader):
+    """逐页产出规范化后的页面文本，每页只提取一次"""
+    for i in range(len(reader)):
+        yield normalize_page_text(reader.page_text(i, FIRST_PAGE_ANCHORS if i == 0 else ())).strip()
+
+@traced("extract.parse")
+def parse_new_application(pages, filename, warnings=None):
+    """从新申请各页文本中提取申请人、类别与商标名称
+
+    pages 可以是逐页产出文本的生成器，类别与委托书的关联在读取过程中完成，
+    不需要保留已处理的页面。
+    """
+    if warnings is None:
+        warnings = []
+    applicant = "N/A"
+    unified_credit_code = "N/A"
+    final_date = "N/A"
+    trademarks_with_categories = []
+    pending_categories = []
+    
+    for page_num, page_text in enumerate(pages):
+        # 第一页：提取申请人和统一社会信用代码
+        if page_num == 0:
+            applicant_match = patterns.NEW_APPLICANT.search(page_text)
+            applicant = applicant_match.group(1).strip() if applicant_match else "N/A"
+            
+            unified_credit_code_match = patterns.CREDIT_CODE.search(page_text)
+            unified_credit_code = unified_credit_code_match.group(1).strip() if unified_credit_code_match else "N/A"
+            
+            # 尝试从第一页提取日期
+            if final_date == "N/A":
+                date_match = patterns.DATE.search(page_text)
+                final_date = date_match.group(1).replace(" ", "") if date_match else "N/A"
+            continue
+        
+        # 后续页面：提取类别或商标名
+        # 检查是否包含类别信息
+        categories_found = patterns.NEW_CATEGORY.findall(page_text)
+        if categories_found:
+            pending_categories.extend(categories_found)
+        
+        # 检查是否包含委托书
+        elif patterns.POA_TITLE in page_text:
+            tm_name_match = patterns.POA_TRADEMARK.search(page_text)
+            tm_name = tm_name_match.group(1).strip() if tm_name_match else ""
+            
+            if not tm_name:
+                fallback_match = patterns.POA_TRADEMARK_FALLBACK.search(page_text)
+                tm_name = fallback_match.group(1).strip() if fallback_match else ""
+            
+            if not tm_name:
+                warnings.append(f"警告：在文件 {filename} 的第 {page_num + 1} 页委托书中未找到商标名称。")
+            
+            # 提取委托书日期
+            date_match = patterns.DATE.search(page_text)
+            if date_match:
+                final_date = date_match.group(1).replace(" ", "")
+            
+            # 关联类别与商标名
+            if pending_categories:
+                for category in pending_categories:
+                    trademarks_with_categories.append({
+                        "商标名称": tm_name,
+                        "类别": category
+                    })
+                pending_categories.clear()
+            else:
+                trademarks_with_categories.append({
+                    "商标名称": tm_name,
+                    "类别": "MANUAL_INPUT_REQUIRED"
+                })
+                warnings.append(f"提示：文件 {filename} 中的商标 '{tm_name}' 未找到自动关联的类别，需要手动输入。")
+    
+    # 检查是否还有未关联的类别
+    if pending_categories:
+        warnings.append(f"警告：文件 {filename} 处理完毕，但仍有未关联的类别 {pending_categories}。这些类别将被忽略。")
+    
+    return {
+        "申请人": applicant,
+        "统一社会信用代码": unified_credit_code,
+        "日期": final_date,
+        "商标列表": trademarks_with_categories,
+        "事宜类型": "商标注册申请"
+    }
+
+# ============================= 案件类商标处理函数 =============================
+def case_extractor(filename):
+    """根据文件名确定案件类提取函数"""
+    if any(kw in filename for kw in ['驳回', '复审']):
+        return extract_review_case
+    elif any(kw in filename for kw in ['撤三', '撤销连续']):
+        return extract_non_use_case
+    elif '异议' in filename:
+        return extract_opposition_case
+    elif any(kw in filename for kw in ['无效', '宣告']):
+        return extract_invalid_case
+    else:
+        raise ValueError(f"无法识别案件类型: {filename}")
+
+def extract_case_info(text, filename):
+    return case_extractor(filename)(text, filename)
+
+@traced("extract.parse")
+def extract_case_by_spec(text, filename, case_type):
+    """按 patterns.CASE_SPECS 中的规则提取案件信息"""
+    spec = patterns.CASE_SPECS[case_type]
+    applicant = spec["applicant"].search(text)
+    applicant = applicant.group(1).strip() if applicant else "N/A"
+    
+    # 提取统一社会信用代码
+    unified_credit_code_match = patterns.CREDIT_CODE.search(text)
+    unified_credit_code = unified_credit_code_match.group(1).strip() if unified_credit_code_match else "N/A"
+    
+    trademarks = []
+    for m in spec["trademark"].finditer(text):
+        trademarks.append({
+            "商标名称": m.group(1).strip(), 
+            "类别": int(m.group(2)), 
+            "注册号": m.group(3)
+        })
+    
+    return {
+        "文件名": filename, 
+        "案件类型": case_type, 
+        "申请人": applicant,
+        "统一社会信用代码": unified_credit_code,
+        "商标列表": trademarks
+    }
+
+def extract_review_case(text, filename):
+    return extract_case_by_spec(text, filename, "驳回复审")
+
+def extract_non_use_case(text, filename):
+    return extract_case_by_spec(text, filename, "撤三申请")
+
+def extract_opposition_case(text, filename):
+    return extract_case_by_spec(text, filename, "商标异议")
+
+def extract_invalid_case(text, filename):
+    return extract_case_by_spec(text, filename, "无效宣告")
+
+# ============================= 文件级提取入口 =============================
+def has_required_fields(data):
+    return all(data[field] and data[field] != "N/A" for field in CASE_REQUIRED_FIELDS)
+
+def iter_case_form_pages(reader, done=lambda: False, page_stats=None):
+    """逐页产出案件类PDF中申请书页面的规范化文本
+
+    先用快速文本判断页面是否包含申请书关键词，跳过证据附件等页面；
+    done() 返回True（必需字段已全部找到）后，遇到第一页非申请书页面即停止。
+    总页数与跳过的页数记录在 page_stats 中。
+    """
+    total = len(reader)
+    skipped = 0
+    try:
+        for i in range(total):
+            probe = reader.probe_text(i)
+            # 快速文本为空或有乱码时无法判断，交给完整提取（可能回退到pdfplumber）
+            if not looks_wrong(probe) and not any(k in probe for k in CASE_PAGE_KEYWORDS):
+                if done():
+                    skipped += total - i
+                    break
+                skipped += 1
+                continue
+            
+            txt = reader.page_text(i)
+            if not txt or not any(k in txt for k in CASE_PAGE_KEYWORDS):
+                continue
+            yield normalize_page_text(txt)
+    finally:
+        logger.info("%s: 共 %d 页，跳过 %d 页", pdf_name(reader.pdf), total, skipped)
+        if page_stats is not None:
+            page_stats.update({"total": total, "skipped": skipped})
+
+def extract_case_file(pdf, backend=DEFAULT_BACKEND, page_stats=None):
+    """提取案件类PDF，只完整提取申请书页面
+
+    商标条目可能跨页，因此保留申请书页面的拼接文本；证据附件页不会被读取或保留。
+    """
+    filename = pdf_name(pdf)
+    extractor = case_extractor(filename)
+    found = False
+    form_text = ""
+    
+    with PdfTextReader(pdf, backend) as reader:
+        for txt in iter_case_form_pages(reader, lambda: found, page_stats):
+            form_text += txt
+            if not found:
+                found = has_required_fields(extractor(form_text.strip(), filename))
+    
+    return extractor(form_text.strip(), filename)
+
+def extract_file(pdf, case_type, warnings=None, backend=DEFAULT_BACKEND, page_stats=None):
+    """按案件类型提取单个PDF文件（路径或 PdfBytes）"""
+    if case_type == "新申请商标":
+        return extract_pdf_data(pdf, warnings, backend)
+    return extract_case_file(pdf, backend, page_stats)
@@ -0,0 +1,72 @@
+"""多进程请款单生成"""
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import metrics
+from documents import WORD_TEMPLATE_PATH, render_word_doc
+from extraction_pool import DEFAULT_WORKERS, MP_CONTEXT
+
+
+def render_one(applicant, records, case_type, template_path=WORD_TEMPLATE_PATH):
+    """生成单个申请人的请款单，异常转为结果中的错误信息，便于跨进程返回"""
+    result = {
+        "applicant": applicant,
+        "filename": None,
+        "data": None,
+        "error": None,
+        "traceback": None,
+        "metrics": None,
+    }
+    with metrics.recording() as recorder:
+        try:
+            result["filename"], result["data"] = render_word_doc(applicant, records, case_type, template_path)
+        except Exception as e:
+            result["error"] = str(e)
+            result["traceback"] = traceback.format_exc()
+    result["metrics"] = recorder.snapshot()
+    return result
+
+
+def render_documents(jobs, case_type, max_workers=DEFAULT_WORKERS, on_progress=None,
+                     template_path=WORD_TEMPLATE_PATH):
+    """并行生成多个申请人的请款单
+
+    jobs 为 records.ApplicantRecords 序列。返回结果与 jobs 顺序一致，文件内容
+    直接以字节返回；每完成一份调用一次 on_progress(已完成数, 总数, 结果)。
+    """
+    jobs = list(jobs)
+    total = len(jobs)
+    results = [None] * total
+    done = 0
+
+    def finish(idx, result):
+        nonlocal done
+        results[idx] = result
+        metrics.merge(result["metrics"])
+        done += 1
+        if on_progress:
+            on_progress(done, total, result)
+
+    if max_workers <= 1 or total <= 1:
+        for idx, job in enumerate(jobs):
+            finish(idx, render_one(job.applicant, job.records, case_type, template_path))
+    else:
+        with ProcessPoolExecutor(max_workers=min(max_workers, total), mp_context=MP_CONTEXT) as executor:
+            futures = {executor.submit(render_one, job.applicant, job.records, case_type, template_path): idx
+                       for idx, job in enumerate(jobs)}
+            for future in as_completed(futures):
+                idx = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    # 子进程异常退出等情况
+                    result = {
+                        "applicant": jobs[idx].applicant,
+                        "filename": None,
+                        "data": None,
+                        "error": str(e),
+                        "traceback": traceback.format_exc(),
+                        "metrics": None,
+                    }
+                finish(idx, result)
+    return results
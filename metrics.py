@@ -0,0 +1,176 @@
+"""轻量的耗时统计
+
+在热点函数外包一层 span（上下文管理器）或 traced（装饰器），用纳秒计时器
+按名称累计调用次数、总耗时、自身耗时（扣除嵌套 span）和最长一次；count()
+累加计数。只有在 recording() 内才会计时，平时 span 几乎没有开销。
+
+记录按线程隔离（Streamlit 每个会话在各自的线程中运行）。子进程中的记录以
+snapshot() 随结果返回，由父进程 merge() 合并。一个批次（处理PDF、生成请款单）
+用 batch() 包裹，可同时用 cProfile 或 pyinstrument 剖析并把结果写入文件。
+"""
+import cProfile
+import datetime
+import functools
+import importlib.util
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+# 剖析结果的输出目录
+PROFILE_DIR = "profiles"
+# 可用的剖析方式（pyinstrument为可选依赖，使用时才导入）
+PROFILERS = ("cprofile", "pyinstrument") if importlib.util.find_spec("pyinstrument") else ("cprofile",)
+
+_local = threading.local()
+
+
+class Recorder:
+    """一个批次的统计：spans 为 {名称: [次数, 总耗时ns, 自身耗时ns, 最长ns]}，counters 为 {名称: 计数}"""
+
+    def __init__(self, batch_id=None):
+        self.batch_id = batch_id or f"{datetime.datetime.now():%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:6]}"
+        self.spans = {}
+        self.counters = {}
+        self.profile_path = None
+        self._stack = []
+
+    def add_span(self, name, elapsed_ns, self_ns, calls=1, max_ns=None):
+        stats = self.spans.get(name)
+        if stats is None:
+            stats = self.spans[name] = [0, 0, 0, 0]
+        stats[0] += calls
+        stats[1] += elapsed_ns
+        stats[2] += self_ns
+        stats[3] = max(stats[3], elapsed_ns if max_ns is None else max_ns)
+
+    def add(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def snapshot(self):
+        """可序列化（跨进程、JSON）的统计结果"""
+        return {"spans": {name: list(stats) for name, stats in self.spans.items()},
+                "counters": dict(self.counters)}
+
+    def merge(self, snapshot):
+        if not snapshot:
+            return
+        for name, (calls, total_ns, self_ns, max_ns) in snapshot["spans"].items():
+            self.add_span(name, total_ns, self_ns, calls, max_ns)
+        for name, n in snapshot["counters"].items():
+            self.add(name, n)
+
+    def rows(self):
+        """按总耗时降序的展示/入库行，计数器排在最后"""
+        rows = [{
+            "name": name,
+            "kind": "span",
+            "calls": calls,
+            "total_ms": total_ns / 1e6,
+            "self_ms": self_ns / 1e6,
+            "avg_ms": total_ns / calls / 1e6,
+            "max_ms": max_ns / 1e6,
+        } for name, (calls, total_ns, self_ns, max_ns) in
+            sorted(self.spans.items(), key=lambda item: -item[1][1])]
+        rows.extend({"name": name, "kind": "counter", "calls": n}
+                    for name, n in sorted(self.counters.items()))
+        return rows
+
+
+def current():
+    """当前线程正在记录的 Recorder，未在记录时为None"""
+    return getattr(_local, "recorder", None)
+
+
+@contextmanager
+def recording(recorder=None):
+    """在此范围内记录 span 和计数，返回的 Recorder 退出后仍可读取"""
+    recorder = recorder or Recorder()
+    previous = current()
+    _local.recorder = recorder
+    try:
+        yield recorder
+    finally:
+        _local.recorder = previous
+
+
+@contextmanager
+def span(name):
+    recorder = current()
+    if recorder is None:
+        yield
+        return
+    frame = [0]  # 嵌套 span 的耗时，用于计算自身耗时
+    recorder._stack.append(frame)
+    start = time.perf_counter_ns()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter_ns() - start
+        recorder._stack.pop()
+        if recorder._stack:
+            recorder._stack[-1][0] += elapsed
+        recorder.add_span(name, elapsed, elapsed - frame[0])
+
+
+def traced(name):
+    """把整个函数调用记为一个 span"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def count(name, n=1):
+    recorder = current()
+    if recorder is not None:
+        recorder.add(name, n)
+
+
+def merge(snapshot):
+    """把子进程返回的统计合并到当前记录中"""
+    recorder = current()
+    if recorder is not None:
+        recorder.merge(snapshot)
+
+
+@contextmanager
+def batch(stage, profile=None, profile_dir=PROFILE_DIR):
+    """记录一个批次，返回 Recorder
+
+    profile 为 "cprofile" 或 "pyinstrument" 时同时剖析当前进程，结果写入
+    profile_dir/<阶段>-<批次ID>.prof（可用 pstats/snakeviz 查看）或 .html，
+    路径记录在 recorder.profile_path。子进程中的工作不在剖析范围内，
+    需要时请使用单进程运行。
+    """
+    if profile not in (None, *PROFILERS):
+        raise ValueError(f"不支持的剖析方式: {profile}")
+    with recording() as recorder:
+        profiler = None
+        if profile == "cprofile":
+            profiler = cProfile.Profile()
+            profiler.enable()
+        elif profile == "pyinstrument":
+            import pyinstrument
+            profiler = pyinstrument.Profiler()
+            profiler.start()
+        try:
+            yield recorder
+        finally:
+            if profiler is not None:
+                os.makedirs(profile_dir, exist_ok=True)
+                path = os.path.join(profile_dir, f"{stage}-{recorder.batch_id}")
+                if profile == "cprofile":
+                    profiler.disable()
+                    path += ".prof"
+                    profiler.dump_stats(path)
+                else:
+                    profiler.stop()
+                    path += ".html"
+                    with open(path, "w", encoding="utf-8") as f:
+                        f.write(profiler.output_html())
+                recorder.profile_path = path
@@ -0,0 +1,55 @@
+"""提取用正则表达式注册表
+
+所有正则在导入时编译一次。跨行匹配的部分使用有上限的量词，
+避免在长文本上匹配失败时大量回溯。
+"""
+import re
+
+# ============================= 通用字段 =============================
+CREDIT_CODE = re.compile(r'(?:统一社会信用代码|信用代码)[：:]\s*([0-9A-Z]{18})', re.IGNORECASE)
+DATE = re.compile(r"(\d{4}年\s*\d{1,2}月\s*\d{1,2}日)")
+
+# ============================= 新申请商标 =============================
+NEW_APPLICANT = re.compile(r"申请人名称\(中文\)：\s*(.*?)\s*\(\s*英文\)")
+NEW_CATEGORY = re.compile(r'类别：(\d+)')
+# 委托书中“代理 XX 商标的如下……事宜”，各段长度设上限
+POA_TRADEMARK = re.compile(
+    r'商标代理委托书[\s\S]{0,1000}?代理\s+([\s\S]{0,200}?)商标\s*的\s*如下[\s\S]{0,500}?事宜')
+POA_TRADEMARK_FALLBACK = re.compile(r'代理\s+(.*?)\s*商标')
+POA_TITLE = '商 标 代 理 委 托 书'
+
+# ============================= 案件类商标 =============================
+# 商标名称最多 TRADEMARK_NAME_MAX 个字符，可折行；类别与注册号之间隔着
+# 指定商品/服务列表，最多跨越 TRADEMARK_GAP 个字符（足以容纳整类商品）
+TRADEMARK_NAME_MAX = 200
+TRADEMARK_GAP = 10000
+
+
+def _trademark_pattern(name_label, category_label, number_label):
+    return re.compile(
+        rf'{name_label}：\s*([\s\S]{{0,{TRADEMARK_NAME_MAX}}}?)\s+{category_label}：\s*(\d+)'
+        rf'[\s\S]{{0,{TRADEMARK_GAP}}}?{number_label}：\s*([0-9A-Za-z]+)')
+
+
+# 各案件类型的提取规则：applicant 的第1组为申请人，trademark 的三组依次为商标名称、类别、注册号
+CASE_SPECS = {
+    "驳回复审": {
+        "applicant": re.compile(
+            r'(?:申请人名称\$\$中文\$\$|申请人名称)：\s*([^\n]*?)(?=\s+(?:统一社会信用代码|地址))'),
+        "trademark": _trademark_pattern('申请商标', '类别', '申请号/国际注册号'),
+    },
+    "撤三申请": {
+        "applicant": re.compile(
+            r'(?:申请人名称|申请人)：\s*([^\n]*?)(?=\s+(?:统一社会信用代码|地址))'),
+        "trademark": _trademark_pattern('商标', '类别', '商标注册号'),
+    },
+    "商标异议": {
+        "applicant": re.compile(r'异议人名称：\s*([^\n]*?)\s+统一社会信用代码', re.IGNORECASE),
+        "trademark": _trademark_pattern('被异议商标', '被异议类别', '商标注册号'),
+    },
+    "无效宣告": {
+        "applicant": re.compile(
+            r'(?:申请人名称\$\$中文\$\$|申请人名称)：\s*([^\n]*?)(?=\s+(?:统一社会信用代码|地址))'),
+        "trademark": _trademark_pattern('争议商标', '类别', '注册号/国际注册号'),
+    },
+}
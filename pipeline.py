@@ -0,0 +1,262 @@
+"""案件处理流水线（不依赖Streamlit）
+
+提取 → 按申请人聚合 → 计算费用 → 生成请款单和发票申请表 → 持久化，
+供 Streamlit 页面和命令行批处理（batch.py）共用。各步骤只返回结果和
+出错信息，由调用方决定如何展示。
+
+生成的每个文件记录其输入的指纹；再次生成时传入上次的结果，输入未变的
+文件直接沿用，只重新生成变化的申请人。
+"""
+import datetime
+import hashlib
+import json
+import os
+import traceback
+from dataclasses import astuple
+
+from db import DB_PATH, find_billed_cases, save_generated_documents
+from documents import (INVOICE_MAX_ROWS, INVOICE_TEMPLATE_PATH, WORD_TEMPLATE_PATH,
+                       render_invoice_files)
+from extraction_pool import DEFAULT_WORKERS
+from generation_pool import render_documents
+from metrics import count
+from records import ApplicantRecords, Batch, TrademarkRecord
+from storage import store_files
+
+CASE_TYPES = ["新申请商标", "案件类商标"]
+
+# 官费标准
+OFFICIAL_FEES = {
+    "驳回复审": 675,
+    "商标异议": 450,
+    "撤三申请": 450,
+    "无效宣告": 750,
+    "新申请商标": 270,  # 新申请商标的官费
+}
+
+# 未单独设置时每件的代理费
+DEFAULT_AGENT_FEE = 1000
+
+
+def aggregate_results(results, case_type):
+    """把提取结果按申请人聚合为 records.Batch，出错的文件跳过
+
+    results 为 extraction_pool.extract_files 的返回值。新申请中需要手动输入类别
+    的商标以 MANUAL_CATEGORY 保留在原位置，生成时再按手动输入的类别展开。
+    """
+    batch = Batch(case_type)
+    for result in results:
+        if result["error"]:
+            continue
+        data = result["data"]
+        filename = result["filename"]
+        if case_type == "新申请商标":
+            record_type, official_fee = "商标注册申请", OFFICIAL_FEES["新申请商标"]
+        else:
+            record_type, official_fee = data["案件类型"], OFFICIAL_FEES[data["案件类型"]]
+        batch.add_file(data["申请人"], data["统一社会信用代码"], filename,
+                       [TrademarkRecord(tm["商标名称"], tm["类别"], record_type, official_fee, filename,
+                                        registration_number=tm.get("注册号"))
+                        for tm in data["商标列表"]])
+    return batch
+
+
+def parse_categories(text):
+    """解析逗号分隔的类别输入"""
+    return [cat.strip() for cat in text.split(",") if cat.strip()]
+
+
+def build_jobs(batch, agent_fees=None):
+    """一次遍历整个批次计算费用，返回 (jobs, errors)
+
+    jobs 为每个申请人一个 ApplicantRecords，记录为填入了代理费的副本（不修改
+    batch 中的记录），并汇总了总官费和总代理费；agent_fees 为 {申请人: 代理费}。需要手动输入类别的商标
+    按 Batch.set_categories 记录的每个类别展开为一行，未输入时跳过。单个
+    申请人出错不影响其他申请人，错误以 (申请人, 错误信息, 堆栈) 返回。
+    """
+    agent_fees = agent_fees or {}
+    jobs = []
+    errors = []
+    for group in batch.applicants.values():
+        try:
+            agent_fee = agent_fees.get(group.applicant, DEFAULT_AGENT_FEE)
+            job = ApplicantRecords(group.applicant, group.unified_credit_code)
+            for record in group.records:
+                if record.needs_category:
+                    job.records.extend(record.billed(agent_fee, cat)
+                                       for cat in parse_categories(group.pending[record.trademark_name]))
+                else:
+                    job.records.append(record.billed(agent_fee))
+            for record in job.records:
+                job.total_official += record.official_fee
+                job.total_agent += agent_fee
+            if job.records:
+                jobs.append(job)
+        except Exception as e:
+            errors.append((group.applicant, str(e), traceback.format_exc()))
+    return jobs, errors
+
+
+def billing_key(job, record):
+    """判断重复请款的键，与 db.BILLING_KEY_COLUMNS 对应"""
+    return (job.unified_credit_code, record.registration_number, str(record.category), record.case_type)
+
+
+def describe_record(job, record):
+    return (f"申请人 '{job.applicant}' 的商标 '{record.trademark_name}'"
+            f"（注册号 {record.registration_number}，第{record.category}类，{record.case_type}）")
+
+
+def find_duplicates(jobs, batch_id=None, db_path=DB_PATH):
+    """生成前的重复请款检查，返回提示信息列表
+
+    同一委托人（统一社会信用代码）的同一注册号、类别和案件类型在本批次中
+    重复出现，或已有保存过的案件，各提示一次；整批的键一次性与数据库比对，
+    提示中给出最近一次请款日期和共请款几次。
+    本批次（batch_id）此前保存的案件将被沿用或取代，不算重复；其他批次
+    （包括本会话此前处理的、请款单内容完全相同的批次）的案件照常提示。
+    没有注册号的商标（新申请）不检查。
+    """
+    first = {}
+    warnings = []
+    for job in jobs:
+        for record in job.records:
+            if not record.registration_number:
+                continue
+            key = billing_key(job, record)
+            if key in first:
+                warnings.append(f"{describe_record(job, record)}在本批次中重复出现")
+            else:
+                first[key] = (job, record)
+
+    for key, cases in find_billed_cases(first, db_path).items():
+        cases = [case for case in cases if batch_id is None or case["batch_id"] != batch_id]
+        if cases:
+            latest = cases[0]
+            warnings.append(f"{describe_record(*first[key])}已于 {latest['processing_date']} "
+                            f"请过款（申请人 '{latest['applicant']}'，共 {len(cases)} 次）")
+    return warnings
+
+
+def invoice_summary(job):
+    """发票申请表中一个申请人的汇总"""
+    return {
+        "申请人": job.applicant,
+        "统一社会信用代码": job.unified_credit_code,
+        "总官费": job.total_official,
+        "总代理费": job.total_agent,
+        "总计": job.total,
+    }
+
+
+def fingerprint(*inputs):
+    """生成文件输入的指纹；文件内容含生成日期，日期一并计入"""
+    payload = json.dumps([datetime.date.today().isoformat(), *inputs],
+                         ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def same_batch(previous, batch_id):
+    """上次生成的 {申请人: 文件} 中由同一批次（Batch.batch_id）生成的部分"""
+    return {applicant: file for applicant, file in (previous or {}).items()
+            if file.get("batch_id") == batch_id}
+
+
+def generate_word_docs(jobs, case_type, max_workers=DEFAULT_WORKERS, on_progress=None, previous=None,
+                       batch_id=None):
+    """并行生成请款单（在内存中），返回 (word_docs, errors)
+
+    jobs 为 build_jobs 返回的 ApplicantRecords 列表。word_docs 为 (job, 文件) 列表，
+    文件为 {"name", "data", "type", "fingerprint", "batch_id"}；生成失败的申请人以
+    (申请人, 错误信息, 堆栈) 列入 errors。
+    previous 为上次生成的 {申请人: 文件}，其中只有同一批次（batch_id）的文件
+    参与比较：指纹相同的直接沿用原文件对象，其余重新生成，新文件的
+    "supersedes" 记录被取代的旧文件路径。其他批次的同名申请人是另一份请款单，
+    不沿用也不取代。on_progress 只对重新生成的申请人调用。
+    """
+    previous = same_batch(previous, batch_id)
+    template_mtime = os.path.getmtime(WORD_TEMPLATE_PATH)
+    fingerprints = [fingerprint(job.applicant, job.unified_credit_code, case_type, template_mtime,
+                                [astuple(record) for record in job.records])
+                    for job in jobs]
+
+    word_docs = [None] * len(jobs)
+    pending = []
+    for idx, (job, digest) in enumerate(zip(jobs, fingerprints)):
+        old = previous.get(job.applicant)
+        if old is not None and old.get("fingerprint") == digest:
+            word_docs[idx] = (job, old)
+        else:
+            pending.append(idx)
+
+    count("word.reused", len(jobs) - len(pending))
+    errors = []
+    results = render_documents([jobs[idx] for idx in pending], case_type, max_workers, on_progress)
+    for idx, result in zip(pending, results):
+        job = jobs[idx]
+        if result["error"]:
+            errors.append((job.applicant, result["error"], result["traceback"]))
+            continue
+        file = {
+            "name": result["filename"],
+            "data": result["data"],
+            "type": "word",
+            "fingerprint": fingerprints[idx],
+            "batch_id": batch_id,
+        }
+        old = previous.get(job.applicant)
+        if old is not None and old.get("path"):
+            file["supersedes"] = old["path"]
+        word_docs[idx] = (job, file)
+    return [doc for doc in word_docs if doc is not None], errors
+
+
+def generate_invoices(word_docs, max_rows=INVOICE_MAX_ROWS, previous=None):
+    """为已生成请款单的申请人生成发票申请表，返回文件列表
+
+    previous 为上次生成的发票申请表文件列表，汇总内容未变时直接沿用。
+    """
+    summaries = [invoice_summary(job) for job, _ in word_docs]
+    digest = fingerprint(os.path.getmtime(INVOICE_TEMPLATE_PATH), max_rows, summaries)
+    if previous and all(file.get("fingerprint") == digest for file in previous):
+        return previous
+    return [{"name": name, "data": data, "type": "excel", "fingerprint": digest}
+            for name, data in render_invoice_files(summaries, max_rows=max_rows)]
+
+
+def save_results(word_docs, excel_files, store=None, db_path=DB_PATH, batch_id=None):
+    """持久化：文件按内容写入存储，再在同一事务中写入案件及文件记录
+
+    已保存过的文件（沿用上次生成结果的，带有 "blob_hash"）跳过；重新生成的
+    请款单替换本批次（batch_id）此前为该申请人写入的案件，重新生成的发票申请表
+    替换本批次上一版的文件记录；其他批次的记录保留。
+    """
+    word_docs = [doc for doc in word_docs if "blob_hash" not in doc[1]]
+    excel_files = [file for file in excel_files if "blob_hash" not in file]
+    if not word_docs and not excel_files:
+        return
+    store_files([file for _, file in word_docs] + excel_files, store)
+    processing_date = datetime.date.today().strftime("%Y-%m-%d")
+    save_generated_documents(
+        [([{
+            "applicant": job.applicant,
+            "unified_credit_code": job.unified_credit_code,
+            "case_type": record.case_type,
+            "trademark_name": record.trademark_name,
+            "category": record.category,
+            "official_fee": record.official_fee,
+            "agent_fee": record.agent_fee,
+            "total_fee": record.total_fee,
+            "processing_date": processing_date,
+            "original_filename": record.original_filename,
+            "generated_doc_path": file["path"],
+            "registration_number": record.registration_number,
+            "batch_id": batch_id,
+        } for record in job.records], file["name"], "word", file["path"], file["blob_hash"])
+         for job, file in word_docs],
+        # Excel文件记录与特定case无关
+        [(None, file["name"], "excel", file["path"], file["blob_hash"]) for file in excel_files],
+        superseded=[file["supersedes"] for _, file in word_docs if "supersedes" in file],
+        batch_id=batch_id,
+        db_path=db_path,
+    )
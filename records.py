@@ -0,0 +1,114 @@
+"""商标案件记录模型
+
+提取结果按申请人聚合为 Batch（{申请人: ApplicantRecords}），统一社会信用代码
+每个申请人只保存一份，每件商标一个 TrademarkRecord。记录使用 __slots__，
+一万件商标的批次比原先每件一个中文键字典小得多（benchmarks/bench_records.py）。
+
+Batch 在提取后创建一次并保存在 session_state 中，页面重新运行时直接读取，
+不再复制或重新扫描提取结果；生成时由 pipeline.build_jobs 一次遍历计算费用。
+加入文件时同时建立申请人索引（来源文件、需要手动输入类别的商标），手动输入
+的类别直接写回索引，页面重新运行的开销与批次大小无关。
+"""
+import uuid
+from dataclasses import dataclass, field
+
+# 新申请中未关联到类别、需要手动输入类别的商标
+MANUAL_CATEGORY = "MANUAL_INPUT_REQUIRED"
+
+
+@dataclass(slots=True)
+class TrademarkRecord:
+    """一件商标，即请款单中的一行；registration_number 为案件类申请书中的注册号"""
+    trademark_name: str
+    category: str | int
+    case_type: str
+    official_fee: int
+    original_filename: str = "未知文件"
+    agent_fee: int = 0
+    registration_number: str | None = None
+
+    @property
+    def total_fee(self):
+        return self.official_fee + self.agent_fee
+
+    @property
+    def needs_category(self):
+        return self.category == MANUAL_CATEGORY
+
+    def billed(self, agent_fee, category=None):
+        """填入代理费（及手动输入的类别）的副本
+
+        直接调用构造函数：dataclasses.replace 逐字段反射，一万件商标的批次慢数十毫秒。
+        """
+        return TrademarkRecord(self.trademark_name, self.category if category is None else category,
+                               self.case_type, self.official_fee, self.original_filename, agent_fee,
+                               self.registration_number)
+
+
+@dataclass(slots=True)
+class ApplicantRecords:
+    """一个申请人的商标记录；build_jobs 返回的副本中已填入代理费和合计
+
+    files 为来源文件名；pending 为需要手动输入类别的 {商标名称: 输入的类别}，
+    尚未输入时为空字符串。
+    """
+    applicant: str
+    unified_credit_code: str
+    records: list = field(default_factory=list)
+    files: list = field(default_factory=list)
+    pending: dict = field(default_factory=dict)
+    total_official: int = 0
+    total_agent: int = 0
+
+    @property
+    def total(self):
+        return self.total_official + self.total_agent
+
+    def confirmed(self):
+        """已确定类别的记录"""
+        return [record for record in self.records if not record.needs_category]
+
+
+@dataclass(slots=True)
+class Batch:
+    """一次处理的全部申请人，按申请人索引
+
+    pending 只索引有待输入类别商标的申请人，逐个输入类别时不需要遍历整个批次。
+    batch_id 标识本次提取，由它生成的请款单才会在重新生成时被沿用或取代。
+    """
+    case_type: str
+    applicants: dict = field(default_factory=dict)
+    pending: dict = field(default_factory=dict)
+    batch_id: str = field(default_factory=lambda: uuid.uuid4().hex)
+
+    def __len__(self):
+        return len(self.applicants)
+
+    def add_file(self, applicant, unified_credit_code, filename, records):
+        """加入一份文件的商标记录并更新索引，返回申请人的记录
+
+        同一申请人出现在多份文件中时，信用代码以首次出现的文件为准。
+        """
+        group = self.applicants.get(applicant)
+        if group is None:
+            group = self.applicants[applicant] = ApplicantRecords(applicant, unified_credit_code)
+        group.files.append(filename)
+        group.records.extend(records)
+        for record in records:
+            if record.needs_category:
+                group.pending.setdefault(record.trademark_name, "")
+                self.pending[applicant] = group
+        return group
+
+    def pending_manual(self):
+        """产出需要手动输入类别的 (申请人, 商标名称, 已输入的类别)"""
+        for group in self.pending.values():
+            for trademark_name, categories in group.pending.items():
+                yield group.applicant, trademark_name, categories
+
+    def set_categories(self, applicant, trademark_name, categories):
+        """记录手动输入的类别（逗号分隔的文本）"""
+        pending = self.pending[applicant].pending
+        if trademark_name not in pending:
+            raise KeyError(f"申请人 '{applicant}' 没有需要手动输入类别的商标 '{trademark_name}'")
+        pending[trademark_name] = categories
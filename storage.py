@@ -0,0 +1,164 @@
+"""生成文件的内容寻址存储
+
+请款单和汇总表在内存中生成，确认保存时写入存储目录。文件按内容的
+SHA-256 存放在 objects/<前两位>/<哈希> 下（可选 gzip 或 zstd 压缩），
+同一内容只保存一份；数据库 generated_files.blob_hash 记录引用关系，
+不再被引用的文件由 gc 命令清理。
+
+用法: python storage.py gc [--grace-hours 24] [--dry-run]
+"""
+import argparse
+import gzip
+import hashlib
+import os
+import tempfile
+import time
+
+try:
+    import zstandard
+except ImportError:  # zstd压缩为可选功能
+    zstandard = None
+
+from db import DB_PATH, get_referenced_blobs, init_database
+from metrics import traced
+
+# 生成文件的存储目录（与 trademark_data.db 同在工作目录下）
+STORAGE_DIR = "generated_files"
+# 默认不压缩：docx/xlsx 本身已是压缩包，再压缩收益很小
+DEFAULT_COMPRESSION = None
+# 各压缩方式的文件后缀
+SUFFIXES = {None: "", "gzip": ".gz", "zstd": ".zst"}
+# 新写入的文件在此时间内不会被 gc 清理，避免删除尚未写入数据库的文件
+GC_GRACE_SECONDS = 24 * 3600
+# read 每次解压读取的字节数
+READ_CHUNK_SIZE = 1 << 20
+
+
+class BlobStore:
+    def __init__(self, root=STORAGE_DIR, compression=DEFAULT_COMPRESSION):
+        if compression not in SUFFIXES:
+            raise ValueError(f"不支持的压缩方式: {compression}")
+        if compression == "zstd" and zstandard is None:
+            raise ValueError("使用zstd压缩需要安装 zstandard")
+        self.root = root
+        self.compression = compression
+
+    def _base_path(self, digest):
+        return os.path.join(self.root, "objects", digest[:2], digest)
+
+    def find(self, digest):
+        """返回已保存文件的路径（任一压缩方式），不存在时返回None"""
+        base = self._base_path(digest)
+        for suffix in SUFFIXES.values():
+            if os.path.exists(base + suffix):
+                return base + suffix
+        return None
+
+    @traced("storage.put")
+    def put(self, data):
+        """保存文件内容，返回 (哈希, 存储路径)；相同内容已存在时不重复写入"""
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.find(digest)
+        if path is not None:
+            # 刷新修改时间，使重新被引用的旧文件也受 gc 保护期保护
+            os.utime(path)
+            return digest, path
+
+        if self.compression == "gzip":
+            data = gzip.compress(data)
+        elif self.compression == "zstd":
+            data = zstandard.ZstdCompressor().compress(data)
+
+        path = self._base_path(digest) + SUFFIXES[self.compression]
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # 先写临时文件再原子替换，读取方不会看到写了一半的文件
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        return digest, path
+
+    def open(self, digest):
+        """以只读二进制文件对象打开（按需解压），读取时逐块解压而不是一次载入"""
+        path = self.find(digest)
+        if path is None:
+            raise FileNotFoundError(f"存储中不存在文件: {digest}")
+        if path.endswith(SUFFIXES["gzip"]):
+            return gzip.open(path, "rb")
+        if path.endswith(SUFFIXES["zstd"]):
+            if zstandard is None:
+                raise ValueError("读取zstd压缩文件需要安装 zstandard")
+            return zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True)
+        return open(path, "rb")
+
+    def read(self, digest):
+        """读取文件的完整内容（已解压），读完即关闭文件"""
+        with self.open(digest) as f:
+            return b"".join(iter(lambda: f.read(READ_CHUNK_SIZE), b""))
+
+    def iter_blobs(self):
+        """产出存储中的每个文件 (哈希, 路径)"""
+        objects_dir = os.path.join(self.root, "objects")
+        if not os.path.isdir(objects_dir):
+            return
+        for shard in sorted(os.listdir(objects_dir)):
+            shard_dir = os.path.join(objects_dir, shard)
+            for name in sorted(os.listdir(shard_dir)):
+                if name.endswith(".tmp"):
+                    continue
+                yield name.split(".", 1)[0], os.path.join(shard_dir, name)
+
+    def gc(self, referenced, grace_seconds=GC_GRACE_SECONDS, dry_run=False):
+        """删除不在 referenced 中且超过保护期的文件，返回 (删除的路径列表, 释放字节数)"""
+        cutoff = time.time() - grace_seconds
+        removed = []
+        freed = 0
+        for digest, path in list(self.iter_blobs()):
+            if digest in referenced:
+                continue
+            stat = os.stat(path)
+            if stat.st_mtime > cutoff:
+                continue
+            if not dry_run:
+                os.remove(path)
+            removed.append(path)
+            freed += stat.st_size
+        return removed, freed
+
+
+def store_files(files, store=None):
+    """把 [{"name": 文件名, "data": 内容}, ...] 写入存储
+
+    为每个文件补充 "blob_hash"（内容哈希）和 "path"（存储路径）。
+    """
+    if store is None:
+        store = BlobStore()
+    for file in files:
+        file["blob_hash"], file["path"] = store.put(file["data"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="生成文件存储维护")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    gc_parser = subparsers.add_parser("gc", help="清理数据库中不再引用的文件")
+    gc_parser.add_argument("--root", default=STORAGE_DIR)
+    gc_parser.add_argument("--db", default=DB_PATH)
+    gc_parser.add_argument("--grace-hours", type=float, default=GC_GRACE_SECONDS / 3600)
+    gc_parser.add_argument("--dry-run", action="store_true", help="只列出将被删除的文件")
+    args = parser.parse_args()
+
+    init_database(args.db)
+    store = BlobStore(args.root)
+    removed, freed = store.gc(get_referenced_blobs(args.db), args.grace_hours * 3600, args.dry_run)
+    for path in removed:
+        print(path)
+    action = "将删除" if args.dry_run else "已删除"
+    print(f"{action} {len(removed)} 个未引用文件，共 {freed / 1e6:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
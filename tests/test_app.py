@@ -0,0 +1,40 @@
+"""页面冒烟测试（Streamlit AppTest，不启动服务器）"""
+import os
+import shutil
+
+from streamlit.testing.v1 import AppTest
+
+from documents import INVOICE_TEMPLATE_PATH, WORD_TEMPLATE_PATH
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATH = os.path.join(ROOT, "app.py")
+# 模板齐全时才显示处理页面
+TEMPLATES = (WORD_TEMPLATE_PATH, INVOICE_TEMPLATE_PATH)
+
+
+def run_app(tmp_path, monkeypatch):
+    # 数据库和生成文件写在工作目录下，使用临时目录
+    for name in TEMPLATES:
+        shutil.copy(os.path.join(ROOT, name), tmp_path)
+    monkeypatch.chdir(tmp_path)
+    at = AppTest.from_file(APP_PATH, default_timeout=60)
+    at.run()
+    assert not at.exception
+    return at
+
+
+def test_reset_keeps_page_usable(tmp_path, monkeypatch):
+    at = run_app(tmp_path, monkeypatch)
+    at.session_state["text_backend"] = "pdfplumber"
+    at.run()
+
+    [button for button in at.button if button.label == "重置所有数据"][0].click().run()
+    assert not at.exception
+    assert "系统已重置，可以开始新的处理流程！" in [success.value for success in at.success]
+
+    # 重置后的下一次重新运行（侧边栏读取耗时统计等状态）
+    at.run()
+    assert not at.exception
+    assert at.session_state["processing_stage"] == 0
+    assert at.session_state["batch_metrics"] == {}
+    assert at.session_state["text_backend"] == "pdfplumber"
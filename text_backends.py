@@ -0,0 +1,173 @@
+"""PDF文本提取后端
+
+默认使用PyMuPDF提取页面文本；当某页结果异常（空文本、含替换字符、
+缺少预期的锚点标签）时，该页回退到pdfplumber重新提取。
+
+PDF既可以是文件路径，也可以是内存中的 PdfBytes（如上传文件的缓冲区），
+后者直接从内存解析，不经过临时文件。PDF库在首次打开文件时才导入，
+页面启动时不承担其导入开销。
+"""
+import io
+import os
+from collections import namedtuple
+
+from metrics import count, span
+
+# 内存中的PDF：文件名和内容（bytes 或 memoryview）
+PdfBytes = namedtuple("PdfBytes", ["filename", "data"])
+
+
+def pdf_name(pdf):
+    """PDF的文件名（不含目录）"""
+    if isinstance(pdf, PdfBytes):
+        return pdf.filename
+    return os.path.basename(pdf)
+
+
+def _import_pymupdf():
+    try:
+        import pymupdf
+    except ImportError:  # 旧版本PyMuPDF只提供fitz包名
+        import fitz as pymupdf
+    return pymupdf
+
+
+class PyMuPDFBackend:
+    name = "pymupdf"
+
+    def __init__(self, pdf):
+        pymupdf = _import_pymupdf()
+        if isinstance(pdf, PdfBytes):
+            self.doc = pymupdf.open(stream=pdf.data, filetype="pdf")
+        else:
+            self.doc = pymupdf.open(pdf)
+
+    @property
+    def page_count(self):
+        return self.doc.page_count
+
+    def page_text(self, page_num):
+        # sort=True 按阅读顺序输出，与pdfplumber的行顺序保持一致
+        return self.doc[page_num].get_text("text", sort=True).rstrip("\n")
+
+    def close(self):
+        self.doc.close()
+
+
+class PdfplumberBackend:
+    name = "pdfplumber"
+
+    def __init__(self, pdf):
+        import pdfplumber
+        if isinstance(pdf, PdfBytes):
+            pdf = io.BytesIO(pdf.data)
+        self.pdf = pdfplumber.open(pdf)
+
+    @property
+    def page_count(self):
+        return len(self.pdf.pages)
+
+    def page_text(self, page_num):
+        page = self.pdf.pages[page_num]
+        text = page.extract_text() or ""
+        # 释放该页解析出的对象缓存，使内存占用不随页数增长
+        page.close()
+        return text
+
+    def close(self):
+        self.pdf.close()
+
+
+BACKENDS = {
+    PyMuPDFBackend.name: PyMuPDFBackend,
+    PdfplumberBackend.name: PdfplumberBackend,
+}
+DEFAULT_BACKEND = PyMuPDFBackend.name
+FALLBACK_BACKEND = PdfplumberBackend.name
+
+
+def normalize_page_text(text):
+    """将全角空格和不换行空格替换为普通空格"""
+    return text.replace("　", " ").replace("\xa0", " ")
+
+
+def looks_wrong(text, anchors=()):
+    """判断提取结果是否需要回退"""
+    if not text or not text.strip():
+        return True
+    if "�" in text:
+        return True
+    if anchors and not any(anchor in text for anchor in anchors):
+        return True
+    return False
+
+
+class PdfTextReader:
+    """按页读取PDF文本，主后端结果异常时逐页回退"""
+
+    def __init__(self, pdf, backend=DEFAULT_BACKEND):
+        if backend not in BACKENDS:
+            raise ValueError(f"未知的文本提取后端: {backend}")
+        self.pdf = pdf
+        with span("pdf.open"):
+            self.backend = BACKENDS[backend](pdf)
+        self._fallback = None
+        self._probe = None
+        self._probed = None
+        self.fallback_pages = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def __len__(self):
+        return self.backend.page_count
+
+    def page_text(self, page_num, anchors=()):
+        """返回指定页文本（无文本时为空字符串）
+
+        anchors 为该页应包含的标签，任一出现即视为提取正常。
+        """
+        if self._probed is not None and self._probed[0] == page_num:
+            text = self._probed[1]
+        else:
+            with span("pdf.page_text"):
+                text = self.backend.page_text(page_num)
+        if self.backend.name == FALLBACK_BACKEND or not looks_wrong(text, anchors):
+            return text
+
+        if self._fallback is None:
+            with span("pdf.open"):
+                self._fallback = BACKENDS[FALLBACK_BACKEND](self.pdf)
+        with span("pdf.fallback_page_text"):
+            fallback_text = self._fallback.page_text(page_num)
+        if text and looks_wrong(fallback_text, anchors):
+            return text
+        self.fallback_pages += 1
+        count("pdf.fallback_pages")
+        return fallback_text
+
+    def probe_text(self, page_num):
+        """用PyMuPDF快速获取页面文本，仅用于判断该页是否需要完整提取"""
+        if self.backend.name == PyMuPDFBackend.name:
+            # 主后端即PyMuPDF时记住结果，随后的 page_text 不再重复提取
+            with span("pdf.probe_text"):
+                text = self.backend.page_text(page_num)
+            self._probed = (page_num, text)
+            return text
+        if self._probe is None:
+            with span("pdf.open"):
+                self._probe = PyMuPDFBackend(self.pdf)
+        with span("pdf.probe_text"):
+            return self._probe.page_text(page_num)
+
+    def close(self):
+        self.backend.close()
+        if self._fallback is not None:
+            self._fallback.close()
+            self._fallback = None
+        if self._probe is not None:
+            self._probe.close()
+            self._probe = None